@@ -2,15 +2,28 @@ from __future__ import annotations
 
 import argparse
 import sys
-import wx
+import time
 
+# Earliest point we control; --startup-benchmark measures from here.
+_T0 = time.perf_counter()
+
+from .browse_cache import browse_cache
 from .config import load_config, reset_config, save_config
-from .ui.main_frame import MainFrame
+from .perf_log import perf, perf_event
+
+# Time from launch until the main window is shown and the event loop is idle.
+STARTUP_TARGET_MS = 1500
 
 
 def main(argv=None):
     parser = argparse.ArgumentParser(prog="accessslskd", add_help=True)
     parser.add_argument("--config-reset", action="store_true", help="Reset saved configuration and exit.")
+    parser.add_argument(
+        "--startup-benchmark",
+        action="store_true",
+        help=f"Measure time until the window is interactive, print it and exit (non-zero if over {STARTUP_TARGET_MS} ms).",
+    )
+    parser.add_argument("--startup-target-ms", type=int, default=STARTUP_TARGET_MS, help=argparse.SUPPRESS)
     args = parser.parse_args(argv or sys.argv[1:])
 
     if args.config_reset:
@@ -19,13 +32,30 @@ def main(argv=None):
         return 0
 
     cfg = load_config()
+    perf.set_enabled(cfg.perf_log_enabled)
+    browse_cache.set_limit_mb(cfg.browse_cache_max_mb)
+    # wx and the UI are imported only once we know a window is needed.
+    import wx
+    from .ui.main_frame import MainFrame
+
     app = wx.App()
-    frame = MainFrame(cfg)
+    frame = MainFrame(cfg, auto_connect=not args.startup_benchmark)
     frame.Show()
+    result = [0]
+    if args.startup_benchmark:
+        def report():
+            # Runs once the event loop has processed the initial show/paint events.
+            ms = (time.perf_counter() - _T0) * 1000.0
+            perf_event("startup", ms)
+            target = int(args.startup_target_ms)
+            verdict = "OK" if ms <= target else "SLOW"
+            print(f"Startup: {ms:.0f} ms to interactive (target {target} ms) {verdict}")
+            result[0] = 0 if ms <= target else 1
+            frame.Close()
+        wx.CallAfter(report)
     app.MainLoop()
-    return 0
+    return result[0]
 
 
 if __name__ == "__main__":
     raise SystemExit(main())
-
@@ -0,0 +1,120 @@
+"""
+Background batch writer behind the app's append-only stores (the perf log,
+the transfer history, ...).
+
+Callers only pay for a queue put. The first put starts a daemon thread that
+wakes once items arrive, waits ``flush_interval_s`` so a burst lands in one
+batch, and hands batches of up to ``max_batch`` items to ``write``. The queue
+is bounded; items past ``max_pending``, and batches whose write raises, are
+counted in ``dropped`` rather than blocking or failing the caller. Whatever is
+still queued is flushed at exit.
+
+Items put with a key are skipped when that key was already queued, for feeds
+that report the same thing over and over (finished transfers, whole
+conversations). The remembered keys are cleared once ``max_known`` is reached;
+a batch whose write fails forgets its keys, so the items can be queued again.
+"""
+from __future__ import annotations
+
+import atexit
+import queue
+import threading
+import time
+from typing import Callable, Generic, Hashable, Iterable, List, Optional, Set, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class BatchWriter(Generic[T]):
+    def __init__(
+        self,
+        write: Callable[[List[T]], None],
+        *,
+        name: str,
+        flush_interval_s: float = 1.0,
+        max_batch: int = 1000,
+        max_pending: int = 50000,
+        max_known: int = 200000,
+    ):
+        self._write = write
+        self.name = name
+        self.flush_interval_s = float(flush_interval_s)
+        self.max_batch = max(1, int(max_batch))
+        self.max_known = int(max_known)
+        # (item, dedupe key or None)
+        self._queue: "queue.Queue[Tuple[T, Optional[Hashable]]]" = queue.Queue(maxsize=int(max_pending))
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._known_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._known: Set[Hashable] = set()
+        self.dropped = 0
+
+    def put(self, item: T, key: Optional[Hashable] = None) -> bool:
+        """Queue one item. Safe from any thread; never blocks. False if skipped or dropped."""
+        if key is not None:
+            with self._known_lock:
+                if key in self._known:
+                    return False
+                if len(self._known) >= self.max_known:
+                    self._known.clear()
+                self._known.add(key)
+        try:
+            self._queue.put_nowait((item, key))
+        except queue.Full:
+            self.dropped += 1
+            if key is not None:
+                with self._known_lock:
+                    self._known.discard(key)
+            return False
+        if not self._wake.is_set():
+            self._wake.set()
+        self._ensure_thread()
+        return True
+
+    def put_many(self, items: Iterable[T], key: Optional[Callable[[T], Hashable]] = None) -> int:
+        """Queue items, deduplicated by ``key(item)`` if given. Returns how many were queued."""
+        return sum(1 for item in items if self.put(item, None if key is None else key(item)))
+
+    def flush(self) -> None:
+        """Write everything queued so far. Called by the writer thread, at exit, and by readers."""
+        with self._flush_lock:
+            while True:
+                batch: List[Tuple[T, Optional[Hashable]]] = []
+                while len(batch) < self.max_batch:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    return
+                try:
+                    self._write([item for item, _ in batch])
+                except Exception:
+                    # Writers are best-effort; never take the app down.
+                    self.dropped += len(batch)
+                    # Not written, so not known: the next report of these items queues them again
+                    with self._known_lock:
+                        for _, key in batch:
+                            if key is not None:
+                                self._known.discard(key)
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            t = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread = t
+            atexit.register(self.flush)
+            t.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait()
+            # Let items accumulate so they are written in one batch
+            time.sleep(self.flush_interval_s)
+            self._wake.clear()
+            self.flush()
@@ -0,0 +1,213 @@
+"""
+On-disk snapshots of browsed shares.
+
+Browsing a big user can take slskd tens of seconds. Each successful browse is
+saved as a compressed snapshot in ``browse_cache/`` under the config
+directory, so re-opening that user shows the last known shares at once
+(marked with their age) while a fresh browse runs in the background.
+
+Snapshots are columnar rather than a copy of the API payload: one list of
+directory paths, then parallel arrays of (directory index, name, size,
+bitrate, length) for the files, zlib-compressed. Repeated keys and full file
+paths disappear, so a 200k-file share is a few MB and decodes in well under a
+second. ``index.json`` records each snapshot's size and last use; once the
+total goes over the limit the least recently used snapshots are deleted.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+
+from .browse_tree import BrowseFile, BrowseTree
+from .perf_log import perf_timer
+
+CACHE_DIR_NAME = "browse_cache"
+INDEX_FILE_NAME = "index.json"
+FORMAT_VERSION = 1
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+
+def encode(tree: BrowseTree) -> bytes:
+    dirs: List[str] = []
+    locked: List[int] = []
+    fd: List[int] = []
+    fn: List[str] = []
+    fs: List[int] = []
+    fb: List[Optional[int]] = []
+    fl: List[Optional[int]] = []
+    for node in tree.root.walk():
+        if node is tree.root or node.files is None:
+            continue
+        di = len(dirs)
+        dirs.append(node.path)
+        if node.locked:
+            locked.append(di)
+        for f in node.files:
+            fd.append(di)
+            fn.append(f.name)
+            fs.append(f.size)
+            fb.append(f.bitrate)
+            fl.append(f.length)
+    doc = {
+        "v": FORMAT_VERSION, "user": tree.username, "at": tree.fetched_at,
+        "dirs": dirs, "locked": locked, "fd": fd, "fn": fn, "fs": fs, "fb": fb, "fl": fl,
+    }
+    return zlib.compress(json.dumps(doc, separators=(",", ":")).encode("utf-8"), 6)
+
+
+def decode(data: bytes) -> Optional[BrowseTree]:
+    doc = json.loads(zlib.decompress(data).decode("utf-8"))
+    if doc.get("v") != FORMAT_VERSION:
+        return None
+    tree = BrowseTree(str(doc.get("user", "")))
+    tree.fetched_at = float(doc.get("at", 0.0))
+    dirs = doc["dirs"]
+    files: List[List[BrowseFile]] = [[] for _ in dirs]
+    for di, name, size, br, ln in zip(doc["fd"], doc["fn"], doc["fs"], doc["fb"], doc["fl"]):
+        files[di].append(BrowseFile(name, size, br, ln))
+    for path, flist in zip(dirs, files):
+        tree.set_files(path, flist)
+    for di in doc.get("locked") or []:
+        node = tree.node_for(dirs[di])
+        if node is not None:
+            node.locked = True
+    for node in tree.root.walk():
+        if node.files is None:
+            node.files = []
+    tree.complete = True
+    tree.aggregate()
+    return tree
+
+
+def _file_name(username: str) -> str:
+    # Usernames may contain anything; hash for a safe, fixed-length file name
+    return hashlib.sha1(username.encode("utf-8")).hexdigest() + ".bin"
+
+
+class BrowseCache:
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self._dir = directory
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        # username -> {"file", "bytes", "saved_at", "used_at"}
+        self._index: Optional[Dict[str, Dict[str, Any]]] = None
+
+    def set_limit_mb(self, mb: int) -> None:
+        self.max_bytes = max(0, int(mb)) * 1024 * 1024
+
+    def load(self, username: str) -> Optional[BrowseTree]:
+        """The saved snapshot for a user, or None. Call off the UI thread."""
+        with self._lock:
+            entry = self._get_index().get(username)
+            if entry is None:
+                return None
+            path = os.path.join(self._resolve_dir(), entry["file"])
+        try:
+            with perf_timer("browse_cache.load") as info:
+                with open(path, "rb") as f:
+                    data = f.read()
+                info["payload"] = len(data)
+                tree = decode(data)
+                info["rows"] = tree.file_count if tree is not None else 0
+        except Exception:
+            # Missing or corrupt: forget it
+            self.forget(username)
+            return None
+        if tree is None or tree.username != username:
+            self.forget(username)
+            return None
+        with self._lock:
+            entry["used_at"] = time.time()
+            self._save_index()
+        return tree
+
+    def save(self, tree: BrowseTree) -> None:
+        """Write (or replace) a user's snapshot, then trim to the size limit. Call off the UI thread."""
+        if self.max_bytes <= 0:
+            return
+        try:
+            with perf_timer("browse_cache.save", rows=tree.file_count) as info:
+                data = encode(tree)
+                info["payload"] = len(data)
+                name = _file_name(tree.username)
+                with self._lock:
+                    d = self._resolve_dir()
+                    tmp = os.path.join(d, name + ".tmp")
+                    with open(tmp, "wb") as f:
+                        f.write(data)
+                    os.replace(tmp, os.path.join(d, name))
+                    now = time.time()
+                    self._get_index()[tree.username] = {
+                        "file": name, "bytes": len(data), "saved_at": tree.fetched_at, "used_at": now,
+                    }
+                    self._evict(keep=tree.username)
+                    self._save_index()
+        except Exception:
+            # The cache is an optimization; never fail a browse over it
+            pass
+
+    def forget(self, username: str) -> None:
+        with self._lock:
+            entry = self._get_index().pop(username, None)
+            if entry is not None:
+                self._remove_file(entry["file"])
+                self._save_index()
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(int(e.get("bytes", 0)) for e in self._get_index().values())
+
+    def _evict(self, keep: str) -> None:
+        # Caller holds _lock
+        index = self._get_index()
+        total = sum(int(e.get("bytes", 0)) for e in index.values())
+        for user, entry in sorted(index.items(), key=lambda kv: kv[1].get("used_at", 0.0)):
+            if total <= self.max_bytes:
+                break
+            if user == keep:
+                continue
+            total -= int(entry.get("bytes", 0))
+            del index[user]
+            self._remove_file(entry["file"])
+
+    def _remove_file(self, name: str) -> None:
+        try:
+            os.remove(os.path.join(self._resolve_dir(), name))
+        except OSError:
+            pass
+
+    def _resolve_dir(self) -> str:
+        if not self._dir:
+            from .config import _app_config_dir
+            self._dir = os.path.join(_app_config_dir(), CACHE_DIR_NAME)
+        os.makedirs(self._dir, exist_ok=True)
+        return self._dir
+
+    def _get_index(self) -> Dict[str, Dict[str, Any]]:
+        # Caller holds _lock
+        if self._index is None:
+            try:
+                with open(os.path.join(self._resolve_dir(), INDEX_FILE_NAME), "r", encoding="utf-8") as f:
+                    self._index = {str(k): dict(v) for k, v in (json.load(f) or {}).items()}
+            except Exception:
+                self._index = {}
+        return self._index
+
+    def _save_index(self) -> None:
+        # Caller holds _lock
+        try:
+            path = os.path.join(self._resolve_dir(), INDEX_FILE_NAME)
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(self._index or {}, f, separators=(",", ":"))
+            os.replace(path + ".tmp", path)
+        except Exception:
+            pass
+
+
+# Process-wide snapshot cache used by the app
+browse_cache = BrowseCache()
@@ -0,0 +1,377 @@
+"""
+In-memory model of one user's browsed shares.
+
+``users.browse`` returns every shared directory at once, as a flat list of
+full paths ("Music\\Artist\\Album") with their files. ``BrowseTree`` indexes
+that result once into a path trie: each node holds only its own path
+component plus its children and files, so long shared prefixes are stored a
+single time and any path resolves with one dict lookup per component. The
+browser then navigates entirely from this model; the network is only needed
+to refresh a directory or for folders the browse result didn't list.
+"""
+from __future__ import annotations
+
+import re
+import sys
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+SEP = "\\"
+_SPLIT = re.compile(r"[\\/]+")
+
+
+# Extensions counted separately in folder totals
+AUDIO_EXTS = frozenset((
+    "mp3", "flac", "ogg", "opus", "wav", "aac", "m4a", "wma", "alac", "ape", "aiff", "aif", "wv", "mpc", "dsf", "dff",
+))
+VIDEO_EXTS = frozenset((
+    "avi", "mp4", "mkv", "mov", "wmv", "flv", "webm", "mpg", "mpeg", "m4v", "ts", "m2ts", "vob", "ogv",
+))
+
+
+def split_path(path: str) -> List[str]:
+    return [p for p in _SPLIT.split(path or "") if p]
+
+
+def basename(path: str) -> str:
+    parts = split_path(path)
+    return parts[-1] if parts else ""
+
+
+class BrowseFile:
+    __slots__ = ("name", "size", "bitrate", "length")
+
+    def __init__(self, name: str, size: int, bitrate: Optional[int] = None, length: Optional[int] = None):
+        self.name = name
+        self.size = size
+        self.bitrate = bitrate
+        self.length = length
+
+    @classmethod
+    def from_api(cls, f: Dict[str, Any]) -> "BrowseFile":
+        br = f.get("bitRate")
+        ln = f.get("length")
+        return cls(
+            basename(str(f.get("filename", "") or "")),
+            int(f.get("size", 0) or 0),
+            int(br) if br is not None else None,
+            int(ln) if ln is not None else None,
+        )
+
+
+class DirStats:
+    """Totals for a folder and everything below it."""
+    __slots__ = ("bytes", "files", "audio", "video", "depth")
+
+    def __init__(self):
+        self.bytes = 0
+        self.files = 0
+        self.audio = 0
+        self.video = 0
+        # Levels of subfolders below (0 for a folder without subfolders)
+        self.depth = 0
+
+    def add_files(self, files: Iterable[BrowseFile]) -> None:
+        for f in files:
+            self.bytes += f.size
+            self.files += 1
+            ext = f.name.rsplit(".", 1)[-1].lower() if "." in f.name else ""
+            if ext in AUDIO_EXTS:
+                self.audio += 1
+            elif ext in VIDEO_EXTS:
+                self.video += 1
+
+    def add_child(self, other: "DirStats") -> None:
+        self.bytes += other.bytes
+        self.files += other.files
+        self.audio += other.audio
+        self.video += other.video
+        self.depth = max(self.depth, other.depth + 1)
+
+    def describe(self) -> str:
+        from .throughput import format_size
+        parts = []
+        if self.audio:
+            parts.append(f"{self.audio} audio")
+        if self.video:
+            parts.append(f"{self.video} video")
+        msg = f"{format_size(self.bytes)} in {self.files} file(s)"
+        if parts:
+            msg += f" ({', '.join(parts)})"
+        if self.depth:
+            msg += f", {self.depth} level(s) deep"
+        return msg
+
+
+class BrowseNode:
+    __slots__ = ("name", "parent", "children", "files", "locked", "stats")
+
+    def __init__(self, name: str, parent: Optional["BrowseNode"]):
+        self.name = name
+        self.parent = parent
+        self.children: Dict[str, BrowseNode] = {}
+        # None until this directory's file list is known (from browse, or fetched)
+        self.files: Optional[List[BrowseFile]] = None
+        self.locked = False
+        # Subtree totals, once the tree has been aggregated
+        self.stats: Optional[DirStats] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.files is not None
+
+    @property
+    def path(self) -> str:
+        parts = []
+        node: Optional[BrowseNode] = self
+        while node is not None and node.parent is not None:
+            parts.append(node.name)
+            node = node.parent
+        return SEP.join(reversed(parts))
+
+    @property
+    def depth(self) -> int:
+        d = 0
+        node = self.parent
+        while node is not None:
+            d += 1
+            node = node.parent
+        return d
+
+    def sorted_children(self) -> List["BrowseNode"]:
+        return sorted(self.children.values(), key=lambda n: n.name.lower())
+
+    def walk(self) -> Iterator["BrowseNode"]:
+        """This node and every descendant, depth first (iterative; shares can be deep)."""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(node.children.values())
+
+    def file_path(self, f: BrowseFile) -> str:
+        base = self.path
+        return f"{base}{SEP}{f.name}" if base else f.name
+
+
+class BrowseTree:
+    def __init__(self, username: str):
+        self.username = username
+        self.root = BrowseNode("", None)
+        self.directory_count = 0
+        self.file_count = 0
+        # Wall time the shares were fetched (kept when restored from a snapshot)
+        self.fetched_at = time.time()
+        # True when built from a full browse: every folder is known and loaded
+        self.complete = False
+        # True once every node carries stats; later changes then update them in place
+        self.aggregated = False
+
+    @classmethod
+    def from_browse(cls, username: str, result: Dict[str, Any]) -> "BrowseTree":
+        tree = cls(username)
+        for d in (result or {}).get("directories") or []:
+            tree.set_directory(str(d.get("name", "") or ""), d.get("files") or [])
+        for d in (result or {}).get("lockedDirectories") or []:
+            node = tree.set_directory(str(d.get("name", "") or ""), d.get("files") or [])
+            node.locked = True
+        # A full browse lists every directory; parents implied only by a path hold no files
+        for node in tree.root.walk():
+            if node.files is None:
+                node.files = []
+        tree.complete = True
+        tree.aggregate()
+        return tree
+
+    def node_for(self, path: str) -> Optional[BrowseNode]:
+        node = self.root
+        for part in split_path(path):
+            node = node.children.get(part)
+            if node is None:
+                return None
+        return node
+
+    def ensure(self, path: str) -> BrowseNode:
+        node = self.root
+        for part in split_path(path):
+            child = node.children.get(part)
+            if child is None:
+                # Interned: the same component names recur across many paths
+                child = node.children[part] = BrowseNode(sys.intern(part), node)
+                self.directory_count += 1
+                if self.aggregated:
+                    child.stats = DirStats()
+                    self._reaggregate_up(node)
+            node = child
+        return node
+
+    def set_directory(self, path: str, files: Iterable[Dict[str, Any]]) -> BrowseNode:
+        """Record (or replace) one directory's file list, e.g. from ``user_directory``."""
+        return self.set_files(path, [BrowseFile.from_api(f) for f in files or []])
+
+    def set_files(self, path: str, files: List[BrowseFile]) -> BrowseNode:
+        node = self.ensure(path)
+        if node.files is not None:
+            self.file_count -= len(node.files)
+        node.files = files
+        self.file_count += len(files)
+        if self.aggregated:
+            self._reaggregate_up(node)
+        return node
+
+    def update_from_listing(self, path: str, listing: Any) -> BrowseNode:
+        """Apply a ``user_directory`` response (a list with one directory, maybe nested)."""
+        items = listing if isinstance(listing, list) else [listing] if listing else []
+        node = self.ensure(path)
+        for d in items:
+            name = str(d.get("name", "") or "") or path
+            self.set_directory(name, d.get("files") or [])
+            for sub in d.get("directories") or []:
+                sub_name = str(sub.get("name", "") or "")
+                if not sub_name:
+                    continue
+                # Nested entries may carry a full path or just their own name
+                full = sub_name if SEP in sub_name or "/" in sub_name else f"{name}{SEP}{sub_name}"
+                if sub.get("files") is not None:
+                    self.set_directory(full, sub.get("files") or [])
+                else:
+                    self.ensure(full)
+        if node.files is None:
+            node.files = []
+        return node
+
+    def aggregate(self) -> None:
+        """Fill every node's ``stats`` in one post-order pass."""
+        # Reversed pre-order visits every folder after all of its descendants
+        for node in reversed(list(self.root.walk())):
+            self._restat(node)
+        self.aggregated = True
+
+    def _restat(self, node: BrowseNode) -> None:
+        st = DirStats()
+        st.add_files(node.files or ())
+        for c in node.children.values():
+            if c.stats is not None:
+                st.add_child(c.stats)
+        node.stats = st
+
+    def _reaggregate_up(self, node: Optional[BrowseNode]) -> None:
+        # A refreshed folder only changes the totals on its path to the root
+        while node is not None:
+            self._restat(node)
+            node = node.parent
+
+    def signature(self) -> Tuple[int, int, int]:
+        """(directories, files, bytes): a cheap check for "did the shares change"."""
+        total = 0
+        for node in self.root.walk():
+            for f in node.files or ():
+                total += f.size
+        return (self.directory_count, self.file_count, total)
+
+    def entries(self, node: BrowseNode) -> List[Tuple[str, Any]]:
+        """("dir", child node) and ("file", BrowseFile) entries shown for a directory."""
+        out: List[Tuple[str, Any]] = [("dir", c) for c in node.sorted_children()]
+        out.extend(("file", f) for f in (node.files or []))
+        return out
+
+
+# Columns of the browser's file list
+BCOL_NAME, BCOL_SIZE, BCOL_TYPE = range(3)
+
+# ("dir", folder, None) or ("file", folder, file)
+BrowseRow = Tuple[str, BrowseNode, Optional[BrowseFile]]
+
+
+class BrowseRows:
+    """
+    What the browser's virtual list shows: a folder's contents or search
+    hits. Cell text is produced on demand for painted rows, and each column's
+    sort keys are computed once per row set and reused when the sort flips.
+    """
+
+    def __init__(self):
+        self._rows: List[BrowseRow] = []
+        # Display position -> row index
+        self._order: List[int] = []
+        self._keys: Dict[int, List[Any]] = {}
+        # id(row) -> display position, built on first lookup
+        self._pos: Optional[Dict[int, int]] = None
+        self.full_paths = False
+        self.sort_column: Optional[int] = None
+        self.sort_ascending = True
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def set_rows(self, rows: List[BrowseRow], full_paths: bool = False) -> None:
+        self._rows = rows
+        self.full_paths = full_paths
+        self._keys.clear()
+        self._resort()
+
+    def row(self, i: int) -> Optional[BrowseRow]:
+        if 0 <= i < len(self._order):
+            return self._rows[self._order[i]]
+        return None
+
+    def index_of(self, row: BrowseRow) -> int:
+        if self._pos is None:
+            self._pos = {id(self._rows[ri]): i for i, ri in enumerate(self._order)}
+        return self._pos.get(id(row), -1)
+
+    def cell(self, i: int, col: int) -> str:
+        r = self.row(i)
+        if r is None:
+            return ""
+        kind, node, f = r
+        if col == BCOL_NAME:
+            if f is None:
+                return node.path if self.full_paths else node.name
+            return node.file_path(f) if self.full_paths else f.name
+        if col == BCOL_SIZE:
+            from .throughput import format_size
+            if f is None:
+                st = node.stats
+                return f"{format_size(st.bytes)}, {st.files} files" if st is not None else ""
+            return format_size(f.size)
+        if col == BCOL_TYPE:
+            return "Dir" if kind == "dir" else "File"
+        return ""
+
+    def set_sort(self, col: Optional[int], ascending: bool = True) -> None:
+        self.sort_column = col
+        self.sort_ascending = ascending
+        self._resort()
+
+    def _sort_keys(self, col: int) -> List[Any]:
+        keys = self._keys.get(col)
+        if keys is None:
+            keys = self._keys[col] = [self._sort_key(r, col) for r in self._rows]
+        return keys
+
+    @staticmethod
+    def _sort_key(r: BrowseRow, col: int) -> Any:
+        kind, node, f = r
+        # Folders stay above files whichever way the column sorts
+        rank = 0 if f is None else 1
+        if col == BCOL_SIZE:
+            if f is None:
+                return (rank, node.stats.bytes if node.stats is not None else 0)
+            return (rank, f.size)
+        if col == BCOL_TYPE:
+            return (rank, "" if f is None else f.name.rsplit(".", 1)[-1].lower())
+        return (rank, (node.path if f is None else f.name).lower())
+
+    def _resort(self) -> None:
+        self._pos = None
+        n = len(self._rows)
+        if self.sort_column is None:
+            self._order = list(range(n))
+            return
+        keys = self._sort_keys(self.sort_column)
+        order = sorted(range(n), key=keys.__getitem__, reverse=not self.sort_ascending)
+        if not self.sort_ascending:
+            # Keep folders first when descending too
+            order.sort(key=lambda i: keys[i][0])
+        self._order = order
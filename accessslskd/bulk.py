@@ -0,0 +1,77 @@
+"""
+Bounded parallel execution of one API call over many transfers.
+
+Bulk transfer actions (cancel, remove, retry) used to call slskd once per
+selected row, serially. ``run_bulk`` fans the calls out over a small thread
+pool, reports progress as calls finish, and returns a summary so the caller
+can refresh once at the end.
+"""
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+
+# slskd handles a few concurrent requests well; more just queue server-side.
+DEFAULT_MAX_WORKERS = 8
+
+
+@dataclass
+class BulkResult:
+    total: int = 0
+    ok: int = 0
+    failed: int = 0
+    cancelled: bool = False
+    # First few error messages, for the status bar
+    errors: List[str] = field(default_factory=list)
+
+
+def run_bulk(
+    items: Sequence[T],
+    op: Callable[[T], bool],
+    *,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+    cancel: Optional[threading.Event] = None,
+) -> BulkResult:
+    """
+    Call ``op(item)`` for every item on up to ``max_workers`` threads. A falsy
+    return or an exception counts as a failure. ``on_progress(done, total)``
+    runs on the calling thread after each completion. Setting ``cancel`` stops
+    new calls from starting; calls already running finish.
+    """
+    res = BulkResult(total=len(items))
+    if not items:
+        return res
+
+    def guarded(item: T) -> bool:
+        if cancel is not None and cancel.is_set():
+            raise _Skipped()
+        return bool(op(item))
+
+    done = 0
+    with ThreadPoolExecutor(max_workers=max(1, min(int(max_workers), len(items))), thread_name_prefix="bulk") as pool:
+        futures = [pool.submit(guarded, it) for it in items]
+        for fut in as_completed(futures):
+            done += 1
+            try:
+                if fut.result():
+                    res.ok += 1
+                else:
+                    res.failed += 1
+            except _Skipped:
+                res.cancelled = True
+            except Exception as e:
+                res.failed += 1
+                if len(res.errors) < 3:
+                    res.errors.append(str(e))
+            if on_progress is not None:
+                on_progress(done, res.total)
+    return res
+
+
+class _Skipped(Exception):
+    pass
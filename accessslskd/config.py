@@ -68,6 +68,23 @@ class AppConfig:
     search_timeout_ms: int = 1800000
     transfers_auto_update: bool = True
     transfers_interval_sec: int = 5
+    # Uploads are polled separately and less often (Refresh fetches both)
+    transfers_uploads_interval_sec: int = 30
+    # Retry failed downloads, then look for the same file from other users
+    transfers_auto_retry: bool = False
+    # Re-check a user's queue length after this many seconds
+    transfers_queue_ttl_sec: int = 300
+    # Background clean-up of slskd (off unless opted in): how often, and how long
+    # finished searches (minutes) and finished transfers (hours) are kept. 0 keeps
+    # them forever. Clean Up slskd Now uses the same retentions.
+    janitor_enabled: bool = False
+    janitor_interval_min: int = 30
+    janitor_search_retention_min: int = 60
+    janitor_transfer_retention_hours: int = 24
+    # Disk space for saved user browse snapshots (least recently used go first)
+    browse_cache_max_mb: int = 200
+    # Write timed operations to perf.jsonl in the config directory
+    perf_log_enabled: bool = True
 
     def sanitized(self) -> dict:
         d = asdict(self)
@@ -0,0 +1,170 @@
+"""
+Recursive "download this directory".
+
+Enqueueing a folder used to fetch it once and take whatever nested
+``directories`` happened to come back, so disc subfolders of an album were
+often missed. ``crawl`` walks the whole subtree of a ``BrowseTree`` level by
+level. Folders the tree already knows cost nothing. Unknown folders are
+fetched with ``user_directory``, a few at a time. Depth, file count and total
+size are capped.
+
+The result is a ``CrawlPlan``: the caller sees the totals (and whether a
+limit cut the walk short) before ``enqueue_plan`` commits it in chunks.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .browse_tree import BrowseNode, BrowseTree, split_path
+from .perf_log import perf_event
+from .throughput import format_size
+
+# Concurrent user_directory calls while crawling
+CRAWL_WORKERS = 4
+# Files per enqueue_downloads call
+ENQUEUE_CHUNK = 200
+
+
+@dataclass
+class CrawlLimits:
+    max_depth: int = 12
+    max_files: int = 5000
+    max_bytes: int = 100 * 1024 ** 3
+
+
+@dataclass
+class CrawlPlan:
+    files: List[Dict[str, Any]] = field(default_factory=list)
+    directories: int = 0
+    total_bytes: int = 0
+    # Why the walk stopped early ("" if it covered everything)
+    truncated: str = ""
+    # Subfolders left out for being deeper than max_depth
+    too_deep: int = 0
+    errors: int = 0
+    cancelled: bool = False
+
+    def describe(self) -> str:
+        msg = f"{len(self.files)} file(s), {format_size(self.total_bytes)} in {self.directories} folder(s)"
+        notes = []
+        if self.truncated:
+            notes.append(self.truncated)
+        if self.too_deep:
+            notes.append(f"{self.too_deep} deeper folder(s) skipped")
+        if self.errors:
+            notes.append(f"{self.errors} folder(s) could not be read")
+        return msg + (f" ({'; '.join(notes)})" if notes else "")
+
+
+def outermost_paths(paths: Iterable[str]) -> List[str]:
+    """
+    The folders to crawl for a selection: duplicates and folders inside another
+    selected folder are dropped (crawling the parent covers them). Order is kept.
+    """
+    paths = list(paths)
+    keys = [tuple(split_path(p)) for p in paths]
+    selected = set(keys)
+    out: List[str] = []
+    seen = set()
+    for p, k in zip(paths, keys):
+        if not k or k in seen or any(k[:i] in selected for i in range(1, len(k))):
+            continue
+        seen.add(k)
+        out.append(p)
+    return out
+
+
+def crawl(
+    service,
+    tree: BrowseTree,
+    path: str,
+    *,
+    limits: Optional[CrawlLimits] = None,
+    plan: Optional[CrawlPlan] = None,
+    max_workers: int = CRAWL_WORKERS,
+    on_progress: Optional[Callable[[CrawlPlan], None]] = None,
+    cancel: Optional[threading.Event] = None,
+) -> CrawlPlan:
+    """
+    Collect every file under ``path``. Folders missing from ``tree`` are
+    fetched and added to it, so pass a tree no other thread is reading (or
+    one that is already complete). Pass ``plan`` to add to an earlier crawl
+    under the same limits.
+    """
+    lim = limits or CrawlLimits()
+    out = plan if plan is not None else CrawlPlan()
+    t0 = time.perf_counter()
+    fetched = 0
+    frontier: List[Tuple[BrowseNode, int]] = [(tree.ensure(path), 0)]
+    with ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix="crawl") as pool:
+        while frontier and not out.truncated:
+            if cancel is not None and cancel.is_set():
+                out.cancelled = True
+                break
+            # Fetch this level's unknown folders in parallel, then walk it locally
+            futures = {
+                pool.submit(service.user_directory, tree.username, node.path): node
+                for node, _ in frontier if not node.loaded
+            }
+            for fut in as_completed(futures):
+                node = futures[fut]
+                fetched += 1
+                try:
+                    tree.update_from_listing(node.path, fut.result())
+                except Exception:
+                    out.errors += 1
+            nxt: List[Tuple[BrowseNode, int]] = []
+            for node, depth in frontier:
+                out.directories += 1
+                for f in node.files or ():
+                    if len(out.files) >= lim.max_files:
+                        out.truncated = f"stopped at {lim.max_files} files"
+                        break
+                    if out.total_bytes + f.size > lim.max_bytes:
+                        out.truncated = f"stopped at {format_size(lim.max_bytes)}"
+                        break
+                    out.files.append({"filename": node.file_path(f), "size": f.size})
+                    out.total_bytes += f.size
+                if out.truncated:
+                    break
+                if depth < lim.max_depth:
+                    nxt.extend((c, depth + 1) for c in node.sorted_children())
+                else:
+                    out.too_deep += len(node.children)
+            frontier = nxt
+            if on_progress is not None:
+                on_progress(out)
+    perf_event("crawl", (time.perf_counter() - t0) * 1000.0, payload=fetched, rows=len(out.files))
+    return out
+
+
+def enqueue_plan(
+    service,
+    username: str,
+    plan: CrawlPlan,
+    *,
+    chunk: int = ENQUEUE_CHUNK,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+    cancel: Optional[threading.Event] = None,
+) -> Tuple[int, int]:
+    """Enqueue the plan's files in order, ``chunk`` per call. Returns (enqueued, failed)."""
+    ok = failed = 0
+    total = len(plan.files)
+    for i in range(0, total, max(1, int(chunk))):
+        if cancel is not None and cancel.is_set():
+            break
+        batch = plan.files[i:i + chunk]
+        try:
+            if service.enqueue_downloads(username, batch):
+                ok += len(batch)
+            else:
+                failed += len(batch)
+        except Exception:
+            failed += len(batch)
+        if on_progress is not None:
+            on_progress(ok + failed, total)
+    return ok, failed
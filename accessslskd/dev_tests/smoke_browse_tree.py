@@ -0,0 +1,60 @@
+"""
+Headless smoke test for the browse model: paths resolve through the trie,
+folder totals stay equal to a full recount after a refresh, and snapshots
+round-trip.
+"""
+from __future__ import annotations
+
+
+def _browse_result():
+    dirs = []
+    for a in range(20):
+        for b in range(5):
+            dirs.append({
+                "name": f"@@share\\Music\\Artist {a}\\Album {b}",
+                "files": [{"filename": f"{t:02d} Track.flac", "size": 1000 + t} for t in range(10)],
+            })
+    dirs.append({"name": "@@share\\Video", "files": [{"filename": "clip.mkv", "size": 5000}]})
+    return {"directories": dirs, "lockedDirectories": [{"name": "@@share\\Private", "files": []}]}
+
+
+def main() -> int:
+    from accessslskd.browse_cache import decode, encode
+    from accessslskd.browse_tree import BrowseTree
+
+    tree = BrowseTree.from_browse("u", _browse_result())
+    album = tree.node_for("@@share/Music/Artist 3/Album 2")
+    if album is None or album.path != "@@share\\Music\\Artist 3\\Album 2" or len(album.files) != 10:
+        print("FAIL: path lookup")
+        return 1
+    if not tree.node_for("@@share\\Private").locked or tree.node_for("@@share\\Nope") is not None:
+        print("FAIL: locked/missing folders")
+        return 1
+    root = tree.root.stats
+    if root.files != 1001 or root.audio != 1000 or root.video != 1 or root.depth != 4:
+        print(f"FAIL: totals {root.files} {root.audio} {root.video} {root.depth}")
+        return 1
+
+    # Refresh one album: totals update along its path only, and match a recount
+    tree.update_from_listing(album.path, [{
+        "name": album.path,
+        "files": [{"filename": "01 Track.flac", "size": 1}],
+        "directories": [{"name": "Scans", "files": [{"filename": "cover.jpg", "size": 7}]}],
+    }])
+    incremental = (tree.root.stats.bytes, tree.root.stats.files, tree.root.stats.depth)
+    tree.aggregate()
+    full = (tree.root.stats.bytes, tree.root.stats.files, tree.root.stats.depth)
+    if incremental != full or full[1] != 1001 - 10 + 2 or full[2] != 5:
+        print(f"FAIL: incremental totals {incremental} != {full}")
+        return 1
+
+    restored = decode(encode(tree))
+    if restored is None or restored.signature() != tree.signature() or not restored.node_for("@@share\\Private").locked:
+        print("FAIL: snapshot round trip")
+        return 1
+    print("PASS: browse tree lookup, folder totals and snapshots.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
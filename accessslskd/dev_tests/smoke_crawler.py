@@ -0,0 +1,101 @@
+"""
+Headless smoke test for recursive directory downloads: the crawl stops at
+the file, size and depth limits, a complete tree is never fetched, nested
+selections are crawled once, and enqueueing goes in chunks that count
+failures separately.
+"""
+from __future__ import annotations
+
+import threading
+
+
+def _share():
+    # share\A (10 files) -> B1..B3 (10 each) -> C (10 each): 7 folders, 70 files of 100 B
+    dirs = {"share\\A": ["share\\A\\B1", "share\\A\\B2", "share\\A\\B3"]}
+    for i in (1, 2, 3):
+        dirs[f"share\\A\\B{i}"] = [f"share\\A\\B{i}\\C"]
+        dirs[f"share\\A\\B{i}\\C"] = []
+    return dirs
+
+
+def _files(path):
+    return [{"filename": f"{t:02d}.mp3", "size": 100} for t in range(10)]
+
+
+class _FakeService:
+    def __init__(self, fail_chunks=()):
+        self.dirs = _share()
+        self.fetched = []
+        self.fail_chunks = set(fail_chunks)
+        self.chunks = []
+        self._lock = threading.Lock()
+
+    def user_directory(self, username, path):
+        with self._lock:
+            self.fetched.append(path)
+        subs = [{"name": s.rsplit("\\", 1)[-1]} for s in self.dirs[path]]
+        return [{"name": path, "files": _files(path), "directories": subs}]
+
+    def enqueue_downloads(self, username, files):
+        n = len(self.chunks)
+        self.chunks.append(len(files))
+        if n in self.fail_chunks:
+            if n % 2:
+                raise RuntimeError("enqueue failed")
+            return False
+        return True
+
+
+def main() -> int:
+    from accessslskd.browse_tree import BrowseTree
+    from accessslskd.crawler import CrawlLimits, crawl, enqueue_plan, outermost_paths
+    from accessslskd.perf_log import perf
+
+    perf.set_enabled(False)
+    svc = _FakeService()
+    plan = crawl(svc, BrowseTree("u"), "share\\A")
+    if (len(plan.files), plan.directories, plan.total_bytes, plan.truncated) != (70, 7, 7000, "") \
+            or sorted(svc.fetched) != sorted(svc.dirs):
+        print(f"FAIL: full crawl {plan.describe()} fetched {len(svc.fetched)}")
+        return 1
+
+    checks = [
+        (CrawlLimits(max_files=25), 25, "stopped at 25 files", 0),
+        (CrawlLimits(max_bytes=2550), 25, "stopped at", 0),
+        (CrawlLimits(max_depth=1), 40, "", 3),
+    ]
+    for limits, files, truncated, too_deep in checks:
+        p = crawl(_FakeService(), BrowseTree("u"), "share\\A", limits=limits)
+        stopped = p.truncated.startswith(truncated) if truncated else not p.truncated
+        if len(p.files) != files or not stopped or p.too_deep != too_deep:
+            print(f"FAIL: limits {limits}: {p.describe()}")
+            return 1
+
+    # A complete tree answers everything locally
+    result = {"directories": [{"name": p, "files": _files(p)} for p in _share()]}
+    tree = BrowseTree.from_browse("u", result)
+    svc = _FakeService()
+    p = crawl(svc, tree, "share\\A")
+    if len(p.files) != 70 or svc.fetched:
+        print(f"FAIL: complete tree fetched {svc.fetched}")
+        return 1
+
+    # A folder selected along with its parent is only crawled through the parent
+    picked = outermost_paths(["share\\A\\B1", "share\\A", "share\\A\\B1\\C", "share\\AB", "share\\A"])
+    if picked != ["share\\A", "share\\AB"]:
+        print(f"FAIL: outermost paths {picked}")
+        return 1
+
+    # 70 files in chunks of 20: the 2nd chunk raises and the 3rd is refused
+    svc = _FakeService(fail_chunks=(1, 2))
+    seen = []
+    ok, failed = enqueue_plan(svc, "u", plan, chunk=20, on_progress=lambda done, total: seen.append((done, total)))
+    if (ok, failed) != (30, 40) or svc.chunks != [20, 20, 20, 10] or seen[-1] != (70, 70):
+        print(f"FAIL: enqueue chunks {svc.chunks} -> ({ok}, {failed})")
+        return 1
+    print("PASS: crawl limits, complete-tree crawl, nested selections and chunked enqueue.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,127 @@
+"""
+Headless smoke test for the janitor: only finished searches and transfers
+past the cutoff are picked, the search on screen is never deleted, and
+transfers stay on slskd until they are actually in the history.
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+
+NOW = 1714564800.0  # 2024-05-01T12:00:00Z
+
+
+def _iso(hours_ago: float) -> str:
+    from datetime import datetime, timezone
+    return datetime.fromtimestamp(NOW - hours_ago * 3600, timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+class _FakeService:
+    def __init__(self):
+        self.searches = [
+            {"id": "old", "isComplete": True, "endedAt": _iso(3)},
+            {"id": "shown", "isComplete": True, "endedAt": _iso(3)},
+            {"id": "running", "isComplete": False, "startedAt": _iso(3)},
+            {"id": "recent", "isComplete": True, "endedAt": _iso(0.5)},
+            {"id": "no-end", "isComplete": True, "startedAt": _iso(5)},
+        ]
+        files = [
+            {"id": "done-old", "state": "Completed, Succeeded", "endedAt": _iso(48)},
+            {"id": "failed-old", "state": "Completed, Errored", "endedAt": _iso(30)},
+            {"id": "done-new", "state": "Completed, Succeeded", "endedAt": _iso(2)},
+            {"id": "queued", "state": "Queued, Remotely"},
+        ]
+        for f in files:
+            f.update(filename=f"Music\\{f['id']}.flac", size=100, bytesTransferred=100, averageSpeed=1.0)
+        self.downloads = [{"username": "alice", "directories": [{"directory": "Music", "files": files}]}]
+        self.deleted = []
+        self.removed = []
+
+    def list_searches(self):
+        return self.searches
+
+    def delete_search(self, sid):
+        self.deleted.append(sid)
+        return True
+
+    def list_downloads_all(self, include_removed=False):
+        return self.downloads
+
+    def list_uploads_all(self, include_removed=False):
+        return []
+
+    def cancel_download(self, username, fid, remove=False):
+        self.removed.append(fid)
+        return True
+
+    def cancel_upload(self, username, fid, remove=False):
+        return True
+
+
+def main() -> int:
+    from accessslskd import janitor as jmod
+    from accessslskd.history import TransferHistory
+    from accessslskd.perf_log import perf
+
+    perf.set_enabled(False)
+    with tempfile.TemporaryDirectory() as d:
+        svc = _FakeService()
+        jmod.history = TransferHistory(os.path.join(d, "history.sqlite3"))
+        jan = jmod.Janitor(lambda: svc, search_retention_min=60, transfer_retention_hours=24,
+                           protect_searches=lambda: ["shown"])
+        rep = jan.sweep(now=NOW)
+        if sorted(svc.deleted) != ["no-end", "old"] or rep.searches_deleted != 2:
+            print(f"FAIL: searches deleted {svc.deleted}")
+            return 1
+        if sorted(svc.removed) != ["done-old", "failed-old"] or rep.transfers_removed != 2 or rep.errors:
+            print(f"FAIL: transfers removed {svc.removed} errors {rep.errors}")
+            return 1
+        rows = jmod.history.by_user("alice", direction="download")
+        if sorted(r["transfer_id"] for r in rows) != ["done-old", "failed-old"] \
+                or min(r["completed_at"] for r in rows) != NOW - 48 * 3600:
+            print("FAIL: archived rows")
+            return 1
+        jmod.history.close()
+
+        # 0 turns a half off
+        svc2 = _FakeService()
+        jmod.Janitor(lambda: svc2, search_retention_min=0, transfer_retention_hours=0).sweep(now=NOW)
+        if svc2.deleted or svc2.removed:
+            print("FAIL: zero retention still cleaned up")
+            return 1
+
+        # History can't be written (its directory doesn't exist): nothing is removed
+        svc3 = _FakeService()
+        jmod.history = TransferHistory(os.path.join(d, "missing", "history.sqlite3"))
+        rep = jmod.Janitor(lambda: svc3, search_retention_min=0, transfer_retention_hours=24).sweep(now=NOW)
+        if svc3.removed or not rep.errors:
+            print(f"FAIL: removed {svc3.removed} after a failed history write")
+            return 1
+        # A write that fails once: nothing is removed, and the next sweep archives and removes
+        class _FlakyHistory(TransferHistory):
+            fail = True
+
+            def _write(self, batch):
+                if self.fail:
+                    self.fail = False
+                    raise OSError("disk full")
+                super()._write(batch)
+
+        svc4 = _FakeService()
+        jmod.history = _FlakyHistory(os.path.join(d, "flaky.sqlite3"))
+        jan4 = jmod.Janitor(lambda: svc4, search_retention_min=0, transfer_retention_hours=24)
+        rep = jan4.sweep(now=NOW)
+        if svc4.removed or not rep.errors:
+            print(f"FAIL: removed {svc4.removed} after a failed write")
+            return 1
+        jan4.sweep(now=NOW)
+        if sorted(svc4.removed) != ["done-old", "failed-old"] or len(jmod.history.archived_ids(svc4.removed)) != 2:
+            print(f"FAIL: retry after a failed write removed {svc4.removed}")
+            return 1
+        jmod.history.close()
+    print("PASS: janitor cutoffs, protected search and archive-before-remove.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,53 @@
+"""
+Headless smoke test for the message archive: repeated messages are stored
+once, and text, user and room filters find the same messages with and
+without FTS5.
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+
+
+def main() -> int:
+    from accessslskd.message_archive import MessageArchive, pm_rows, room_rows
+
+    rows = room_rows("Jazz", [
+        {"timestamp": f"2024-05-01T12:{i // 60:02d}:{i % 60:02d}Z", "username": f"user{i % 10}",
+         "message": f"message {i} about coltrane" if i % 100 == 0 else f"message {i}"}
+        for i in range(1000)
+    ])
+    rows += pm_rows("Bob", [
+        {"timestamp": "2024-05-02T10:00:00Z", "username": "Bob", "direction": "In", "message": "Got that Coltrane rip?"},
+        {"timestamp": "2024-05-02T10:01:00Z", "username": "Bob", "direction": "Out", "message": "Sure, 100% lossless"},
+    ])
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "archive.sqlite3")
+        arch = MessageArchive(path)
+        arch.record(rows)
+        # A second session re-reads the same messages (e.g. the whole conversation again)
+        again = MessageArchive(path)
+        again.record(rows)
+        again.close()
+        if arch.count() != len(rows):
+            print(f"FAIL: dedupe {arch.count()} != {len(rows)}")
+            return 1
+        for fts in (arch.has_fts, False):
+            arch._fts = fts
+            hits = arch.search("coltr")
+            if len(hits) != 11 or hits[0]["channel"] != "Bob" or hits[0]["kind"] != "pm":
+                print(f"FAIL: text search (fts={fts}) {len(hits)}")
+                return 1
+            if len(arch.search("coltrane", user="USER0", channel="jazz")) != 10:
+                print(f"FAIL: user/room filters (fts={fts})")
+                return 1
+            if len(arch.search("", channel="bob")) != 2 or len(arch.search("LOSSLESS")) != 1:
+                print(f"FAIL: conversation filter (fts={fts})")
+                return 1
+        arch.close()
+    print("PASS: message archive dedupe and search.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,75 @@
+"""
+Headless smoke test for room polling: a full server buffer still yields its
+new messages, messages sharing a timestamp (or without a usable one) are
+told apart by content, and quiet rooms back off until news or selection
+resets them.
+"""
+from __future__ import annotations
+
+
+def _msg(sec, text=None, user="alice"):
+    ts = sec if isinstance(sec, str) else f"2024-05-01T12:{sec // 60:02d}:{sec % 60:02d}Z"
+    return {"timestamp": ts, "username": user, "message": text if text is not None else f"m{sec}"}
+
+
+def main() -> int:
+    from accessslskd.room_buffer import (
+        BACKGROUND_INTERVAL_S, BACKGROUND_MAX_S, SELECTED_INTERVAL_S, SELECTED_MAX_S, RoomBuffer, RoomPollSchedule,
+    )
+
+    buf = RoomBuffer(capacity=5)
+    first = buf.merge([_msg(s) for s in range(10)])
+    if len(first) != 10 or len(buf) != 5 or not buf.primed:
+        print(f"FAIL: first poll {len(first)} new, {len(buf)} kept")
+        return 1
+    # The server's buffer is full: same length, oldest dropped, three new at the end
+    new = buf.merge([_msg(s) for s in range(3, 13)])
+    if [m["message"] for m in new] != ["m10", "m11", "m12"]:
+        print(f"FAIL: full server buffer {[m['message'] for m in new]}")
+        return 1
+    # Same second as the newest seen: only the unseen text is new, once
+    poll = [_msg(s) for s in range(4, 13)] + [_msg(12, "same second", user="bob")]
+    if len(buf.merge(poll)) != 1 or buf.merge(poll) or buf.last_new != 0:
+        print("FAIL: same-timestamp messages")
+        return 1
+    # No usable timestamp: deduped by content at the current mark
+    odd = [_msg("not a time", "hello")]
+    if len(buf.merge(odd)) != 1 or buf.merge(odd):
+        print("FAIL: unparseable timestamps")
+        return 1
+
+    sched = RoomPollSchedule()
+    sched.set_rooms(["a", "b"], now=0.0)
+    if sched.next_due(None, 0.0) != "a" or sched.next_due(None, 0.5) != "a" or sched.next_due("b", 1.0) != "b":
+        print("FAIL: staggered start")
+        return 1
+    now = 0.0
+    for _ in range(20):
+        sched.polled("a", selected=False, had_new=False, now=now)
+    due = sched._state["a"]
+    if due[1] != BACKGROUND_MAX_S or due[0] != now + BACKGROUND_MAX_S:
+        print(f"FAIL: background backoff {due}")
+        return 1
+    sched.polled("a", selected=False, had_new=True, now=now)
+    if sched._state["a"][1] != BACKGROUND_INTERVAL_S:
+        print("FAIL: news resets the interval")
+        return 1
+    sched.poll_now("a", now=5.0)
+    if sched.next_due("a", 5.0) != "a" or sched._state["a"][1] != SELECTED_INTERVAL_S:
+        print("FAIL: selecting polls now")
+        return 1
+    for _ in range(20):
+        sched.polled("a", selected=True, had_new=False, now=5.0)
+    if sched._state["a"][1] != SELECTED_MAX_S:
+        print("FAIL: selected backoff cap")
+        return 1
+    sched.set_rooms(["b"], now=6.0)
+    if "a" in sched or "b" not in sched:
+        print("FAIL: left rooms are dropped")
+        return 1
+    print("PASS: room buffer dedupe and poll backoff.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
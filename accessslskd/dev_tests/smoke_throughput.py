@@ -0,0 +1,47 @@
+"""
+Headless smoke test for the throughput tracker: rates and ETAs follow the
+samples, memory stays bounded and finished transfers are evicted.
+"""
+from __future__ import annotations
+
+
+def main() -> int:
+    from accessslskd.throughput import RING_SIZE, ThroughputTracker
+
+    tr = ThroughputTracker()
+    k = ("download", "u", "1")
+    # 100 KB/s steady for 40 samples, 10 MB file
+    for i in range(40):
+        tr.sample("download", [(k, i * 100_000, 10_000_000)], now=float(i))
+    if abs(tr.rate(k) - 100_000) > 1:
+        print(f"FAIL: rate {tr.rate(k)}")
+        return 1
+    if abs(tr.eta(k) - (10_000_000 - 39 * 100_000) / 100_000) > 0.01:
+        print(f"FAIL: eta {tr.eta(k)}")
+        return 1
+    ring = tr._rings[k]
+    if ring.count != RING_SIZE or len(ring.times) != RING_SIZE:
+        print("FAIL: ring grew past its size")
+        return 1
+
+    # Uploads sampled on their own must not evict downloads
+    tr.sample("upload", [(("upload", "v", "2"), 0, 100)], now=40.0)
+    if tr.rate(k) is None:
+        print("FAIL: upload sample evicted a download")
+        return 1
+    down, up = tr.bandwidth()
+    if abs(down - 100_000) > 1 or up != 0:
+        print(f"FAIL: bandwidth {down} {up}")
+        return 1
+
+    # Finished: no longer in the active set
+    tr.sample("download", [], now=41.0)
+    if tr.rate(k) is not None or len(tr) != 1:
+        print("FAIL: finished transfer not evicted")
+        return 1
+    print("PASS: throughput tracker rates, ETA and eviction.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
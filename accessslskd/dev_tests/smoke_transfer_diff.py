@@ -0,0 +1,99 @@
+"""
+Headless smoke test for the transfer store diff: after an update the store
+must mirror the new snapshot, and a refresh where only a few transfers moved
+must only report those rows as touched. The directory roll-up folded from
+those updates must match one rebuilt from scratch.
+"""
+from __future__ import annotations
+
+import random
+
+
+def _file(i, state="Queued, Remotely", pct=0.0):
+    return {"id": f"id-{i}", "filename": f"f{i}.flac", "size": 1000, "state": state, "percentComplete": pct, "averageSpeed": 0}
+
+
+def _payload(files):
+    # Group into slskd's user -> directories -> files shape
+    users = {}
+    for i, f in files:
+        users.setdefault(f"user{i % 50}", {}).setdefault(f"dir{i % 400}", []).append(f)
+    return [
+        {"username": u, "directories": [{"directory": d, "files": fs} for d, fs in dirs.items()]}
+        for u, dirs in users.items()
+    ]
+
+
+def _expected_ids(payload):
+    return [f["id"] for t in payload for d in t["directories"] for f in d["files"]]
+
+
+def main() -> int:
+    from accessslskd.transfer_store import COL_STATE, TransferGroups, TransferStore
+
+    files = [(i, _file(i)) for i in range(10000)]
+    store = TransferStore()
+    store.update(_payload(files), [])
+    moved = {3, 40, 500, 7000, 9999}
+    files2 = [(i, _file(i, "InProgress", 12.5) if i in moved else f) for i, f in files]
+    upd = store.update(_payload(files2), [])
+    if upd.rows_touched != 5 or upd.structure_changed:
+        print(f"FAIL: expected 5 touched rows, got {upd.rows_touched}")
+        return 1
+    if sorted(store.get(k).cell(COL_STATE) for k in upd.changed) != ["InProgress"] * 5:
+        print("FAIL: changed rows do not carry the new state")
+        return 1
+
+    rnd = random.Random(7)
+    cur = [(i, _file(i)) for i in range(300)]
+    store = TransferStore()
+    store.update(_payload(cur), [])
+    groups = TransferGroups()
+    groups.rebuild(store)
+    next_id = 300
+    for _ in range(50):
+        nxt = [x for x in cur if rnd.random() > 0.05]
+        for _ in range(rnd.randint(0, 10)):
+            nxt.append((next_id, _file(next_id)))
+            next_id += 1
+        nxt = [(i, _file(i, "InProgress", 50.0) if rnd.random() < 0.05 else f) for i, f in nxt]
+        payload = _payload(nxt)
+        upd = store.update(payload, [])
+        groups.apply(store, upd)
+        ref = TransferGroups()
+        ref.rebuild(store)
+        if [(g.key, len(g.members), g.state_text(), g.size) for g in groups] != \
+                [(g.key, len(g.members), g.state_text(), g.size) for g in ref]:
+            print("FAIL: incremental directory groups differ from a rebuild")
+            return 1
+        ids = [rec.file_id for rec in store]
+        if ids != _expected_ids(payload):
+            print("FAIL: store order differs from snapshot (inserts/removals)")
+            return 1
+        if any(store.index_of(rec.key) != i for i, rec in enumerate(store)):
+            print("FAIL: index out of sync with order")
+            return 1
+        cur = nxt
+
+    # One feed refreshing on its own must not disturb the other direction
+    before = [rec.key for rec in store]
+    upd = store.update_feed("upload", _payload([(0, _file("u0"))]))
+    if [k for k in (rec.key for rec in store) if k[0] == "download"] != before or len(upd.inserted) != 1:
+        print("FAIL: upload feed update disturbed downloads")
+        return 1
+    upd = store.update_feed("upload", [])
+    if len(upd.removed) != 1 or [rec.key for rec in store] != before:
+        print("FAIL: emptied upload feed")
+        return 1
+
+    store.set_sort(COL_STATE, ascending=False)
+    states = [rec.state for rec in store]
+    if states != sorted(states, key=str.lower, reverse=True):
+        print("FAIL: sort by state")
+        return 1
+    print("PASS: transfer store patches in place and touches only changed rows.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
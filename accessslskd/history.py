@@ -0,0 +1,212 @@
+"""
+Local transfer history.
+
+Once a transfer reaches a terminal state (succeeded, errored, rejected, timed
+out, cancelled) it is appended to ``history.sqlite3`` in the config
+directory, so slskd's own list can be purged freely. A ``BatchWriter``
+inserts them one transaction per batch. Rows are keyed by the slskd transfer
+id, so seeing the same finished transfer on every refresh is harmless, and
+each row carries the time slskd says the transfer ended.
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .batch_writer import BatchWriter
+from .perf_log import perf_timer
+from .timeutil import parse_time
+
+HISTORY_FILE_NAME = "history.sqlite3"
+# Writer wakes at most this often once rows arrive
+FLUSH_INTERVAL_S = 1.0
+MAX_BATCH = 1000
+MAX_PENDING = 50000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transfers (
+    transfer_id  TEXT PRIMARY KEY,
+    direction    TEXT NOT NULL,
+    username     TEXT NOT NULL,
+    directory    TEXT NOT NULL,
+    filename     TEXT NOT NULL,
+    basename     TEXT NOT NULL,
+    size         INTEGER NOT NULL,
+    bytes        INTEGER NOT NULL,
+    state        TEXT NOT NULL,
+    ok           INTEGER NOT NULL,
+    avg_speed    REAL NOT NULL,
+    completed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_transfers_user ON transfers (username, completed_at);
+CREATE INDEX IF NOT EXISTS ix_transfers_file ON transfers (basename, size);
+CREATE INDEX IF NOT EXISTS ix_transfers_dir ON transfers (directory);
+CREATE INDEX IF NOT EXISTS ix_transfers_completed ON transfers (completed_at);
+"""
+
+# Row tuple, in column order
+HistoryRow = Tuple[str, str, str, str, str, str, int, int, str, int, float, float]
+
+
+def _basename(path: str) -> str:
+    return path.replace("\\", "/").rsplit("/", 1)[-1].lower()
+
+
+def row_from_record(rec: Any, completed_at: Optional[float] = None) -> HistoryRow:
+    """History row for a ``TransferRecord`` in a terminal state."""
+    if completed_at is None:
+        completed_at = parse_time(rec.ended_at)
+    return (
+        rec.file_id,
+        rec.direction,
+        rec.username,
+        rec.directory,
+        rec.filename,
+        _basename(rec.filename),
+        int(rec.size),
+        int(rec.bytes_done),
+        rec.state,
+        1 if "succeeded" in rec.state.lower() else 0,
+        float(rec.speed),
+        time.time() if completed_at is None else float(completed_at),
+    )
+
+
+def row_from_file(direction: str, username: str, directory: str, f: Dict[str, Any],
+                  completed_at: Optional[float] = None) -> HistoryRow:
+    """History row for a raw slskd transfer file dict in a terminal state."""
+    filename = str(f.get("filename", "") or "")
+    state = str(f.get("state", "") or "")
+    return (
+        str(f.get("id", "") or ""),
+        direction,
+        username,
+        directory,
+        filename,
+        _basename(filename),
+        int(f.get("size", 0) or 0),
+        int(f.get("bytesTransferred", 0) or 0),
+        state,
+        1 if "succeeded" in state.lower() else 0,
+        float(f.get("averageSpeed", 0) or 0),
+        time.time() if completed_at is None else float(completed_at),
+    )
+
+
+class TransferHistory:
+    def __init__(self, path: Optional[str] = None):
+        self._path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._writer: BatchWriter[HistoryRow] = BatchWriter(
+            self._write, name="history", flush_interval_s=FLUSH_INTERVAL_S,
+            max_batch=MAX_BATCH, max_pending=MAX_PENDING,
+        )
+
+    @property
+    def dropped(self) -> int:
+        return self._writer.dropped
+
+    def record(self, rows: Iterable[HistoryRow]) -> int:
+        """Queue rows for writing. Safe from any thread; never blocks. Returns rows queued."""
+        # Keyed by transfer id: skips re-queuing the same finished transfer on every refresh
+        return self._writer.put_many(rows, key=lambda row: row[0])
+
+    def flush(self) -> None:
+        """Write everything queued so far (queries flush first)."""
+        self._writer.flush()
+
+    def _write(self, batch: List[HistoryRow]) -> None:
+        with self._db_lock:
+            with perf_timer("history.write", rows=len(batch)):
+                conn = self._connect()
+                with conn:
+                    conn.executemany("INSERT OR IGNORE INTO transfers VALUES (?,?,?,?,?,?,?,?,?,?,?,?)", batch)
+
+    # Queries (call off the UI thread)
+    def by_user(self, username: str, *, direction: Optional[str] = "download", limit: int = 500) -> List[Dict[str, Any]]:
+        """What was transferred with this user, newest first."""
+        sql = "SELECT * FROM transfers WHERE username = ?"
+        args: List[Any] = [username]
+        if direction:
+            sql += " AND direction = ?"
+            args.append(direction)
+        sql += " ORDER BY completed_at DESC LIMIT ?"
+        args.append(int(limit))
+        return self._query(sql, args)
+
+    def has_downloaded(self, filename: str, size: int) -> bool:
+        """True if a file with this name and size was downloaded successfully before (from anyone)."""
+        rows = self._query(
+            "SELECT 1 AS hit FROM transfers WHERE basename = ? AND size = ? AND direction = 'download' AND ok = 1 LIMIT 1",
+            [_basename(filename), int(size)],
+        )
+        return bool(rows)
+
+    def archived_ids(self, transfer_ids: Iterable[str]) -> Set[str]:
+        """Which of these transfer ids are in the history (written, not just queued)."""
+        ids = list(dict.fromkeys(transfer_ids))
+        found: Set[str] = set()
+        # Stay well under SQLite's bound-parameter limit
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            rows = self._query(
+                f"SELECT transfer_id FROM transfers WHERE transfer_id IN ({','.join('?' * len(chunk))})", chunk
+            )
+            found.update(r["transfer_id"] for r in rows)
+        return found
+
+    def bandwidth_stats(self, since: Optional[float] = None) -> Dict[str, Dict[str, float]]:
+        """Per direction: transfers, succeeded, bytes and mean speed (bytes/s) since a wall time."""
+        rows = self._query(
+            "SELECT direction, COUNT(*) AS transfers, SUM(ok) AS succeeded, SUM(bytes) AS bytes,"
+            " AVG(CASE WHEN ok = 1 THEN avg_speed END) AS avg_speed"
+            " FROM transfers WHERE completed_at >= ? GROUP BY direction",
+            [float(since or 0)],
+        )
+        return {
+            r["direction"]: {
+                "transfers": int(r["transfers"] or 0),
+                "succeeded": int(r["succeeded"] or 0),
+                "bytes": int(r["bytes"] or 0),
+                "avg_speed": float(r["avg_speed"] or 0.0),
+            }
+            for r in rows
+        }
+
+    def close(self) -> None:
+        self.flush()
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _query(self, sql: str, args: List[Any]) -> List[Dict[str, Any]]:
+        self.flush()
+        with self._db_lock:
+            with perf_timer("history.query") as info:
+                cur = self._connect().execute(sql, args)
+                names = [d[0] for d in cur.description]
+                out = [dict(zip(names, r)) for r in cur.fetchall()]
+                info["rows"] = len(out)
+        return out
+
+    def _connect(self) -> sqlite3.Connection:
+        # Caller holds _db_lock
+        if self._conn is None:
+            if not self._path:
+                from .config import _app_config_dir
+                self._path = os.path.join(_app_config_dir(), HISTORY_FILE_NAME)
+            conn = sqlite3.connect(self._path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+
+# Process-wide history used by the app
+history = TransferHistory()
@@ -0,0 +1,197 @@
+"""
+Background clean-up of state that slskd would otherwise keep forever.
+
+Searches are stopped but never deleted, and finished transfers stay listed
+until someone clicks Remove Completed; both make every API payload (and
+slskd's memory) grow. On a slow schedule the janitor:
+
+- deletes finished searches that ended more than ``search_retention_min``
+  minutes ago (never the one the Search tab is showing), and
+- archives finished transfers older than ``transfer_retention_hours`` to the
+  local history, then removes them from slskd.
+
+A retention of 0 turns that half off.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .bulk import run_bulk
+from .history import history, row_from_file
+from .perf_log import perf_event
+from .timeutil import parse_time
+from .transfer_store import state_bucket
+
+# Removal calls are spread over a couple of threads; this is background work.
+JANITOR_WORKERS = 2
+# First sweep this long after start, so it doesn't compete with startup
+FIRST_SWEEP_DELAY_S = 120.0
+
+
+@dataclass
+class SweepReport:
+    searches_deleted: int = 0
+    transfers_archived: int = 0
+    transfers_removed: int = 0
+    errors: int = 0
+
+    def describe(self) -> str:
+        if not (self.searches_deleted or self.transfers_removed or self.errors):
+            return "Clean-up: nothing to reclaim."
+        msg = f"Clean-up: deleted {self.searches_deleted} search(es), removed {self.transfers_removed} finished transfer(s)"
+        if self.transfers_archived:
+            msg += f" ({self.transfers_archived} archived to history)"
+        if self.errors:
+            msg += f", {self.errors} error(s)"
+        return msg + "."
+
+
+def stale_searches(searches: Iterable[Dict[str, Any]], cutoff: float, protect: Set[str]) -> List[str]:
+    """Ids of complete searches that ended (or started, if no end time) before ``cutoff``."""
+    out = []
+    for s in searches or []:
+        sid = str(s.get("id", "") or "")
+        if not sid or sid in protect or not s.get("isComplete"):
+            continue
+        ended = parse_time(s.get("endedAt")) or parse_time(s.get("startedAt"))
+        if ended is not None and ended < cutoff:
+            out.append(sid)
+    return out
+
+
+def stale_transfers(direction: str, transfers: Iterable[Dict[str, Any]], cutoff: float) -> List[Tuple[str, str, Dict[str, Any], float]]:
+    """(username, directory, file, ended at) for finished transfers that ended before ``cutoff``."""
+    out = []
+    for t in transfers or []:
+        username = str(t.get("username", "") or "")
+        for d in (t.get("directories") or []):
+            dname = str(d.get("directory", "") or "")
+            for f in (d.get("files") or []):
+                if state_bucket(str(f.get("state", "") or "")) not in ("done", "failed"):
+                    continue
+                ended = parse_time(f.get("endedAt"))
+                if ended is not None and ended < cutoff:
+                    out.append((username, dname, f, ended))
+    return out
+
+
+class Janitor:
+    def __init__(
+        self,
+        get_service: Callable[[], Any],
+        *,
+        interval_min: int = 30,
+        search_retention_min: int = 60,
+        transfer_retention_hours: int = 24,
+        protect_searches: Optional[Callable[[], Iterable[str]]] = None,
+        on_report: Optional[Callable[[SweepReport], None]] = None,
+    ):
+        self.get_service = get_service
+        self.interval_min = max(1, int(interval_min))
+        self.search_retention_min = max(0, int(search_retention_min))
+        self.transfer_retention_hours = max(0, int(transfer_retention_hours))
+        self.protect_searches = protect_searches
+        self.on_report = on_report
+        self._sweep_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        # A fresh event per run, so a thread still sleeping from before stays stopped
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(self._stop,), name="janitor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """End the scheduled sweeps (a sweep already running finishes)."""
+        self._stop.set()
+        self._thread = None
+
+    def run_now(self, on_report: Optional[Callable[[SweepReport], None]] = None) -> None:
+        """Sweep on a worker thread right away; the report goes to ``on_report`` (or the default)."""
+        threading.Thread(target=self._sweep_and_report, args=(on_report,), name="janitor-now", daemon=True).start()
+
+    def sweep(self, now: Optional[float] = None) -> SweepReport:
+        """One pass over searches and transfers. Runs on the calling thread."""
+        t = time.time() if now is None else now
+        rep = SweepReport()
+        service = self.get_service()
+        if service is None:
+            return rep
+        with self._sweep_lock:
+            t0 = time.perf_counter()
+            if self.search_retention_min:
+                self._sweep_searches(service, t - self.search_retention_min * 60, rep)
+            if self.transfer_retention_hours:
+                self._sweep_transfers(service, t - self.transfer_retention_hours * 3600, rep)
+            perf_event(
+                "janitor.sweep", (time.perf_counter() - t0) * 1000.0,
+                rows=rep.searches_deleted + rep.transfers_removed, errors=rep.errors,
+            )
+        return rep
+
+    def _sweep_searches(self, service, cutoff: float, rep: SweepReport) -> None:
+        try:
+            searches = service.list_searches() or []
+        except Exception:
+            rep.errors += 1
+            return
+        protect = set(self.protect_searches() if self.protect_searches is not None else ())
+        ids = stale_searches(searches, cutoff, protect)
+        res = run_bulk(ids, service.delete_search, max_workers=JANITOR_WORKERS)
+        rep.searches_deleted += res.ok
+        rep.errors += res.failed
+
+    def _sweep_transfers(self, service, cutoff: float, rep: SweepReport) -> None:
+        for direction, fetch, cancel in (
+            ("download", service.list_downloads_all, service.cancel_download),
+            ("upload", service.list_uploads_all, service.cancel_upload),
+        ):
+            try:
+                stale = stale_transfers(direction, fetch(include_removed=False), cutoff)
+            except Exception:
+                rep.errors += 1
+                continue
+            if not stale:
+                continue
+            # Archive first; only what is actually in the history leaves slskd
+            rep.transfers_archived += history.record(row_from_file(direction, u, d, f, ended) for u, d, f, ended in stale)
+            try:
+                archived = history.archived_ids(str(item[2].get("id", "") or "") for item in stale)
+            except Exception:
+                rep.errors += 1
+                continue
+            written = [item for item in stale if str(item[2].get("id", "") or "") in archived]
+            if len(written) != len(stale):
+                rep.errors += 1
+            if not written:
+                continue
+            res = run_bulk(
+                written,
+                lambda item, cancel=cancel: cancel(item[0], str(item[2].get("id", "")), remove=True),
+                max_workers=JANITOR_WORKERS,
+            )
+            rep.transfers_removed += res.ok
+            rep.errors += res.failed
+
+    def _sweep_and_report(self, on_report: Optional[Callable[[SweepReport], None]] = None) -> None:
+        try:
+            rep = self.sweep()
+        except Exception:
+            rep = SweepReport(errors=1)
+        cb = on_report or self.on_report
+        if cb is not None:
+            cb(rep)
+
+    def _run(self, stop: threading.Event) -> None:
+        if stop.wait(FIRST_SWEEP_DELAY_S):
+            return
+        while True:
+            self._sweep_and_report()
+            if stop.wait(self.interval_min * 60):
+                return
@@ -0,0 +1,245 @@
+"""
+Local archive of room and private messages.
+
+slskd only keeps a room's recent buffer and the conversations it still has
+in memory. Every message the app sees is appended to ``archive.sqlite3`` in
+the config directory through a ``BatchWriter``. Rows are unique on (kind,
+channel, timestamp, user, text), so re-reading a whole conversation is
+harmless.
+
+Message text is indexed with SQLite's FTS5 when the sqlite3 build has it, so
+searching months of history is an index lookup. Without FTS5 the same search
+falls back to a LIKE scan, which is slower but still correct.
+"""
+from __future__ import annotations
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .batch_writer import BatchWriter
+from .perf_log import perf_timer
+from .timeutil import parse_time
+
+ARCHIVE_FILE_NAME = "archive.sqlite3"
+# Writer wakes at most this often once rows arrive
+FLUSH_INTERVAL_S = 1.0
+MAX_BATCH = 1000
+MAX_PENDING = 50000
+DEFAULT_LIMIT = 200
+
+KIND_ROOM = "room"
+KIND_PM = "pm"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id        INTEGER PRIMARY KEY,
+    kind      TEXT NOT NULL,
+    channel   TEXT NOT NULL,
+    username  TEXT NOT NULL,
+    direction TEXT NOT NULL,
+    message   TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    at        REAL NOT NULL,
+    UNIQUE (kind, channel, timestamp, username, message)
+);
+CREATE INDEX IF NOT EXISTS ix_messages_channel ON messages (channel COLLATE NOCASE, at);
+CREATE INDEX IF NOT EXISTS ix_messages_user ON messages (username COLLATE NOCASE, at);
+CREATE INDEX IF NOT EXISTS ix_messages_at ON messages (at);
+"""
+
+# External-content FTS table kept in step by a trigger (rows are never updated or deleted)
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    message, content='messages', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS messages_fts_ai AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts (rowid, message) VALUES (new.id, new.message);
+END;
+"""
+
+# (kind, channel, username, direction, message, timestamp, at)
+ArchiveRow = Tuple[str, str, str, str, str, str, float]
+
+_WORD = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+def _row(kind: str, channel: str, m: Dict[str, Any]) -> ArchiveRow:
+    ts = str(m.get("timestamp", "") or "")
+    at = parse_time(ts)
+    direction = "out" if str(m.get("direction", "") or "").lower() == "out" else "in"
+    return (
+        kind,
+        channel,
+        str(m.get("username", "") or ""),
+        direction,
+        str(m.get("message", "") or ""),
+        ts,
+        time.time() if at is None else at,
+    )
+
+
+def room_rows(room: str, msgs: Iterable[Dict[str, Any]]) -> List[ArchiveRow]:
+    return [_row(KIND_ROOM, room, m) for m in msgs or []]
+
+
+def pm_rows(username: str, msgs: Iterable[Dict[str, Any]]) -> List[ArchiveRow]:
+    """Rows for one conversation; the channel is the other user."""
+    return [_row(KIND_PM, username, m) for m in msgs or []]
+
+
+def fts_query(text: str) -> str:
+    """Words of ``text`` as an FTS5 query: all must match, the last as a prefix."""
+    words = _WORD.findall((text or "").lower())
+    if not words:
+        return ""
+    parts = ['"%s"' % w for w in words]
+    parts[-1] += "*"
+    return " ".join(parts)
+
+
+def _like_escape(s: str) -> str:
+    return s.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class MessageArchive:
+    def __init__(self, path: Optional[str] = None):
+        self._path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._fts = False
+        self._db_lock = threading.Lock()
+        self._writer: BatchWriter[ArchiveRow] = BatchWriter(
+            self._write, name="archive", flush_interval_s=FLUSH_INTERVAL_S,
+            max_batch=MAX_BATCH, max_pending=MAX_PENDING,
+        )
+
+    @property
+    def dropped(self) -> int:
+        return self._writer.dropped
+
+    @property
+    def has_fts(self) -> bool:
+        with self._db_lock:
+            self._connect()
+            return self._fts
+
+    def record(self, rows: Iterable[ArchiveRow]) -> int:
+        """Queue rows for writing. Safe from any thread; never blocks. Returns rows queued."""
+        # Keyed like the UNIQUE constraint: conversations are re-read whole on every open
+        return self._writer.put_many(rows, key=lambda row: (row[0], row[1], row[5], row[2], row[4]))
+
+    def flush(self) -> None:
+        """Write everything queued so far (searches flush first)."""
+        self._writer.flush()
+
+    def _write(self, batch: List[ArchiveRow]) -> None:
+        with self._db_lock:
+            with perf_timer("archive.write", rows=len(batch)):
+                conn = self._connect()
+                with conn:
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO messages"
+                        " (kind, channel, username, direction, message, timestamp, at)"
+                        " VALUES (?,?,?,?,?,?,?)",
+                        batch,
+                    )
+
+    # Queries (call off the UI thread)
+    def search(
+        self,
+        text: str = "",
+        *,
+        user: str = "",
+        channel: str = "",
+        kind: Optional[str] = None,
+        limit: int = DEFAULT_LIMIT,
+    ) -> List[Dict[str, Any]]:
+        """Messages matching every given filter, newest first.
+
+        ``text`` matches words in the message (the last one as a prefix),
+        ``user`` the sender, ``channel`` the room or conversation partner;
+        the last two ignore case.
+        """
+        self.flush()
+        where: List[str] = []
+        args: List[Any] = []
+        with self._db_lock:
+            self._connect()
+            fts = self._fts
+        match = fts_query(text) if fts else ""
+        if match:
+            where.append("m.id IN (SELECT rowid FROM messages_fts WHERE messages_fts MATCH ?)")
+            args.append(match)
+        elif text.strip():
+            for w in text.split():
+                where.append("m.message LIKE ? ESCAPE '\\'")
+                args.append(f"%{_like_escape(w)}%")
+        if user.strip():
+            where.append("m.username = ? COLLATE NOCASE")
+            args.append(user.strip())
+        if channel.strip():
+            where.append("m.channel = ? COLLATE NOCASE")
+            args.append(channel.strip())
+        if kind:
+            where.append("m.kind = ?")
+            args.append(kind)
+        sql = "SELECT m.kind, m.channel, m.username, m.direction, m.message, m.timestamp, m.at FROM messages m"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY m.at DESC LIMIT ?"
+        args.append(int(limit))
+        return self._query(sql, args)
+
+    def count(self) -> int:
+        rows = self._query("SELECT COUNT(*) AS n FROM messages", [])
+        return int(rows[0]["n"]) if rows else 0
+
+    def close(self) -> None:
+        self.flush()
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _query(self, sql: str, args: List[Any]) -> List[Dict[str, Any]]:
+        self.flush()
+        with self._db_lock:
+            with perf_timer("archive.query") as info:
+                cur = self._connect().execute(sql, args)
+                names = [d[0] for d in cur.description]
+                out = [dict(zip(names, r)) for r in cur.fetchall()]
+                info["rows"] = len(out)
+        return out
+
+    def _connect(self) -> sqlite3.Connection:
+        # Caller holds _db_lock
+        if self._conn is None:
+            if not self._path:
+                from .config import _app_config_dir
+                self._path = os.path.join(_app_config_dir(), ARCHIVE_FILE_NAME)
+            conn = sqlite3.connect(self._path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            try:
+                had_fts = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'messages_fts'"
+                ).fetchone() is not None
+                conn.executescript(_FTS_SCHEMA)
+                if not had_fts:
+                    # Index rows written earlier by a build without FTS5
+                    with conn:
+                        conn.execute("INSERT INTO messages_fts (messages_fts) VALUES ('rebuild')")
+                self._fts = True
+            except sqlite3.OperationalError:
+                # sqlite3 built without FTS5: search falls back to LIKE
+                self._fts = False
+            self._conn = conn
+        return self._conn
+
+
+# Process-wide archive used by the app
+message_archive = MessageArchive()
@@ -0,0 +1,146 @@
+"""
+Structured performance event log.
+
+Every timed operation (API call, flatten/filter pass, list repaint, ...) is
+recorded as one JSON object per line in a rotating ``perf.jsonl`` file inside
+the config directory, through a ``BatchWriter``.
+"""
+from __future__ import annotations
+
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from .batch_writer import BatchWriter
+
+PERF_FILE_NAME = "perf.jsonl"
+# Rotate at ~5 MB and keep a handful of old files (perf.jsonl.1 .. .5)
+MAX_BYTES = 5 * 1024 * 1024
+BACKUP_COUNT = 5
+# Writer wakes at most this often once events arrive; they are written in batches.
+FLUSH_INTERVAL_S = 2.0
+MAX_BATCH = 2000
+# Bound memory if the disk is slow or unavailable; extra events are dropped.
+MAX_PENDING = 20000
+
+
+def payload_size(obj: Any) -> int:
+    """Best-effort size of an API result: number of top-level items."""
+    try:
+        if obj is None:
+            return 0
+        if isinstance(obj, (list, tuple, dict, str, bytes)):
+            return len(obj)
+    except Exception:
+        pass
+    return 0
+
+
+class PerfLog:
+    def __init__(self, path: Optional[str] = None, *, max_bytes: int = MAX_BYTES, backups: int = BACKUP_COUNT):
+        self._path = path
+        self._max_bytes = int(max_bytes)
+        self._backups = int(backups)
+        self._enabled = True
+        self._writer: BatchWriter[Dict[str, Any]] = BatchWriter(
+            self._write, name="perf-log", flush_interval_s=FLUSH_INTERVAL_S,
+            max_batch=MAX_BATCH, max_pending=MAX_PENDING,
+        )
+
+    def set_enabled(self, enabled: bool) -> None:
+        self._enabled = bool(enabled)
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    @property
+    def dropped(self) -> int:
+        return self._writer.dropped
+
+    def event(self, op: str, duration_ms: float, *, payload: int = 0, rows: int = 0, **extra: Any) -> None:
+        """Queue one event. Safe to call from any thread; never blocks."""
+        if not self._enabled:
+            return
+        ev: Dict[str, Any] = {
+            "ts": round(time.monotonic(), 6),
+            "wall": round(time.time(), 3),
+            "op": op,
+            "ms": round(float(duration_ms), 3),
+            "payload": int(payload or 0),
+            "rows": int(rows or 0),
+        }
+        if extra:
+            ev.update(extra)
+        self._writer.put(ev)
+
+    @contextmanager
+    def timer(self, op: str, **extra: Any) -> Iterator[Dict[str, Any]]:
+        """
+        Time a block. The yielded dict can be filled with ``payload``/``rows``
+        (or any extra field) before the block exits.
+        """
+        info: Dict[str, Any] = {"payload": 0, "rows": 0}
+        info.update(extra)
+        t0 = time.perf_counter()
+        ok = True
+        try:
+            yield info
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            ms = (time.perf_counter() - t0) * 1000.0
+            fields = dict(info)
+            payload = fields.pop("payload", 0)
+            rows = fields.pop("rows", 0)
+            if not ok:
+                fields["ok"] = False
+            self.event(op, ms, payload=payload, rows=rows, **fields)
+
+    def flush(self) -> None:
+        """Write everything queued so far."""
+        self._writer.flush()
+
+    def _resolve_path(self) -> str:
+        if not self._path:
+            from .config import _app_config_dir
+            self._path = os.path.join(_app_config_dir(), PERF_FILE_NAME)
+        return self._path
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        # Runs on the writer thread; a failed batch is counted as dropped there
+        lines = "".join(json.dumps(ev, separators=(",", ":"), default=str) + "\n" for ev in batch)
+        path = self._resolve_path()
+        self._maybe_rotate(path)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    def _maybe_rotate(self, path: str) -> None:
+        try:
+            if os.path.getsize(path) < self._max_bytes:
+                return
+        except OSError:
+            return
+        for i in range(self._backups - 1, 0, -1):
+            src = f"{path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{path}.{i + 1}")
+        if self._backups > 0:
+            os.replace(path, f"{path}.1")
+        else:
+            os.remove(path)
+
+
+# Process-wide log used by the app
+perf = PerfLog()
+
+
+def perf_event(op: str, duration_ms: float, *, payload: int = 0, rows: int = 0, **extra: Any) -> None:
+    perf.event(op, duration_ms, payload=payload, rows=rows, **extra)
+
+
+def perf_timer(op: str, **extra: Any):
+    return perf.timer(op, **extra)
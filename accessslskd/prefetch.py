@@ -0,0 +1,113 @@
+"""
+Background prefetch of folders the user is likely to open next.
+
+When the browser has no full share tree (the browse failed or is still
+running), every folder open is a round trip. After a folder is shown, its
+unloaded subfolders are handed to ``Prefetcher.request``; a couple of worker
+threads fetch them, after a short delay so arrowing quickly through folders
+doesn't fire a request for each one passed over. Each request starts a new
+generation: queued paths from the previous folder are dropped as soon as the
+user moves on. Fetches already running finish and are still delivered, since
+the result is just as useful to the local model.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Iterable, Optional, Set, Tuple
+
+from .perf_log import perf_event
+
+# Concurrent prefetch calls; user-initiated opens should never queue behind many of these
+PREFETCH_WORKERS = 2
+# Wait this long after a request before fetching (navigation usually moves on sooner)
+PREFETCH_DELAY_S = 0.4
+# Subfolders prefetched per opened folder
+MAX_PER_REQUEST = 24
+
+
+class Prefetcher:
+    def __init__(
+        self,
+        fetch: Callable[[str], Any],
+        deliver: Callable[[str, Any], None],
+        *,
+        max_workers: int = PREFETCH_WORKERS,
+        delay_s: float = PREFETCH_DELAY_S,
+    ):
+        # ``fetch(path)`` runs on a worker; so does ``deliver(path, listing or None)``
+        self.fetch = fetch
+        self.deliver = deliver
+        self.max_workers = max(1, int(max_workers))
+        self.delay_s = float(delay_s)
+        self._cv = threading.Condition()
+        self._generation = 0
+        self._not_before = 0.0
+        self._queue: Deque[Tuple[int, str]] = deque()
+        self._inflight: Set[str] = set()
+        self._workers = 0
+
+    def request(self, paths: Iterable[str]) -> int:
+        """Replace whatever is queued with these paths. Returns the new generation."""
+        with self._cv:
+            self._generation += 1
+            gen = self._generation
+            self._queue.clear()
+            for p in list(paths)[:MAX_PER_REQUEST]:
+                if p not in self._inflight:
+                    self._queue.append((gen, p))
+            self._not_before = time.monotonic() + self.delay_s
+            while self._workers < min(self.max_workers, len(self._queue)):
+                self._workers += 1
+                threading.Thread(target=self._run, name="prefetch", daemon=True).start()
+            self._cv.notify_all()
+            return gen
+
+    def cancel(self) -> None:
+        """Drop everything queued (e.g. the frame is closing)."""
+        with self._cv:
+            self._generation += 1
+            self._queue.clear()
+            self._cv.notify_all()
+
+    def is_inflight(self, path: str) -> bool:
+        with self._cv:
+            return path in self._inflight
+
+    def _next(self) -> Optional[str]:
+        with self._cv:
+            while True:
+                if not self._queue:
+                    self._workers -= 1
+                    return None
+                wait = self._not_before - time.monotonic()
+                if wait > 0:
+                    self._cv.wait(wait)
+                    continue
+                gen, path = self._queue.popleft()
+                if gen != self._generation or path in self._inflight:
+                    continue
+                self._inflight.add(path)
+                return path
+
+    def _run(self) -> None:
+        while True:
+            path = self._next()
+            if path is None:
+                return
+            t0 = time.perf_counter()
+            listing = None
+            try:
+                listing = self.fetch(path)
+            except Exception:
+                pass
+            finally:
+                with self._cv:
+                    self._inflight.discard(path)
+            perf_event("browse.prefetch", (time.perf_counter() - t0) * 1000.0, ok=listing is not None)
+            try:
+                # None on failure, so a caller waiting on this path can fetch it itself
+                self.deliver(path, listing)
+            except Exception:
+                pass
@@ -0,0 +1,128 @@
+"""
+Concurrent, TTL-cached lookup of users' upload queue lengths.
+
+Queued downloads show the remote user's queue length, which costs one
+``user_info`` round trip per user. Lookups run on a small pool of worker
+threads, are deduplicated against requests already queued or in flight, and
+visible rows jump the queue. Results expire after a TTL; expired values are
+still returned (flagged stale) until the refresh lands.
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_TTL_S = 300.0
+# Don't retry a failed lookup for this long
+FAILURE_BACKOFF_S = 60.0
+
+PRIORITY_VISIBLE = 0
+PRIORITY_NORMAL = 1
+
+
+class QueueLengthResolver:
+    def __init__(
+        self,
+        lookup: Callable[[str], int],
+        on_result: Optional[Callable[[], None]] = None,
+        *,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        ttl_s: float = DEFAULT_TTL_S,
+    ):
+        self._lookup = lookup
+        self._on_result = on_result
+        self._max_workers = max(1, int(max_workers))
+        self.ttl_s = float(ttl_s)
+        self._lock = threading.Lock()
+        # username -> (queue length, fetched at monotonic)
+        self._cache: Dict[str, Tuple[int, float]] = {}
+        self._failed: Dict[str, float] = {}
+        # Pending lookups: heap of (priority, seq, username) plus best priority per user
+        self._heap: list = []
+        self._queued: Dict[str, int] = {}
+        self._in_flight: Set[str] = set()
+        self._changed: Set[str] = set()
+        self._workers = 0
+        self._seq = itertools.count()
+
+    def get(self, username: str) -> Optional[Tuple[int, bool]]:
+        """(queue length, is_stale) or None if never resolved."""
+        entry = self._cache.get(username)
+        if entry is None:
+            return None
+        q, at = entry
+        return q, (time.monotonic() - at) > self.ttl_s
+
+    def needs_lookup(self, username: str) -> bool:
+        entry = self._cache.get(username)
+        return entry is None or (time.monotonic() - entry[1]) > self.ttl_s
+
+    def request(self, usernames: Iterable[str], priority: Iterable[str] = ()) -> int:
+        """Queue lookups for users that are missing or stale. Returns how many were queued."""
+        prio = set(priority)
+        now = time.monotonic()
+        added = 0
+        with self._lock:
+            for u in usernames:
+                if not u or u in self._in_flight or not self.needs_lookup(u):
+                    continue
+                failed_at = self._failed.get(u)
+                if failed_at is not None and now - failed_at < FAILURE_BACKOFF_S:
+                    continue
+                p = PRIORITY_VISIBLE if u in prio else PRIORITY_NORMAL
+                if self._queued.get(u, PRIORITY_NORMAL + 1) <= p:
+                    continue
+                # A higher-priority duplicate supersedes the queued entry
+                self._queued[u] = p
+                heapq.heappush(self._heap, (p, next(self._seq), u))
+                added += 1
+            while self._workers < self._max_workers and self._workers < len(self._queued):
+                self._workers += 1
+                threading.Thread(target=self._run, name="queue-length", daemon=True).start()
+        return added
+
+    def take_changed(self) -> Set[str]:
+        """Usernames resolved since the last call."""
+        with self._lock:
+            out, self._changed = self._changed, set()
+        return out
+
+    def _next(self) -> Optional[str]:
+        while self._heap:
+            p, _, u = heapq.heappop(self._heap)
+            if self._queued.get(u) != p:
+                continue
+            del self._queued[u]
+            self._in_flight.add(u)
+            return u
+        return None
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                u = self._next()
+                if u is None:
+                    self._workers -= 1
+                    return
+            try:
+                q = int(self._lookup(u))
+                ok = True
+            except Exception:
+                q, ok = 0, False
+            with self._lock:
+                self._in_flight.discard(u)
+                if ok:
+                    self._cache[u] = (q, time.monotonic())
+                    self._failed.pop(u, None)
+                    self._changed.add(u)
+                else:
+                    self._failed[u] = time.monotonic()
+            if ok and self._on_result is not None:
+                try:
+                    self._on_result()
+                except Exception:
+                    pass
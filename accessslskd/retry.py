@@ -0,0 +1,267 @@
+"""
+Automatic retry of failed downloads, with alternate-source discovery.
+
+Downloads that end Errored or TimedOut are first retried from the same user
+with increasing backoff. Rejected downloads, and those that keep failing,
+trigger a short search for the same file name; the best other user sharing a
+file of the same name and size (proven peers first, then free slot, shortest
+queue and fastest upload) is enqueued instead. Searches run one at a time, are capped
+per hour, and are stopped and deleted as soon as they've been read. Failures
+already listed when auto-retry is switched on are left alone.
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from .perf_log import perf_event
+from .user_stats import user_stats
+
+# Delay before each same-source retry; its length is the number of retries.
+SAME_SOURCE_BACKOFF_S = (60.0, 300.0)
+# Alternate users tried per file before giving up
+MAX_ALTERNATES = 3
+# Search budget: at most this many retry searches per rolling hour
+SEARCHES_PER_HOUR = 20
+# How long a retry search collects responses
+SEARCH_WAIT_S = 20.0
+SEARCH_POLL_S = 4.0
+
+# (username, filename) identifying one download
+Identity = Tuple[str, str]
+
+
+def basename(path: str) -> str:
+    return re.split(r"[\\/]", path or "")[-1]
+
+
+def search_query_for(filename: str) -> str:
+    """Search text for a file: its name without extension, punctuation as spaces."""
+    stem = os.path.splitext(basename(filename))[0]
+    words = re.sub(r"[\W_]+", " ", stem).split()
+    return " ".join(words)
+
+
+def is_transient_failure(state: str) -> bool:
+    """Errored / TimedOut may succeed from the same user later; Rejected won't."""
+    return "rejected" not in (state or "").lower()
+
+
+def rank_candidates(
+    responses: Iterable[Dict[str, Any]], name: str, size: int, exclude: Set[str]
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """(username, file) sharing a file with the same basename and size, best first."""
+    want = name.lower()
+    scored = []
+    for r in responses or []:
+        user = str(r.get("username", "") or "")
+        if not user or user in exclude:
+            continue
+        for f in (r.get("files") or []):
+            if int(f.get("size", 0) or 0) != size or basename(str(f.get("filename", ""))).lower() != want:
+                continue
+            key = (
+                user_stats.tier(user),
+                not bool(r.get("hasFreeUploadSlot")),
+                int(r.get("queueLength", 0) or 0),
+                -int(r.get("uploadSpeed", 0) or 0),
+            )
+            scored.append((key, user, f))
+            break
+    scored.sort(key=lambda x: x[0])
+    return [(user, f) for _, user, f in scored]
+
+
+class _Job:
+    __slots__ = ("origin", "name", "size", "same_source", "tried", "alternates", "done")
+
+    def __init__(self, origin: Identity, size: int):
+        self.origin = origin
+        self.name = basename(origin[1])
+        self.size = size
+        self.same_source = 0
+        self.tried: Set[str] = {origin[0]}
+        self.alternates = 0
+        self.done = False
+
+
+class RetryScheduler:
+    """
+    Feed it the failed download records after each refresh via ``observe``.
+    Work happens on one background thread; ``on_event(msg)`` reports progress
+    and ``on_enqueued()`` fires after anything was re-enqueued.
+    """
+
+    def __init__(self, service, on_event: Optional[Callable[[str], None]] = None,
+                 on_enqueued: Optional[Callable[[], None]] = None):
+        self.service = service
+        self.on_event = on_event
+        self.on_enqueued = on_enqueued
+        self.enabled = False
+        self._cv = threading.Condition()
+        # (due monotonic, seq, identity, use alternate source)
+        self._heap: List[Tuple[float, int, Identity, bool]] = []
+        self._seq = itertools.count()
+        self._jobs: Dict[Identity, _Job] = {}
+        # Failed transfer ids already acted on (slskd keeps them listed)
+        self._seen: Set[str] = set()
+        # False until the first feed after enabling: failures listed then predate auto-retry
+        self._primed = False
+        self._searches: Deque[float] = deque()
+        self._thread: Optional[threading.Thread] = None
+
+    def observe(self, failed: Iterable[Any], listed: Optional[Set[Identity]] = None) -> None:
+        """
+        Schedule retries for newly failed download records. ``listed`` holds
+        every (username, filename) slskd still lists for downloads; jobs for
+        files no longer among them are forgotten.
+        """
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        failed = list(failed)
+        with self._cv:
+            # Forget ids that left the failed feed, so the sets track what slskd lists
+            self._seen.intersection_update(rec.file_id for rec in failed)
+            if listed is not None:
+                pending = {item[2] for item in self._heap}
+                for ident in [i for i in self._jobs if i not in listed and i not in pending]:
+                    del self._jobs[ident]
+            if not self._primed:
+                # The backlog at enable time is old news; only later failures are retried
+                self._primed = True
+                self._seen.update(rec.file_id for rec in failed)
+                return
+            for rec in failed:
+                if rec.file_id in self._seen:
+                    continue
+                self._seen.add(rec.file_id)
+                ident = (rec.username, rec.filename)
+                job = self._jobs.get(ident)
+                if job is None:
+                    job = self._jobs[ident] = _Job(ident, rec.size)
+                if job.done:
+                    continue
+                if is_transient_failure(rec.state) and job.alternates == 0 \
+                        and job.same_source < len(SAME_SOURCE_BACKOFF_S):
+                    due = now + SAME_SOURCE_BACKOFF_S[job.same_source]
+                    heapq.heappush(self._heap, (due, next(self._seq), ident, False))
+                else:
+                    heapq.heappush(self._heap, (now, next(self._seq), ident, True))
+            if self._heap and (self._thread is None or not self._thread.is_alive()):
+                self._thread = threading.Thread(target=self._run, name="retry", daemon=True)
+                self._thread.start()
+            self._cv.notify()
+
+    def set_enabled(self, enabled: bool) -> None:
+        with self._cv:
+            if bool(enabled) != self.enabled:
+                # Re-enabling starts from a fresh backlog
+                self._primed = False
+            self.enabled = bool(enabled)
+            if not self.enabled:
+                self._heap.clear()
+            self._cv.notify()
+
+    def _emit(self, msg: str) -> None:
+        if self.on_event is not None:
+            try:
+                self.on_event(msg)
+            except Exception:
+                pass
+
+    def _run(self) -> None:
+        while True:
+            with self._cv:
+                while True:
+                    if not self._heap:
+                        self._thread = None
+                        return
+                    due = self._heap[0][0]
+                    wait = due - time.monotonic()
+                    if wait <= 0:
+                        _, _, ident, alternate = heapq.heappop(self._heap)
+                        break
+                    self._cv.wait(wait)
+                job = self._jobs.get(ident)
+                # A search needs budget; if spent, come back when the oldest expires
+                if job is not None and not job.done and alternate:
+                    now = time.monotonic()
+                    while self._searches and now - self._searches[0] > 3600:
+                        self._searches.popleft()
+                    if len(self._searches) >= SEARCHES_PER_HOUR:
+                        heapq.heappush(self._heap, (self._searches[0] + 3600, next(self._seq), ident, True))
+                        continue
+                    self._searches.append(now)
+            if job is None or job.done or not self.enabled:
+                continue
+            try:
+                if alternate:
+                    ok = self._retry_alternate(job)
+                else:
+                    ok = self._retry_same(job, ident)
+            except Exception as e:
+                self._emit(f"Retry of {job.name} failed: {e}")
+                ok = False
+            if ok and self.on_enqueued is not None:
+                self.on_enqueued()
+
+    def _retry_same(self, job: _Job, ident: Identity) -> bool:
+        job.same_source += 1
+        ok = bool(self.service.enqueue_downloads(ident[0], [{"filename": ident[1], "size": job.size}]))
+        if ok:
+            self._emit(f"Retrying {job.name} from {ident[0]} (attempt {job.same_source}).")
+        return ok
+
+    def _retry_alternate(self, job: _Job) -> bool:
+        if job.alternates >= MAX_ALTERNATES:
+            job.done = True
+            self._emit(f"Gave up on {job.name}: no working source after {job.alternates} alternates.")
+            return False
+        query = search_query_for(job.name)
+        if not query:
+            job.done = True
+            return False
+        t0 = time.perf_counter()
+        res = self.service.start_search(query)
+        sid = res.id
+        responses: List[Dict[str, Any]] = []
+        try:
+            deadline = time.monotonic() + SEARCH_WAIT_S
+            while time.monotonic() < deadline:
+                time.sleep(SEARCH_POLL_S)
+                st = self.service.get_search_state(sid, include_responses=False) or {}
+                if st.get("isComplete"):
+                    break
+            responses = self.service.get_search_responses(sid) or []
+        finally:
+            self.service.stop_search(sid)
+            self.service.delete_search(sid)
+        candidates = rank_candidates(responses, job.name, job.size, job.tried)
+        perf_event("retry.search", (time.perf_counter() - t0) * 1000.0, payload=len(responses), rows=len(candidates))
+        if not candidates:
+            job.alternates += 1
+            if job.alternates >= MAX_ALTERNATES:
+                job.done = True
+                self._emit(f"Gave up on {job.name}: no other source found.")
+            else:
+                # Sources come and go; look again later
+                with self._cv:
+                    heapq.heappush(self._heap, (time.monotonic() + 600, next(self._seq), job.origin, True))
+            return False
+        user, f = candidates[0]
+        job.tried.add(user)
+        job.alternates += 1
+        ok = bool(self.service.enqueue_downloads(user, [{"filename": f.get("filename"), "size": job.size}]))
+        if ok:
+            # If this source fails too, it continues the same job
+            with self._cv:
+                self._jobs[(user, str(f.get("filename", "")))] = job
+            self._emit(f"Retrying {job.name} from alternate source {user}.")
+        return ok
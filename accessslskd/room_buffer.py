@@ -0,0 +1,131 @@
+"""
+Per-room message buffers.
+
+slskd returns a room's whole server-side buffer on every poll. Comparing
+only its length misses new messages once that buffer is full (the count
+stops changing) and re-renders everything otherwise. ``RoomBuffer.merge``
+instead keeps a high-water mark (the newest timestamp seen) plus the keys
+(timestamp, user, text) of messages at that mark. Only messages past it are
+new, and those are returned for appending. Each room keeps at most
+``ROOM_BUFFER_SIZE`` messages in a ring, so busy rooms stay bounded, and
+counts what arrived while it wasn't on screen.
+
+``RoomPollSchedule`` decides which joined room to poll next: the one on
+screen often, the others less often, and quiet rooms less and less.
+"""
+from __future__ import annotations
+
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from .timeutil import parse_time
+
+ROOM_BUFFER_SIZE = 500
+
+# (timestamp, username, message)
+MessageKey = Tuple[str, str, str]
+
+
+def message_key(m: Dict[str, Any]) -> MessageKey:
+    return (str(m.get("timestamp", "") or ""), str(m.get("username", "") or ""), str(m.get("message", "") or ""))
+
+
+def format_room_message(m: Dict[str, Any]) -> str:
+    return f"[{m.get('timestamp','')}] {m.get('username','')}: {m.get('message','')}\n"
+
+
+class RoomBuffer:
+    def __init__(self, capacity: int = ROOM_BUFFER_SIZE):
+        self.messages: Deque[Dict[str, Any]] = deque(maxlen=int(capacity))
+        # Newest message time seen (epoch seconds), and the keys seen at exactly that time
+        self.high_water: Optional[float] = None
+        self._at_high_water: Set[MessageKey] = set()
+        # New messages since the room was last on screen, and in the latest merge
+        self.unread = 0
+        self.last_new = 0
+
+    @property
+    def primed(self) -> bool:
+        """False until the first poll (whose backlog is history, not news)."""
+        return self.high_water is not None
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    def merge(self, msgs: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Add a poll's messages; returns the ones not seen before, oldest first."""
+        new: List[Dict[str, Any]] = []
+        for m in msgs or []:
+            key = message_key(m)
+            t = parse_time(key[0])
+            if t is None:
+                # Unordered; dedupe by key at the current mark
+                t = self.high_water if self.high_water is not None else 0.0
+            if self.high_water is not None:
+                if t < self.high_water:
+                    continue
+                if t == self.high_water and key in self._at_high_water:
+                    continue
+            if self.high_water is None or t > self.high_water:
+                self.high_water = t
+                self._at_high_water = set()
+            self._at_high_water.add(key)
+            self.messages.append(m)
+            new.append(m)
+        self.last_new = len(new)
+        return new
+
+
+# Poll cadence: the room on screen, every other joined room, and the ceiling
+# quiet rooms back off to (x1.5 per poll without news).
+SELECTED_INTERVAL_S = 3.0
+BACKGROUND_INTERVAL_S = 15.0
+SELECTED_MAX_S = 10.0
+BACKGROUND_MAX_S = 120.0
+BACKOFF_FACTOR = 1.5
+# Newly joined rooms are spread this far apart so they don't all poll at once
+STAGGER_S = 1.0
+
+
+class RoomPollSchedule:
+    """When each joined room is next due. One room is polled per tick."""
+
+    def __init__(self):
+        # room -> [due (monotonic), current interval]
+        self._state: Dict[str, List[float]] = {}
+
+    def __contains__(self, room: str) -> bool:
+        return room in self._state
+
+    def set_rooms(self, rooms: Iterable[str], now: float) -> None:
+        rooms = list(rooms)
+        for r in list(self._state):
+            if r not in rooms:
+                del self._state[r]
+        fresh = [r for r in rooms if r not in self._state]
+        for i, r in enumerate(fresh):
+            self._state[r] = [now + i * STAGGER_S, BACKGROUND_INTERVAL_S]
+
+    def poll_now(self, room: str, now: float) -> None:
+        """Make a room due immediately (it was just selected)."""
+        st = self._state.get(room)
+        if st is not None:
+            st[0] = now
+            st[1] = SELECTED_INTERVAL_S
+
+    def next_due(self, selected: Optional[str], now: float) -> Optional[str]:
+        if selected in self._state and self._state[selected][0] <= now:
+            return selected
+        best = None
+        for r, (due, _interval) in self._state.items():
+            if due <= now and (best is None or due < self._state[best][0]):
+                best = r
+        return best
+
+    def polled(self, room: str, *, selected: bool, had_new: bool, now: float) -> None:
+        st = self._state.get(room)
+        if st is None:
+            return
+        base, cap = (SELECTED_INTERVAL_S, SELECTED_MAX_S) if selected else (BACKGROUND_INTERVAL_S, BACKGROUND_MAX_S)
+        st[1] = base if had_new else min(cap, max(base, st[1] * BACKOFF_FACTOR))
+        st[0] = now + st[1]
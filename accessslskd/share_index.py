@@ -0,0 +1,146 @@
+"""
+Word index over one user's browsed shares.
+
+Built once per ``BrowseTree`` on a background thread, it maps every word in a
+folder or file name to the entries carrying it. A query matches an entry when
+each of its words appears in the entry's own name or in one of its parent
+folders' names, so "floyd wall" finds the album folder and "wall flesh" the
+track inside it. The last query word also matches as a prefix, for typing.
+Lookups start from the rarest word's entries, checking their ancestors and
+(for folders) what lies below them, so they take milliseconds even on a
+200k-file share instead of scanning every path.
+"""
+from __future__ import annotations
+
+import bisect
+import re
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from .browse_tree import BrowseFile, BrowseNode, BrowseTree
+from .perf_log import perf_event
+
+_WORD = re.compile(r"[^\W_]+", re.UNICODE)
+# Prefix matches considered for the last query word
+MAX_PREFIX_TOKENS = 300
+DEFAULT_LIMIT = 500
+# Entries examined below matching folders, per search
+MAX_WALK = 100000
+
+
+def tokenize(text: str) -> List[str]:
+    return _WORD.findall((text or "").lower())
+
+
+class ShareHit:
+    __slots__ = ("node", "file", "score")
+
+    def __init__(self, node: BrowseNode, file: Optional[BrowseFile], score: float):
+        # A folder hit has file None; a file hit has its folder as node
+        self.node = node
+        self.file = file
+        self.score = score
+
+    @property
+    def is_dir(self) -> bool:
+        return self.file is None
+
+    @property
+    def path(self) -> str:
+        return self.node.path if self.file is None else self.node.file_path(self.file)
+
+
+class ShareIndex:
+    def __init__(self, tree: BrowseTree):
+        self.tree = tree
+        # Entry id -> (folder node, file or None)
+        self._entries: List[Tuple[BrowseNode, Optional[BrowseFile]]] = []
+        self._postings: Dict[str, List[int]] = {}
+        # Entry ids of folders, by node identity, for ancestor checks
+        self._dir_entry: Dict[int, int] = {}
+        t0 = time.perf_counter()
+        for node in tree.root.walk():
+            if node is not tree.root:
+                self._add(node, None, node.name)
+            for f in node.files or ():
+                self._add(node, f, f.name)
+        self._tokens = sorted(self._postings)
+        perf_event("share_index.build", (time.perf_counter() - t0) * 1000.0,
+                   payload=len(self._tokens), rows=len(self._entries))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _add(self, node: BrowseNode, f: Optional[BrowseFile], name: str) -> None:
+        eid = len(self._entries)
+        self._entries.append((node, f))
+        if f is None:
+            self._dir_entry[id(node)] = eid
+        for tok in set(tokenize(name)):
+            self._postings.setdefault(tok, []).append(eid)
+
+    def _matching(self, word: str, prefix: bool) -> Set[int]:
+        if not prefix:
+            return set(self._postings.get(word, ()))
+        out: Set[int] = set()
+        i = bisect.bisect_left(self._tokens, word)
+        for tok in self._tokens[i:i + MAX_PREFIX_TOKENS]:
+            if not tok.startswith(word):
+                break
+            out.update(self._postings[tok])
+        return out
+
+    def search(self, query: str, limit: int = DEFAULT_LIMIT) -> List[ShareHit]:
+        words = tokenize(query)
+        if not words:
+            return []
+        t0 = time.perf_counter()
+        sets = [self._matching(w, prefix=(i == len(words) - 1)) for i, w in enumerate(words)]
+        rarest = min(sets, key=len)
+        found: Dict[int, ShareHit] = {}
+        budget = [MAX_WALK]
+
+        def consider(eid: int) -> bool:
+            node, f = self._entries[eid]
+            own = 0
+            for s in sets:
+                if eid in s:
+                    own += 1
+                elif not self._in_ancestors(node if f is not None else node.parent, s):
+                    return False
+            # Words in the entry's own name count most; folders, then shallower paths, first
+            found[eid] = ShareHit(node, f, own * 10.0 + (5.0 if f is None else 0.0) - node.depth * 0.1)
+            return True
+
+        for eid in rarest:
+            if eid in found or consider(eid):
+                continue
+            node, f = self._entries[eid]
+            if f is None:
+                # The rest of the words may be further down ("floyd wall" -> Pink Floyd\The Wall)
+                self._walk_below(eid, node, consider, budget)
+        hits = sorted(found.values(), key=lambda h: (-h.score, h.path.lower()))
+        perf_event("share_index.search", (time.perf_counter() - t0) * 1000.0, rows=len(hits))
+        return hits[:limit]
+
+    def _walk_below(self, eid: int, node: BrowseNode, consider, budget: List[int]) -> None:
+        # Entries are numbered in walk order: a folder, then its files
+        stack = [(eid, node)]
+        while stack and budget[0] > 0:
+            deid, d = stack.pop()
+            for k in range(len(d.files or ())):
+                consider(deid + 1 + k)
+            budget[0] -= 1 + len(d.files or ())
+            for c in d.children.values():
+                ceid = self._dir_entry[id(c)]
+                # A matching folder is reported instead of everything in it
+                if not consider(ceid):
+                    stack.append((ceid, c))
+
+    def _in_ancestors(self, node: Optional[BrowseNode], eids: Set[int]) -> bool:
+        while node is not None and node.parent is not None:
+            eid = self._dir_entry.get(id(node))
+            if eid is not None and eid in eids:
+                return True
+            node = node.parent
+        return False
@@ -5,18 +5,30 @@ import time
 from dataclasses import dataclass
 from typing import Any, Callable, Dict, List, Optional, Tuple
 
-# Try importing installed slskd_api; if missing, fall back to the user’s clone.
-try:
-    import slskd_api  # type: ignore
-except ModuleNotFoundError:
-    import sys, os
-    _fallback = r"C:\Users\admin\slskd-python-api"
-    if os.path.isdir(_fallback):
-        sys.path.insert(0, _fallback)
+# slskd_api (and requests underneath it) is imported on first connect rather than
+# at module import so the main window can appear sooner.
+_slskd_api = None
+
+
+def _load_slskd_api():
+    # Try importing installed slskd_api; if missing, fall back to the user’s clone.
+    global _slskd_api
+    if _slskd_api is not None:
+        return _slskd_api
+    try:
         import slskd_api  # type: ignore
-    else:
-        raise
-# (Optional debug removed; keep fallback import support)
+    except ModuleNotFoundError:
+        import sys, os
+        _fallback = r"C:\Users\admin\slskd-python-api"
+        if os.path.isdir(_fallback):
+            sys.path.insert(0, _fallback)
+            import slskd_api  # type: ignore
+        else:
+            raise
+    _slskd_api = slskd_api
+    return _slskd_api
+
+
 # The public PyPI build of slskd_api may omit apis._types in some versions.
 # Treat these as runtime-optional and use 'Any' stubs when missing.
 from typing import Any as _Any, TYPE_CHECKING
@@ -33,6 +45,8 @@ try:
             SearchResponseItem,
             SearchState,
             Transfer,
+            TransferedDirectory,
+            TransferedFile,
             UserRootDir,
         )
     else:
@@ -48,9 +62,12 @@ except Exception:
     SearchResponseItem = _Any  # type: ignore
     SearchState = _Any  # type: ignore
     Transfer = _Any  # type: ignore
+    TransferedDirectory = _Any  # type: ignore
+    TransferedFile = _Any  # type: ignore
     UserRootDir = _Any  # type: ignore
 
 from .config import AppConfig
+from .perf_log import payload_size, perf_timer
 
 
 class SlskServiceError(Exception):
@@ -94,7 +111,7 @@ class SlskService:
             else:
                 raise SlskServiceError("No credentials provided. Configure API key, token, or username/password.")
             try:
-                self._client = slskd_api.SlskdClient(**kwargs)
+                self._client = _load_slskd_api().SlskdClient(**kwargs)
                 # Sanity check connectivity
                 _ = self._client.application.state()
             except Exception as e:
@@ -103,8 +120,7 @@ class SlskService:
 
     # Application / status
     def app_state(self) -> dict:
-        self._ensure()
-        return self._client.application.state()
+        return self._call("application.state", lambda c: c.application.state())
 
     # Searches
     def start_search(self, query: str, *, timeout_ms: Optional[int] = None) -> SearchResult:
@@ -129,171 +145,123 @@ class SlskService:
             kwargs["searchTimeout"] = candidate
         except Exception:
             kwargs["searchTimeout"] = MIN_MS
-        st = self._client.searches.search_text(query, **kwargs)
+        st = self._call("searches.search_text", lambda c: c.searches.search_text(query, **kwargs))
         return SearchResult(id=st["id"], state=st)
 
     def get_search_state(self, search_id: str, include_responses: bool = True) -> SearchState:
-        self._ensure()
-        return self._client.searches.state(search_id, includeResponses=include_responses)
+        return self._call("searches.state", lambda c: c.searches.state(search_id, includeResponses=include_responses))
 
     def get_search_responses(self, search_id: str) -> List[SearchResponseItem]:
-        self._ensure()
-        return self._client.searches.search_responses(search_id)
+        return self._call("searches.search_responses", lambda c: c.searches.search_responses(search_id))
+
+    def list_searches(self) -> List[SearchState]:
+        """All searches slskd still holds (without responses)."""
+        return self._call("searches.get_all", lambda c: c.searches.get_all())
 
     def stop_search(self, search_id: str) -> bool:
-        self._ensure()
         try:
-            return bool(self._client.searches.stop(search_id))
+            return bool(self._call("searches.stop", lambda c: c.searches.stop(search_id)))
         except Exception:
             return False
 
     def delete_search(self, search_id: str) -> bool:
-        self._ensure()
         try:
-            return bool(self._client.searches.delete(search_id))
+            return bool(self._call("searches.delete", lambda c: c.searches.delete(search_id)))
         except Exception:
             return False
 
     # Transfers
     def enqueue_downloads(self, username: str, files: List[Dict[str, Any]]) -> bool:
-        self._ensure()
-        return self._client.transfers.enqueue(username, files)
+        return self._call("transfers.enqueue", lambda c: c.transfers.enqueue(username, files))
 
     def browse_user_root(self, username: str):
         """Fetch user's root directory listing."""
-        self._ensure()
-        return self._client.users.browse(username)
+        return self._call("users.browse", lambda c: c.users.browse(username))
 
     def user_directory(self, username: str, directory: str):
         """Fetch a specific directory for a user."""
-        self._ensure()
-        return self._client.users.directory(username, directory)
-
-    def enqueue_directory(self, username: str, directory: str, limit: Optional[int] = None) -> int:
-        """
-        Enqueue all files from a remote directory (and subdirectories if returned).
-        Returns count enqueued.
-        """
-        self._ensure()
-        items = self.user_directory(username, directory) or []
-
-        def iter_files(d):
-            # Be tolerant to shapes: some servers may return nested 'directories'
-            files = d.get("files") or []
-            for f in files:
-                # Build full remote path; if 'filename' already absolute, keep it
-                name = f.get("filename", "")
-                if name and (name.startswith("\\") or name.startswith("/") or ":" in name):
-                    full = name
-                else:
-                    sep = "\\" if "\\" in directory else "/"
-                    full = directory.rstrip("\\/") + sep + name
-                yield {"filename": full, "size": int(f.get("size", 0))}
-            for sub in d.get("directories", []) or []:
-                yield from iter_files(sub)
-
-        to_enqueue: List[Dict[str, Any]] = []
-        for d in items:
-            for f in iter_files(d):
-                to_enqueue.append(f)
-                if limit and len(to_enqueue) >= limit:
-                    break
-            if limit and len(to_enqueue) >= limit:
-                break
-        if not to_enqueue:
-            return 0
-        # API expects per-user batches; here it's same user
-        ok = self.enqueue_downloads(username, to_enqueue)
-        return len(to_enqueue) if ok else 0
+        return self._call("users.directory", lambda c: c.users.directory(username, directory))
 
     def list_downloads_all(self, include_removed: bool = False) -> List[Transfer]:
-        self._ensure()
-        return self._client.transfers.get_all_downloads(includeRemoved=include_removed)
+        return self._call("transfers.get_all_downloads", lambda c: c.transfers.get_all_downloads(includeRemoved=include_removed))
 
     def list_uploads_all(self, include_removed: bool = False) -> List[Transfer]:
-        self._ensure()
-        return self._client.transfers.get_all_uploads(includeRemoved=include_removed)
+        return self._call("transfers.get_all_uploads", lambda c: c.transfers.get_all_uploads(includeRemoved=include_removed))
 
     def cancel_download(self, username: str, file_id: str, remove: bool = False) -> bool:
-        self._ensure()
-        return self._client.transfers.cancel_download(username, file_id, remove=remove)
+        return self._call("transfers.cancel_download", lambda c: c.transfers.cancel_download(username, file_id, remove=remove))
 
     def remove_completed_downloads(self) -> bool:
-        self._ensure()
-        return self._client.transfers.remove_completed_downloads()
+        return self._call("transfers.remove_completed_downloads", lambda c: c.transfers.remove_completed_downloads())
 
     def cancel_upload(self, username: str, file_id: str, remove: bool = False) -> bool:
-        self._ensure()
-        return self._client.transfers.cancel_upload(username, file_id, remove=remove)
+        return self._call("transfers.cancel_upload", lambda c: c.transfers.cancel_upload(username, file_id, remove=remove))
 
     def remove_completed_uploads(self) -> bool:
-        self._ensure()
-        return self._client.transfers.remove_completed_uploads()
+        return self._call("transfers.remove_completed_uploads", lambda c: c.transfers.remove_completed_uploads())
 
     # Options / YAML (remote configuration must be enabled on slskd)
     def options_download_yaml(self) -> str:
-        self._ensure()
-        return self._client.options.download_yaml()
+        return self._call("options.download_yaml", lambda c: c.options.download_yaml())
 
     def options_upload_yaml(self, yaml_text: str) -> bool:
-        self._ensure()
-        return self._client.options.upload_yaml(yaml_text)
+        return self._call("options.upload_yaml", lambda c: c.options.upload_yaml(yaml_text))
 
     def options_validate_yaml(self, yaml_text: str) -> str:
-        self._ensure()
-        return self._client.options.validate_yaml(yaml_text)
+        return self._call("options.validate_yaml", lambda c: c.options.validate_yaml(yaml_text))
 
     def shares_list(self):
-        self._ensure()
-        return self._client.shares.get_all()
+        return self._call("shares.get_all", lambda c: c.shares.get_all())
 
     def shares_rescan(self) -> bool:
-        self._ensure()
-        return self._client.shares.start_scan()
+        return self._call("shares.start_scan", lambda c: c.shares.start_scan())
 
     # Rooms
     def rooms_join(self, name: str) -> Room:
-        self._ensure()
-        return self._client.rooms.join(name)
+        return self._call("rooms.join", lambda c: c.rooms.join(name))
 
     def rooms_leave(self, name: str) -> bool:
-        self._ensure()
-        return self._client.rooms.leave(name)
+        return self._call("rooms.leave", lambda c: c.rooms.leave(name))
 
     def rooms_joined(self) -> List[str]:
-        self._ensure()
-        return self._client.rooms.get_all_joined()
+        return self._call("rooms.get_all_joined", lambda c: c.rooms.get_all_joined())
 
     def rooms_messages(self, name: str) -> List[RoomMessage]:
-        self._ensure()
-        return self._client.rooms.get_messages(name)
+        return self._call("rooms.get_messages", lambda c: c.rooms.get_messages(name))
 
     def rooms_send(self, name: str, message: str) -> bool:
-        self._ensure()
-        return self._client.rooms.send(name, message)
+        return self._call("rooms.send", lambda c: c.rooms.send(name, message))
 
     def rooms_available(self) -> List[RoomInfo]:
-        self._ensure()
-        return self._client.rooms.get_all()
+        return self._call("rooms.get_all", lambda c: c.rooms.get_all())
 
     # Users / Browse
     def user_browse(self, username: str) -> UserRootDir:
-        self._ensure()
-        return self._client.users.browse(username)
+        return self._call("users.browse", lambda c: c.users.browse(username))
 
     def user_info(self, username: str):
         """Fetch user info (includes queueLength, uploadSlots, etc.)."""
-        self._ensure()
-        return self._client.users.info(username)
+        return self._call("users.info", lambda c: c.users.info(username))
 
     # Private messages
     def pm_send(self, username: str, message: str) -> bool:
-        self._ensure()
-        return self._client.conversations.send(username, message)
+        return self._call("conversations.send", lambda c: c.conversations.send(username, message))
 
     def conversations(self) -> List[Conversation]:
+        return self._call("conversations.get_all", lambda c: c.conversations.get_all())
+
+    def conversation_messages(self, username: str) -> List[Dict[str, Any]]:
+        """Messages slskd still holds for one conversation, oldest first."""
+        conv = self._call("conversations.get", lambda c: c.conversations.get(username, includeMessages=True))
+        return list((conv or {}).get("messages", []) or [])
+
+    def _call(self, op: str, fn: Callable[[Any], Any]):
+        """Run one API call against the client and record it in the perf log."""
         self._ensure()
-        return self._client.conversations.get_all()
+        with perf_timer(f"api.{op}") as ev:
+            res = fn(self._client)
+            ev["payload"] = payload_size(res)
+        return res
 
     def _ensure(self):
         if not self._client:
@@ -0,0 +1,142 @@
+"""
+Per-transfer throughput history, short-term rates and ETAs.
+
+slskd only reports ``averageSpeed`` (over the whole transfer). Every refresh
+feeds ``bytesTransferred`` for the transfers that are currently moving into a
+small fixed-size ring of (timestamp, bytes) samples per transfer, from which we
+derive an exponentially smoothed rate and an ETA.
+Transfers that stop moving (finished, failed, queued again) or disappear are
+evicted on the next sample of their direction, so memory is bounded by the
+number of active transfers times ``RING_SIZE``, and ``MAX_TRACKED`` caps that.
+"""
+from __future__ import annotations
+
+import time
+from array import array
+from typing import Dict, Hashable, Iterable, Optional, Tuple
+
+# Samples kept per transfer; at a 5s refresh this is a bit over a minute.
+RING_SIZE = 16
+# Hard cap on tracked transfers regardless of queue size
+MAX_TRACKED = 2000
+# Weight of the newest interval in the smoothed rate
+EWMA_ALPHA = 0.3
+
+
+class _Ring:
+    __slots__ = ("times", "values", "head", "count", "direction", "size", "ewma")
+
+    def __init__(self, direction: str, size: int):
+        self.times = array("d", bytes(8 * RING_SIZE))
+        self.values = array("q", bytes(8 * RING_SIZE))
+        self.head = 0
+        self.count = 0
+        self.direction = direction
+        self.size = size
+        self.ewma: Optional[float] = None
+
+    def push(self, t: float, v: int) -> None:
+        if self.count:
+            prev = (self.head - 1) % RING_SIZE
+            dt = t - self.times[prev]
+            if dt <= 0:
+                return
+            # A restarted transfer can go backwards; treat that as no progress
+            inst = max(0, v - self.values[prev]) / dt
+            self.ewma = inst if self.ewma is None else EWMA_ALPHA * inst + (1 - EWMA_ALPHA) * self.ewma
+        self.times[self.head] = t
+        self.values[self.head] = v
+        self.head = (self.head + 1) % RING_SIZE
+        self.count = min(self.count + 1, RING_SIZE)
+
+    def last(self) -> int:
+        return self.values[(self.head - 1) % RING_SIZE] if self.count else 0
+
+
+class ThroughputTracker:
+    def __init__(self):
+        self._rings: Dict[Hashable, _Ring] = {}
+
+    def __len__(self) -> int:
+        return len(self._rings)
+
+    def sample(self, direction: str, active: Iterable[Tuple[Hashable, int, int]], now: Optional[float] = None) -> None:
+        """
+        Record (key, bytes transferred, size) for every moving transfer of one
+        direction. Tracked transfers of that direction missing from ``active``
+        are evicted.
+        """
+        t = time.monotonic() if now is None else now
+        seen = set()
+        for key, done, size in active:
+            seen.add(key)
+            ring = self._rings.get(key)
+            if ring is None:
+                if len(self._rings) >= MAX_TRACKED:
+                    continue
+                ring = self._rings[key] = _Ring(direction, int(size))
+            ring.size = int(size)
+            ring.push(t, int(done))
+        for key in [k for k, r in self._rings.items() if r.direction == direction and k not in seen]:
+            del self._rings[key]
+
+    def rate(self, key: Hashable) -> Optional[float]:
+        """Smoothed rate in bytes/s, or None until two samples exist."""
+        ring = self._rings.get(key)
+        return ring.ewma if ring is not None else None
+
+    def eta(self, key: Hashable) -> Optional[float]:
+        """Seconds remaining at the smoothed rate, or None if unknown/stalled."""
+        ring = self._rings.get(key)
+        if ring is None or not ring.ewma:
+            return None
+        return max(0, ring.size - ring.last()) / ring.ewma
+
+    def aggregate(self, keys: Iterable[Hashable]) -> Tuple[float, Optional[float]]:
+        """(combined rate, ETA for all of them) over a group such as a directory or user."""
+        total_rate = 0.0
+        remaining = 0
+        for k in keys:
+            ring = self._rings.get(k)
+            if ring is None:
+                continue
+            total_rate += ring.ewma or 0.0
+            remaining += max(0, ring.size - ring.last())
+        return total_rate, (remaining / total_rate if total_rate > 0 else None)
+
+    def bandwidth(self) -> Tuple[float, float]:
+        """Total (inbound, outbound) smoothed rate in bytes/s."""
+        down = up = 0.0
+        for ring in self._rings.values():
+            if ring.direction == "download":
+                down += ring.ewma or 0.0
+            else:
+                up += ring.ewma or 0.0
+        return down, up
+
+
+def format_size(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TB"
+
+
+def format_rate(bps: Optional[float]) -> str:
+    if bps is None:
+        return ""
+    return f"{format_size(bps)}/s"
+
+
+def format_eta(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return ""
+    s = int(seconds + 0.5)
+    if s < 60:
+        return f"{s}s"
+    if s < 3600:
+        return f"{s // 60}m {s % 60:02d}s"
+    if s < 86400:
+        return f"{s // 3600}h {s % 3600 // 60:02d}m"
+    return f"{s // 86400}d {s % 86400 // 3600}h"
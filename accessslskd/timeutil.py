@@ -0,0 +1,26 @@
+"""
+Timestamp helpers shared by the transfer, search and message code.
+"""
+from __future__ import annotations
+
+import re
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+
+def parse_time(value: Any) -> Optional[float]:
+    """slskd ISO timestamp ("2024-05-01T12:00:00.1234567Z", maybe with an offset) to epoch seconds."""
+    if not value:
+        return None
+    s = str(value).strip()
+    if s.endswith("Z"):
+        s = s[:-1] + "+00:00"
+    # Python accepts at most 6 fractional digits; .NET writes 7
+    s = re.sub(r"(\.\d{6})\d+", r"\1", s)
+    try:
+        dt = datetime.fromisoformat(s)
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
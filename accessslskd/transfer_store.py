@@ -0,0 +1,567 @@
+"""
+Compact transfer store backing the virtual transfers list.
+
+slskd returns transfers nested as user -> directories -> files. Each file is
+kept as one small ``__slots__`` record keyed by (direction, username, file id)
+and updated in place on every refresh, so the store can report exactly which
+rows were inserted, removed or changed. Cell text is produced on demand for
+the rows the list actually paints.
+"""
+from __future__ import annotations
+
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .throughput import format_eta, format_rate, format_size
+
+TransferKey = Tuple[str, str, str]
+# username -> (queue length, is_stale) or None when unknown
+QueueInfo = Callable[[str], Optional[Tuple[int, bool]]]
+
+# key -> (smoothed rate bytes/s, ETA seconds); either may be None
+RateInfo = Callable[[TransferKey], Tuple[Optional[float], Optional[float]]]
+
+# Column order of the transfers list
+COL_DIR, COL_USER, COL_DIRECTORY, COL_FILE, COL_STATE, COL_PERCENT, COL_SPEED, COL_RATE, COL_ETA, COL_ID = range(10)
+
+
+def is_queued_state(state: str) -> bool:
+    return "queue" in (state or "").lower()
+
+
+def is_active_state(state: str) -> bool:
+    """True while bytes are moving (or about to): InProgress / Initializing."""
+    s = (state or "").lower()
+    return "inprogress" in s or "initializing" in s
+
+
+def is_failed_state(state: str) -> bool:
+    """Ended in Errored, Rejected or TimedOut (a user's Cancel is not a failure)."""
+    s = (state or "").lower()
+    return "completed" in s and ("errored" in s or "rejected" in s or "timedout" in s)
+
+
+# Buckets summarised in the group State column, in display order
+STATE_BUCKETS = ("active", "queued", "done", "failed", "other")
+
+
+def state_bucket(state: str) -> str:
+    s = (state or "").lower()
+    if is_active_state(state):
+        return "active"
+    if "queue" in s or "requested" in s:
+        return "queued"
+    if "succeeded" in s:
+        return "done"
+    if "completed" in s:
+        # Completed, Errored / Rejected / TimedOut / Cancelled
+        return "failed"
+    return "other"
+
+
+class TransferRecord:
+    __slots__ = (
+        "key", "direction", "username", "directory", "filename", "file_id",
+        "size", "bytes_done", "state", "percent", "speed", "ended_at", "sort_key",
+    )
+
+    def __init__(self, key: TransferKey, direction: str, username: str, directory: str):
+        self.key = key
+        self.direction = direction
+        self.username = username
+        self.directory = directory
+        self.filename = ""
+        self.file_id = key[2]
+        self.size = 0
+        self.bytes_done = 0
+        self.state = ""
+        self.percent = 0.0
+        self.speed = 0.0
+        # slskd's endedAt (ISO text, "" while running); parsed only when the transfer is archived
+        self.ended_at = ""
+        # Cached sort key for the active sort column; cleared on change
+        self.sort_key: Any = None
+
+    @property
+    def is_download(self) -> bool:
+        return self.direction == "download"
+
+    def update_from(self, f: Dict[str, Any], directory: str) -> bool:
+        """Copy the fields we keep from a slskd file dict. Returns True if anything changed."""
+        vals = (
+            directory,
+            str(f.get("filename", "") or ""),
+            int(f.get("size", 0) or 0),
+            int(f.get("bytesTransferred", 0) or 0),
+            str(f.get("state", "") or ""),
+            round(float(f.get("percentComplete", 0) or 0), 1),
+            round(float(f.get("averageSpeed", 0) or 0), 1),
+        )
+        self.ended_at = str(f.get("endedAt", "") or "")
+        if vals == (self.directory, self.filename, self.size, self.bytes_done, self.state, self.percent, self.speed):
+            return False
+        (self.directory, self.filename, self.size, self.bytes_done, self.state, self.percent, self.speed) = vals
+        self.sort_key = None
+        return True
+
+    def state_text(self, queue_info: Optional[QueueInfo] = None) -> str:
+        if self.is_download and queue_info is not None and is_queued_state(self.state):
+            q = queue_info(self.username)
+            if q is not None:
+                n, stale = q
+                return f"{self.state} ({n}, stale)" if stale else f"{self.state} ({n})"
+        return self.state
+
+    def cell(self, col: int, queue_info: Optional[QueueInfo] = None) -> str:
+        if col == COL_DIR:
+            return "DL" if self.is_download else "UL"
+        if col == COL_USER:
+            return self.username
+        if col == COL_DIRECTORY:
+            return self.directory
+        if col == COL_FILE:
+            return self.filename
+        if col == COL_STATE:
+            return self.state_text(queue_info)
+        if col == COL_PERCENT:
+            return f"{self.percent}"
+        if col == COL_SPEED:
+            return str(self.speed)
+        if col == COL_ID:
+            return self.file_id
+        return ""
+
+    def as_file(self) -> Dict[str, Any]:
+        """Minimal file dict accepted by ``enqueue_downloads``."""
+        return {"filename": self.filename, "size": int(self.size)}
+
+
+def _sort_value(rec: TransferRecord, col: int) -> Any:
+    if col == COL_STATE:
+        return rec.state.lower()
+    if col == COL_PERCENT:
+        return rec.percent
+    if col == COL_SPEED:
+        return rec.speed
+    if col == COL_USER:
+        return rec.username.lower()
+    if col == COL_DIRECTORY:
+        return rec.directory.lower()
+    if col == COL_FILE:
+        return rec.filename.lower()
+    if col == COL_DIR:
+        return rec.direction
+    return rec.file_id
+
+
+@dataclass
+class StoreUpdate:
+    inserted: List[TransferKey] = field(default_factory=list)
+    removed: List[TransferKey] = field(default_factory=list)
+    changed: List[TransferKey] = field(default_factory=list)
+    # Display order changed (rows added, removed or moved); indices shifted.
+    structure_changed: bool = False
+
+    @property
+    def empty(self) -> bool:
+        return not (self.inserted or self.removed or self.changed or self.structure_changed)
+
+    @property
+    def rows_touched(self) -> int:
+        return len(self.inserted) + len(self.removed) + len(self.changed)
+
+
+class TransferStore:
+    def __init__(self):
+        self._records: Dict[TransferKey, TransferRecord] = {}
+        # Display order (server order, or sorted) and its reverse index
+        self._server_order: List[TransferKey] = []
+        self._feed_order: Dict[str, List[TransferKey]] = {}
+        # direction -> InProgress/Initializing (and failed) transfers at last update
+        self._active: Dict[str, List[TransferKey]] = {}
+        self._failed: Dict[str, List[TransferKey]] = {}
+        self._order: List[TransferKey] = []
+        self._index: Dict[TransferKey, int] = {}
+        # username -> display indices of that user's rows (built on demand)
+        self._user_index: Optional[Dict[str, List[int]]] = None
+        self._last_order_changed = False
+        # Queue length lookup shown next to queued downloads
+        self.queue_info: Optional[QueueInfo] = None
+        # Short-term rate/ETA lookup for the Rate and ETA columns
+        self.rate_info: Optional[RateInfo] = None
+        self._sort_col: Optional[int] = None
+        self._sort_asc = True
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __iter__(self) -> Iterator[TransferRecord]:
+        for k in self._order:
+            yield self._records[k]
+
+    def get(self, key: TransferKey) -> Optional[TransferRecord]:
+        return self._records.get(key)
+
+    def record_at(self, idx: int) -> Optional[TransferRecord]:
+        if 0 <= idx < len(self._order):
+            return self._records.get(self._order[idx])
+        return None
+
+    def key_at(self, idx: int) -> Optional[TransferKey]:
+        if 0 <= idx < len(self._order):
+            return self._order[idx]
+        return None
+
+    def index_of(self, key: TransferKey) -> Optional[int]:
+        return self._index.get(key)
+
+    def cell(self, idx: int, col: int) -> str:
+        rec = self.record_at(idx)
+        if rec is None:
+            return ""
+        if col in (COL_RATE, COL_ETA):
+            if self.rate_info is None:
+                return ""
+            rate, eta = self.rate_info(rec.key)
+            return format_rate(rate) if col == COL_RATE else format_eta(eta)
+        return rec.cell(col, self.queue_info)
+
+    def indices_for_user(self, username: str) -> List[int]:
+        if self._user_index is None:
+            idx: Dict[str, List[int]] = {}
+            for i, k in enumerate(self._order):
+                idx.setdefault(k[1], []).append(i)
+            self._user_index = idx
+        return self._user_index.get(username, [])
+
+    def active_count(self, direction: Optional[str] = None) -> int:
+        """Transfers currently moving, for one direction or both."""
+        if direction is not None:
+            return len(self._active.get(direction, ()))
+        return sum(len(v) for v in self._active.values())
+
+    def active_records(self, direction: str) -> List[TransferRecord]:
+        return [self._records[k] for k in self._active.get(direction, ()) if k in self._records]
+
+    def failed_records(self, direction: str) -> List[TransferRecord]:
+        return [self._records[k] for k in self._failed.get(direction, ()) if k in self._records]
+
+    @property
+    def sort_column(self) -> Optional[int]:
+        return self._sort_col
+
+    @property
+    def sort_ascending(self) -> bool:
+        return self._sort_asc
+
+    def update(self, downloads: Optional[Iterable[Dict[str, Any]]], uploads: Optional[Iterable[Dict[str, Any]]]) -> StoreUpdate:
+        """Merge full snapshots of both directions and report what changed."""
+        a = self.update_feed("download", downloads)
+        b = self.update_feed("upload", uploads)
+        return StoreUpdate(
+            inserted=a.inserted + b.inserted,
+            removed=a.removed + b.removed,
+            changed=a.changed + b.changed,
+            structure_changed=a.structure_changed or b.structure_changed,
+        )
+
+    def update_feed(self, direction: str, items: Optional[Iterable[Dict[str, Any]]]) -> StoreUpdate:
+        """
+        Merge a full snapshot of one direction ("download" or "upload").
+        Rows of the other direction are left untouched, so each feed can be
+        refreshed on its own schedule.
+        """
+        upd = StoreUpdate()
+        feed_order: List[TransferKey] = []
+        seen = set()
+        active: List[TransferKey] = []
+        failed: List[TransferKey] = []
+        for t in items or []:
+            username = sys.intern(str(t.get("username", "") or ""))
+            for d in (t.get("directories") or []):
+                dname = sys.intern(str(d.get("directory", "") or ""))
+                for f in (d.get("files") or []):
+                    key = (direction, username, str(f.get("id", "") or ""))
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    feed_order.append(key)
+                    rec = self._records.get(key)
+                    if rec is None:
+                        rec = TransferRecord(key, direction, username, dname)
+                        rec.update_from(f, dname)
+                        self._records[key] = rec
+                        upd.inserted.append(key)
+                    elif rec.update_from(f, dname):
+                        upd.changed.append(key)
+                    if is_active_state(rec.state):
+                        active.append(key)
+                    elif is_failed_state(rec.state):
+                        failed.append(key)
+        upd.removed = [k for k in self._feed_order.get(direction, []) if k not in seen]
+        for k in upd.removed:
+            self._records.pop(k, None)
+        self._feed_order[direction] = feed_order
+        self._active[direction] = active
+        self._failed[direction] = failed
+        # Downloads are listed before uploads
+        self._set_order(self._feed_order.get("download", []) + self._feed_order.get("upload", []))
+        upd.structure_changed = self._last_order_changed
+        return upd
+
+    def set_sort(self, col: Optional[int], ascending: bool = True) -> None:
+        """Sort by a column (None restores server order)."""
+        if col != self._sort_col:
+            for rec in self._records.values():
+                rec.sort_key = None
+        self._sort_col = col
+        self._sort_asc = bool(ascending)
+        self._set_order(self._server_order)
+
+    def _sort_value(self, rec: TransferRecord, col: int) -> Any:
+        if col in (COL_RATE, COL_ETA):
+            # Unknown rates/ETAs sort after known ones
+            rate, eta = self.rate_info(rec.key) if self.rate_info is not None else (None, None)
+            v = rate if col == COL_RATE else eta
+            return (v is None, v or 0.0)
+        return _sort_value(rec, col)
+
+    def _set_order(self, server_order: List[TransferKey]) -> None:
+        self._server_order = server_order
+        if self._sort_col is None:
+            order = list(server_order)
+        else:
+            col = self._sort_col
+            recs = self._records
+
+            def key_of(k: TransferKey):
+                rec = recs[k]
+                if rec.sort_key is None:
+                    rec.sort_key = self._sort_value(rec, col)
+                return rec.sort_key
+            # Stable sort: ties keep server order
+            order = sorted(server_order, key=key_of, reverse=not self._sort_asc)
+        self._last_order_changed = order != self._order
+        if self._last_order_changed:
+            self._order = order
+            self._index = {k: i for i, k in enumerate(order)}
+            self._user_index = None
+
+
+# Roll-up view: one row per (direction, username, directory)
+GroupKey = Tuple[str, str, str]
+# member keys -> (combined rate bytes/s, ETA seconds)
+GroupRateInfo = Callable[[Iterable[TransferKey]], Tuple[float, Optional[float]]]
+
+GCOL_DIR, GCOL_USER, GCOL_DIRECTORY, GCOL_FILES, GCOL_STATE, GCOL_PERCENT, GCOL_BYTES, GCOL_RATE, GCOL_ETA = range(9)
+
+class TransferGroup:
+    __slots__ = ("key", "members", "counts", "bytes_done", "size", "sort_key")
+
+    def __init__(self, key: GroupKey):
+        self.key = key
+        self.members: Dict[TransferKey, None] = {}
+        self.counts: Dict[str, int] = {}
+        self.bytes_done = 0
+        self.size = 0
+        self.sort_key: Any = None
+
+    @property
+    def direction(self) -> str:
+        return self.key[0]
+
+    @property
+    def username(self) -> str:
+        return self.key[1]
+
+    @property
+    def directory(self) -> str:
+        return self.key[2]
+
+    @property
+    def percent(self) -> float:
+        return round(100.0 * self.bytes_done / self.size, 1) if self.size else 0.0
+
+    def state_text(self) -> str:
+        return ", ".join(f"{self.counts[b]} {b}" for b in STATE_BUCKETS if self.counts.get(b))
+
+
+class TransferGroups:
+    """
+    Directory roll-up of a ``TransferStore``. Each file contributes its
+    bucket, bytes and size to exactly one group; ``apply`` moves only the
+    contributions of files in a ``StoreUpdate``, so keeping the view current
+    costs O(changed files) rather than a regroup of the whole queue.
+    """
+
+    def __init__(self):
+        self._groups: Dict[GroupKey, TransferGroup] = {}
+        # file key -> (group key, bucket, bytes done, size) currently counted
+        self._contrib: Dict[TransferKey, Tuple[GroupKey, str, int, int]] = {}
+        self._order: List[GroupKey] = []
+        self._index: Dict[GroupKey, int] = {}
+        self.rate_info: Optional[GroupRateInfo] = None
+        self._sort_col: Optional[int] = None
+        self._sort_asc = True
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __iter__(self) -> Iterator[TransferGroup]:
+        for k in self._order:
+            yield self._groups[k]
+
+    def get(self, key: GroupKey) -> Optional[TransferGroup]:
+        return self._groups.get(key)
+
+    def group_at(self, idx: int) -> Optional[TransferGroup]:
+        if 0 <= idx < len(self._order):
+            return self._groups.get(self._order[idx])
+        return None
+
+    def key_at(self, idx: int) -> Optional[GroupKey]:
+        if 0 <= idx < len(self._order):
+            return self._order[idx]
+        return None
+
+    def index_of(self, key: GroupKey) -> Optional[int]:
+        return self._index.get(key)
+
+    @property
+    def sort_column(self) -> Optional[int]:
+        return self._sort_col
+
+    @property
+    def sort_ascending(self) -> bool:
+        return self._sort_asc
+
+    def cell(self, idx: int, col: int) -> str:
+        g = self.group_at(idx)
+        if g is None:
+            return ""
+        if col == GCOL_DIR:
+            return "DL" if g.direction == "download" else "UL"
+        if col == GCOL_USER:
+            return g.username
+        if col == GCOL_DIRECTORY:
+            return g.directory
+        if col == GCOL_FILES:
+            return str(len(g.members))
+        if col == GCOL_STATE:
+            return g.state_text()
+        if col == GCOL_PERCENT:
+            return f"{g.percent}"
+        if col == GCOL_BYTES:
+            return f"{format_size(g.bytes_done)} / {format_size(g.size)}"
+        if col in (GCOL_RATE, GCOL_ETA):
+            if self.rate_info is None:
+                return ""
+            rate, eta = self.rate_info(g.members)
+            if col == GCOL_RATE:
+                return format_rate(rate) if rate else ""
+            return format_eta(eta)
+        return ""
+
+    def rebuild(self, store: TransferStore) -> None:
+        self._groups.clear()
+        self._contrib.clear()
+        for rec in store:
+            self._add(rec)
+        self._resort()
+
+    def apply(self, store: TransferStore, upd: StoreUpdate) -> StoreUpdate:
+        """Fold one store update into the groups; the result lists group keys."""
+        out = StoreUpdate()
+        before = set(self._groups)
+        touched = set()
+        for k in upd.removed:
+            g = self._remove(k)
+            if g is not None:
+                touched.add(g)
+        for k in list(upd.inserted) + list(upd.changed):
+            rec = store.get(k)
+            if rec is None:
+                continue
+            g = self._remove(k)
+            if g is not None:
+                touched.add(g)
+            touched.add(self._add(rec))
+        after = set(self._groups)
+        out.inserted = [g for g in touched if g in after and g not in before]
+        out.removed = [g for g in touched if g in before and g not in after]
+        out.changed = [g for g in touched if g in before and g in after]
+        for g in out.changed:
+            self._groups[g].sort_key = None
+        if out.inserted or out.removed or (out.changed and self._sort_col is not None):
+            out.structure_changed = self._resort()
+        return out
+
+    def set_sort(self, col: Optional[int], ascending: bool = True) -> None:
+        for g in self._groups.values():
+            g.sort_key = None
+        self._sort_col = col
+        self._sort_asc = bool(ascending)
+        self._resort()
+
+    def _add(self, rec: TransferRecord) -> GroupKey:
+        gkey = (rec.direction, rec.username, rec.directory)
+        g = self._groups.get(gkey)
+        if g is None:
+            g = self._groups[gkey] = TransferGroup(gkey)
+        bucket = state_bucket(rec.state)
+        g.members[rec.key] = None
+        g.counts[bucket] = g.counts.get(bucket, 0) + 1
+        g.bytes_done += rec.bytes_done
+        g.size += rec.size
+        self._contrib[rec.key] = (gkey, bucket, rec.bytes_done, rec.size)
+        return gkey
+
+    def _remove(self, key: TransferKey) -> Optional[GroupKey]:
+        c = self._contrib.pop(key, None)
+        if c is None:
+            return None
+        gkey, bucket, done, size = c
+        g = self._groups[gkey]
+        g.members.pop(key, None)
+        g.counts[bucket] -= 1
+        g.bytes_done -= done
+        g.size -= size
+        if not g.members:
+            del self._groups[gkey]
+        return gkey
+
+    def _sort_value(self, g: TransferGroup, col: Optional[int]) -> Any:
+        if col == GCOL_FILES:
+            return len(g.members)
+        if col == GCOL_STATE:
+            return tuple(-g.counts.get(b, 0) for b in STATE_BUCKETS)
+        if col == GCOL_PERCENT:
+            return g.percent
+        if col == GCOL_BYTES:
+            return g.size
+        if col in (GCOL_RATE, GCOL_ETA):
+            rate, eta = self.rate_info(g.members) if self.rate_info is not None else (0.0, None)
+            v = (rate or None) if col == GCOL_RATE else eta
+            return (v is None, v or 0.0)
+        if col == GCOL_USER:
+            return g.username.lower()
+        if col == GCOL_DIRECTORY:
+            return g.directory.lower()
+        # Natural order: downloads first, then user and directory
+        return (g.direction != "download", g.username.lower(), g.directory.lower())
+
+    def _resort(self) -> bool:
+        col = self._sort_col
+
+        def key_of(k: GroupKey):
+            g = self._groups[k]
+            if g.sort_key is None:
+                g.sort_key = self._sort_value(g, col)
+            return g.sort_key
+        order = sorted(self._groups, key=key_of, reverse=col is not None and not self._sort_asc)
+        changed = order != self._order
+        if changed:
+            self._order = order
+            self._index = {k: i for i, k in enumerate(order)}
+        return changed
@@ -0,0 +1,137 @@
+"""
+"Download Directory" shared by the user browser and the search results.
+
+Selected folders are reduced to the outermost ones, crawled on a worker
+thread with progress in the status bar, and the resulting plan's totals are
+shown for confirmation before anything is enqueued. When a complete browse
+model is at hand its folder totals are known up front, so a big download is
+confirmed before scanning and the crawl never fetches.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Callable, List, Optional
+
+import wx
+
+from ..browse_tree import BrowseTree, DirStats
+from ..crawler import CrawlLimits, CrawlPlan, crawl, enqueue_plan, outermost_paths
+from ..slsk_client import SlskService
+from .dispatcher import STATUS_KEY, call_after
+
+# Ask before enqueueing more files (or bytes) than this in one go
+CONFIRM_FILES = 500
+CONFIRM_BYTES = 20 * 1024 ** 3
+
+
+def download_directories(
+    parent: wx.Window,
+    service: SlskService,
+    username: str,
+    dirs: List[str],
+    on_status: Callable[[str], None],
+    model: Optional[BrowseTree] = None,
+) -> None:
+    """
+    Crawl ``dirs`` of ``username``'s shares, confirm, then enqueue. ``model``
+    is the user's browse tree if one is loaded; only a complete one is used.
+    """
+    dirs = outermost_paths(dirs)
+    if not dirs:
+        on_status("Select a directory (or open one) first.")
+        return
+    # A complete model is never modified by the crawl, so it can be shared with
+    # the UI; otherwise the crawl fetches into its own tree.
+    if model is not None and not model.complete:
+        model = None
+    limits = None
+    confirmed = False
+    totals = totals_for(model, dirs) if model is not None else None
+    if totals is not None:
+        # Sizes are known up front: ask before scanning, then take all of it
+        if totals.files > CONFIRM_FILES or totals.bytes > CONFIRM_BYTES:
+            answer = wx.MessageBox(
+                f"Enqueue {totals.describe()} from {username}?",
+                "Download Directory",
+                wx.YES_NO | wx.ICON_WARNING,
+                parent,
+            )
+            if answer != wx.YES:
+                on_status("Directory download cancelled.")
+                return
+        limits = CrawlLimits(max_depth=totals.depth + 1, max_files=totals.files, max_bytes=totals.bytes)
+        confirmed = True
+    many = len(dirs) > 1
+    on_status(f"Scanning {len(dirs)} director{'ies' if many else 'y'}…")
+
+    def worker():
+        known = model is not None and all(model.node_for(d) is not None for d in dirs)
+        tree = model if known else BrowseTree(username)
+        plan = CrawlPlan()
+        def progress(p: CrawlPlan):
+            call_after(on_status, f"Scanning… {p.directories} folder(s), {len(p.files)} file(s)", key=STATUS_KEY)
+        try:
+            for d in dirs:
+                crawl(service, tree, d, limits=limits, plan=plan, on_progress=progress)
+                if plan.truncated:
+                    break
+        except Exception as e:
+            call_after(on_status, f"Directory scan failed: {e}", key=STATUS_KEY)
+            wx.Bell()
+            return
+        call_after(confirm_plan, parent, service, username, plan, on_status, confirmed)
+    threading.Thread(target=worker, daemon=True).start()
+
+
+def totals_for(model: BrowseTree, dirs: List[str]) -> Optional[DirStats]:
+    """Combined stats of these (non-nested) folders, or None if any is unknown."""
+    total = DirStats()
+    for d in dirs:
+        node = model.node_for(d)
+        if node is None or node.stats is None:
+            return None
+        total.bytes += node.stats.bytes
+        total.files += node.stats.files
+        total.audio += node.stats.audio
+        total.video += node.stats.video
+        total.depth = max(total.depth, node.stats.depth)
+    return total
+
+
+def confirm_plan(
+    parent: wx.Window,
+    service: SlskService,
+    username: str,
+    plan: CrawlPlan,
+    on_status: Callable[[str], None],
+    confirmed: bool = False,
+) -> None:
+    """Show the plan's totals (asking first if it is big or was cut short), then enqueue it."""
+    if not parent:
+        # The window closed while scanning
+        return
+    if not plan.files:
+        on_status("Nothing to enqueue: " + plan.describe() + ".")
+        return
+    if not confirmed and (plan.truncated or plan.too_deep or len(plan.files) > CONFIRM_FILES
+                          or plan.total_bytes > CONFIRM_BYTES):
+        answer = wx.MessageBox(
+            f"Enqueue {plan.describe()} from {username}?",
+            "Download Directory",
+            wx.YES_NO | wx.ICON_QUESTION,
+            parent,
+        )
+        if answer != wx.YES:
+            on_status("Directory download cancelled.")
+            return
+    on_status(f"Enqueueing {plan.describe()}…")
+
+    def worker():
+        def progress(done: int, total: int):
+            call_after(on_status, f"Enqueueing… {done} of {total}", key=STATUS_KEY)
+        ok, failed = enqueue_plan(service, username, plan, on_progress=progress)
+        msg = f"Enqueued {ok} file(s) from {plan.directories} folder(s)."
+        if failed:
+            msg += f" ({failed} failed)"
+        call_after(on_status, msg, key=STATUS_KEY)
+    threading.Thread(target=worker, daemon=True).start()
@@ -0,0 +1,80 @@
+"""
+Coalescing dispatcher for UI updates posted from worker threads.
+
+Workers used to post one ``wx.CallAfter`` per mutation (status text, list
+refresh, idle flag, ...). ``call_after`` queues them instead and runs
+everything pending in a single flush at most once per frame interval. Updates
+posted with the same ``key`` replace each other, so only the latest status
+message or list refresh for a target survives a burst.
+"""
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+import wx
+
+# ~30 flushes per second is plenty for list/status updates.
+FRAME_INTERVAL_MS = 33
+
+# Key used for status bar / title messages; every panel shares one status bar.
+STATUS_KEY = "status"
+
+
+class UiDispatcher:
+    def __init__(self, interval_ms: int = FRAME_INTERVAL_MS):
+        self._interval_s = max(0, int(interval_ms)) / 1000.0
+        self._lock = threading.Lock()
+        self._pending: "OrderedDict[Hashable, Tuple[Callable[..., Any], tuple, dict]]" = OrderedDict()
+        self._scheduled = False
+        self._last_flush = 0.0
+        self._seq = itertools.count()
+
+    def post(self, fn: Callable[..., Any], *args: Any, key: Optional[Hashable] = None, **kwargs: Any) -> None:
+        """Queue ``fn(*args, **kwargs)`` for the next flush. Safe from any thread."""
+        with self._lock:
+            if key is None:
+                key = ("_once", next(self._seq))
+            else:
+                # Superseded: drop the older update and re-queue at the end
+                self._pending.pop(key, None)
+            self._pending[key] = (fn, args, kwargs)
+            if self._scheduled:
+                return
+            self._scheduled = True
+        wx.CallAfter(self._arm)
+
+    def _arm(self) -> None:
+        # Runs on the UI thread; wx timers must be created here.
+        delay = self._interval_s - (time.monotonic() - self._last_flush)
+        if delay <= 0:
+            self._flush()
+        else:
+            wx.CallLater(max(1, int(delay * 1000)), self._flush)
+
+    def _flush(self) -> None:
+        with self._lock:
+            items = list(self._pending.values())
+            self._pending.clear()
+            self._scheduled = False
+            self._last_flush = time.monotonic()
+        for fn, args, kwargs in items:
+            try:
+                fn(*args, **kwargs)
+            except RuntimeError as e:
+                # Target window was destroyed while the update was pending.
+                if "deleted" not in str(e):
+                    traceback.print_exc()
+            except Exception:
+                traceback.print_exc()
+
+
+dispatcher = UiDispatcher()
+
+
+def call_after(fn: Callable[..., Any], *args: Any, key: Optional[Hashable] = None, **kwargs: Any) -> None:
+    dispatcher.post(fn, *args, key=key, **kwargs)
@@ -1,22 +1,34 @@
 from __future__ import annotations
 
+import threading
+import time
 import wx
-from typing import Callable
+from typing import Callable, Optional
 
 from ..config import AppConfig, save_config, load_config
 from ..slsk_client import SlskService, SlskServiceError
-from .settings_dialog import SettingsDialog
+from .dispatcher import STATUS_KEY, call_after
 from .search_panel import SearchPanel
-from .transfers_panel import TransfersPanel
-from .rooms_panel import RoomsPanel
-from .pm_panel import PmPanel
+
+# Title changes may be announced by screen readers; don't retitle more often than this.
+TITLE_MIN_INTERVAL_S = 1.0
 
 
 class MainFrame(wx.Frame):
-    def __init__(self, cfg: AppConfig):
+    def __init__(self, cfg: AppConfig, *, auto_connect: bool = True):
         super().__init__(None, title="accessslskd", size=(980, 700))
         self.cfg = cfg
         self.service = SlskService(cfg)
+        # Tabs other than Search are built on first activation
+        self.transfers_panel = None
+        self.rooms_panel = None
+        self.pm_panel = None
+        self._lazy_pages: dict = {}
+        self._pending_title: Optional[str] = None
+        self._title_at = 0.0
+        self._title_timer_armed = False
+        # Background clean-up of old searches/transfers; started once connected
+        self._janitor = None
 
         self.statusbar = self.CreateStatusBar(2)
         self.statusbar.SetStatusWidths([-3, -1])
@@ -27,7 +39,8 @@ class MainFrame(wx.Frame):
         self.Bind(wx.EVT_CLOSE, self._on_close)
 
         # Attempt initial connection
-        self._try_connect_first_run()
+        if auto_connect:
+            self._try_connect_first_run()
 
     def _build_menu(self):
         menubar = wx.MenuBar()
@@ -35,6 +48,7 @@ class MainFrame(wx.Frame):
         mFile = wx.Menu()
         miSettings = mFile.Append(wx.ID_PREFERENCES, "&Settings\tCtrl+,")
         miLogin = mFile.Append(wx.ID_ANY, "&Login Now\tCtrl+L")
+        miSearchMessages = mFile.Append(wx.ID_ANY, "Search &Messages…\tCtrl+Shift+F")
         miExit = mFile.Append(wx.ID_EXIT, "E&xit\tAlt+F4")
         menubar.Append(mFile, "&File")
 
@@ -44,6 +58,10 @@ class MainFrame(wx.Frame):
         mOptions.AppendSeparator()
         self.miTransfersAuto = mOptions.AppendCheckItem(wx.ID_ANY, "Transfers Auto &Refresh")
         self.miTransfersInterval = mOptions.Append(wx.ID_ANY, "Transfers &Interval…")
+        self.miUploadsInterval = mOptions.Append(wx.ID_ANY, "U&ploads Interval…")
+        self.miAutoRetry = mOptions.AppendCheckItem(wx.ID_ANY, "Auto Re&try Failed Downloads")
+        self.miJanitor = mOptions.AppendCheckItem(wx.ID_ANY, "&Automatic slskd Clean-Up")
+        self.miCleanUp = mOptions.Append(wx.ID_ANY, "&Clean Up slskd Now")
         mOptions.AppendSeparator()
         self.miShareMgr = mOptions.Append(wx.ID_ANY, "&Share Manager…")
         self.miSetDownloads = mOptions.Append(wx.ID_ANY, "Set &Downloads Folder…")
@@ -57,17 +75,24 @@ class MainFrame(wx.Frame):
 
         self.Bind(wx.EVT_MENU, self._on_settings, miSettings)
         self.Bind(wx.EVT_MENU, self._on_login_now, miLogin)
+        self.Bind(wx.EVT_MENU, self._on_search_messages, miSearchMessages)
         self.Bind(wx.EVT_MENU, lambda e: self.Close(), miExit)
         self.Bind(wx.EVT_MENU, self._on_copy_debug, miDebug)
 
         # Initialize options check states
         self.miSearchAuto.Check(self.cfg.search_auto_update)
         self.miTransfersAuto.Check(self.cfg.transfers_auto_update)
+        self.miAutoRetry.Check(self.cfg.transfers_auto_retry)
+        self.miJanitor.Check(self.cfg.janitor_enabled)
         # Wire options events
         self.Bind(wx.EVT_MENU, self._on_toggle_search_auto, self.miSearchAuto)
         self.Bind(wx.EVT_MENU, self._on_set_search_interval, self.miSearchInterval)
         self.Bind(wx.EVT_MENU, self._on_toggle_transfers_auto, self.miTransfersAuto)
         self.Bind(wx.EVT_MENU, self._on_set_transfers_interval, self.miTransfersInterval)
+        self.Bind(wx.EVT_MENU, self._on_set_uploads_interval, self.miUploadsInterval)
+        self.Bind(wx.EVT_MENU, self._on_toggle_auto_retry, self.miAutoRetry)
+        self.Bind(wx.EVT_MENU, self._on_toggle_janitor, self.miJanitor)
+        self.Bind(wx.EVT_MENU, self._on_clean_up, self.miCleanUp)
         self.Bind(wx.EVT_MENU, self._on_share_manager, self.miShareMgr)
         self.Bind(wx.EVT_MENU, self._on_set_downloads_folder, self.miSetDownloads)
 
@@ -80,34 +105,105 @@ class MainFrame(wx.Frame):
             interval_sec=self.cfg.search_interval_sec,
             search_timeout_ms=getattr(self.cfg, "search_timeout_ms", 120000),
         )
-        self.transfers_panel = TransfersPanel(
-            nb, self.service, self._set_status,
-            auto_update=self.cfg.transfers_auto_update,
-            interval_sec=self.cfg.transfers_interval_sec,
-        )
-        self.rooms_panel = RoomsPanel(nb, self.service, self._set_status)
-        self.pm_panel = PmPanel(nb, self.service, self._set_status)
         nb.AddPage(self.search_panel, "&Search")
-        nb.AddPage(self.transfers_panel, "&Transfers")
-        nb.AddPage(self.rooms_panel, "&Rooms")
-        nb.AddPage(self.pm_panel, "&PM")
+        # Hidden tabs start as empty host panels; the real panel (and its module)
+        # is created the first time the tab is shown.
+        for title, builder in (
+            ("&Transfers", self._build_transfers_panel),
+            ("&Rooms", self._build_rooms_panel),
+            ("&PM", self._build_pm_panel),
+        ):
+            host = wx.Panel(nb)
+            host.SetSizer(wx.BoxSizer(wx.VERTICAL))
+            nb.AddPage(host, title)
+            self._lazy_pages[host] = builder
 
         s = wx.BoxSizer(wx.VERTICAL)
         s.Add(nb, 1, wx.EXPAND)
         self.SetSizer(s)
         # Auto-load available rooms when Rooms tab is shown
         self.Bind(wx.EVT_NOTEBOOK_PAGE_CHANGED, self._on_nb_changed, nb)
+        self.Bind(wx.EVT_ICONIZE, self._on_iconize)
+
+    def _build_transfers_panel(self, parent):
+        from .transfers_panel import TransfersPanel
+        self.transfers_panel = TransfersPanel(
+            parent, self.service, self._set_status,
+            auto_update=self.cfg.transfers_auto_update,
+            interval_sec=self.cfg.transfers_interval_sec,
+            uploads_interval_sec=self.cfg.transfers_uploads_interval_sec,
+            queue_ttl_sec=self.cfg.transfers_queue_ttl_sec,
+            on_bandwidth=self._set_status_right,
+            auto_retry=self.cfg.transfers_auto_retry,
+        )
+        return self.transfers_panel
+
+    def _build_rooms_panel(self, parent):
+        from .rooms_panel import RoomsPanel
+        self.rooms_panel = RoomsPanel(parent, self.service, self._set_status)
+        return self.rooms_panel
+
+    def _build_pm_panel(self, parent):
+        from .pm_panel import PmPanel
+        self.pm_panel = PmPanel(parent, self.service, self._set_status)
+        return self.pm_panel
+
+    def _ensure_page(self, page):
+        builder = self._lazy_pages.pop(page, None)
+        if builder is None:
+            return
+        panel = builder(page)
+        page.GetSizer().Add(panel, 1, wx.EXPAND)
+        page.Layout()
 
     # Status helpers
-    def _set_status(self, msg: str, right: str = ""):
-        self.statusbar.SetStatusText(msg or "", 0)
-        if right is not None:
+    def _set_status(self, msg: str, right: Optional[str] = None):
+        if self.statusbar.GetStatusText(0) != (msg or ""):
+            self.statusbar.SetStatusText(msg or "", 0)
+        if right is not None and self.statusbar.GetStatusText(1) != (right or ""):
             self.statusbar.SetStatusText(right or "", 1)
         if msg:
-            self.SetTitle(f"accessslskd — {msg}")
+            self._pending_title = f"accessslskd — {msg}"
+            self._update_title()
+
+    def _ensure_transfers_panel(self):
+        # Retries are driven by the transfers feed, so it must exist (hidden) even
+        # if the Transfers tab was never opened.
+        for host, builder in list(self._lazy_pages.items()):
+            if builder == self._build_transfers_panel:
+                self._ensure_page(host)
+                self.transfers_panel.on_activated(self.nb.GetCurrentPage() is host)
+
+    def _set_status_right(self, text: str):
+        if self.statusbar.GetStatusText(1) != (text or ""):
+            self.statusbar.SetStatusText(text or "", 1)
+
+    def _update_title(self):
+        # Rate-limited: bursts of status messages collapse into the latest title.
+        title = self._pending_title
+        if not title:
+            return
+        if title == self.GetTitle():
+            self._pending_title = None
+            return
+        wait = self._title_at + TITLE_MIN_INTERVAL_S - time.monotonic()
+        if wait > 0:
+            if not self._title_timer_armed:
+                self._title_timer_armed = True
+                wx.CallLater(int(wait * 1000) + 1, self._on_title_timer)
+            return
+        self._pending_title = None
+        self._title_at = time.monotonic()
+        self.SetTitle(title)
+
+    def _on_title_timer(self):
+        self._title_timer_armed = False
+        if self:
+            self._update_title()
 
     # Events
     def _on_settings(self, evt):
+        from .settings_dialog import SettingsDialog
         dlg = SettingsDialog(self, self.cfg)
         if dlg.ShowModal() == wx.ID_OK:
             save_config(dlg.config)
@@ -133,24 +229,45 @@ class MainFrame(wx.Frame):
             self._connect_with_feedback()
 
     def _connect_with_feedback(self):
-        try:
-            self._set_status("Connecting to slskd...")
-            self.service.connect()
-            state = self.service.app_state()
-            ver = state.get("version", {}).get("full", "")
-            self._set_status(f"Connected. slskd {ver}")
-        except SlskServiceError as e:
-            wx.MessageBox(f"Connection failed:\n{e}", "Connection Error", wx.OK | wx.ICON_ERROR, parent=self)
+        # Connect and check the version off the UI thread so the window stays responsive.
+        self._set_status("Connecting to slskd...")
+        service = self.service
+        def worker():
+            try:
+                service.connect()
+                state = service.app_state()
+                ver = state.get("version", {}).get("full", "")
+                wx.CallAfter(self._after_connect, service, ver, None)
+            except SlskServiceError as e:
+                wx.CallAfter(self._after_connect, service, "", e)
+            except Exception as e:
+                wx.CallAfter(self._after_connect, service, "", SlskServiceError(str(e)))
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _after_connect(self, service: SlskService, ver: str, error):
+        if not self or service is not self.service:
+            # Window closed or settings changed while connecting
+            return
+        if error is not None:
             self._set_status("Not connected.")
+            wx.MessageBox(f"Connection failed:\n{error}", "Connection Error", wx.OK | wx.ICON_ERROR, parent=self)
+            return
+        self._set_status(f"Connected. slskd {ver}")
+        if self.cfg.transfers_auto_retry:
+            self._ensure_transfers_panel()
+        if self.cfg.janitor_enabled:
+            self._ensure_janitor().start()
 
     def _on_login_now(self, evt):
         self._connect_with_feedback()
 
     def _on_close(self, evt):
         try:
-            # Stop rooms auto-refresh timer if running
-            if hasattr(self, "rooms_panel") and hasattr(self.rooms_panel, "on_activated"):
-                self.rooms_panel.on_activated(False)
+            # Stop rooms polling if running
+            if self.rooms_panel is not None:
+                self.rooms_panel.stop()
+            if self._janitor is not None:
+                self._janitor.stop()
         except Exception:
             pass
         self.Destroy()
@@ -158,11 +275,21 @@ class MainFrame(wx.Frame):
         try:
             new_idx = evt.GetSelection()
             page = self.nb.GetPage(new_idx)
-            self.rooms_panel.on_activated(page is self.rooms_panel)
+            self._ensure_page(page)
+            if self.rooms_panel is not None:
+                self.rooms_panel.on_activated(self.rooms_panel.GetParent() is page)
+            if self.transfers_panel is not None:
+                self.transfers_panel.on_activated(self.transfers_panel.GetParent() is page)
         except Exception:
             pass
         evt.Skip()
 
+    def _on_iconize(self, evt):
+        # Stop polling transfers while minimized; catch up on restore
+        if self.transfers_panel is not None:
+            self.transfers_panel.on_minimized(evt.IsIconized())
+        evt.Skip()
+
     # Options handlers
     def _on_toggle_search_auto(self, evt):
         val = self.miSearchAuto.IsChecked()
@@ -184,24 +311,84 @@ class MainFrame(wx.Frame):
         val = self.miTransfersAuto.IsChecked()
         self.cfg.transfers_auto_update = bool(val)
         save_config(self.cfg)
-        self.transfers_panel.set_auto_update(val)
+        if self.transfers_panel is not None:
+            self.transfers_panel.set_auto_update(val)
         self._set_status(f"Transfers Auto Refresh {'On' if val else 'Off'}")
 
+    def _ensure_janitor(self):
+        if self._janitor is None:
+            from ..janitor import Janitor
+            self._janitor = Janitor(
+                lambda: self.service,
+                interval_min=self.cfg.janitor_interval_min,
+                search_retention_min=self.cfg.janitor_search_retention_min,
+                transfer_retention_hours=self.cfg.janitor_transfer_retention_hours,
+                protect_searches=lambda: [self.search_panel.current_search_id or ""],
+                on_report=self._on_janitor_report,
+            )
+        return self._janitor
+
+    def _on_janitor_report(self, rep):
+        # Scheduled sweeps stay quiet unless they reclaimed something
+        if rep.searches_deleted or rep.transfers_removed or rep.errors:
+            call_after(self._set_status, rep.describe(), key=STATUS_KEY)
+
+    def _on_toggle_janitor(self, evt):
+        val = self.miJanitor.IsChecked()
+        self.cfg.janitor_enabled = bool(val)
+        save_config(self.cfg)
+        if val:
+            self._ensure_janitor().start()
+        elif self._janitor is not None:
+            self._janitor.stop()
+        self._set_status(f"Automatic Clean-Up {'On' if val else 'Off'}")
+
+    def _on_clean_up(self, evt):
+        self._set_status("Cleaning up old searches and finished transfers...")
+        self._ensure_janitor().run_now(lambda rep: call_after(self._set_status, rep.describe(), key=STATUS_KEY))
+
+    def _on_toggle_auto_retry(self, evt):
+        val = self.miAutoRetry.IsChecked()
+        self.cfg.transfers_auto_retry = bool(val)
+        save_config(self.cfg)
+        if val:
+            self._ensure_transfers_panel()
+        if self.transfers_panel is not None:
+            self.transfers_panel.set_auto_retry(val)
+        self._set_status(f"Auto Retry {'On' if val else 'Off'}")
+
     def _on_set_transfers_interval(self, evt):
         val = wx.GetNumberFromUser("Seconds between transfer updates:", "Seconds:", "Transfers Interval", self.cfg.transfers_interval_sec, 1, 300, self)
         if val == -1:
             return
         self.cfg.transfers_interval_sec = int(val)
         save_config(self.cfg)
-        self.transfers_panel.set_interval(self.cfg.transfers_interval_sec)
+        if self.transfers_panel is not None:
+            self.transfers_panel.set_interval(self.cfg.transfers_interval_sec)
         self._set_status(f"Transfers interval {self.cfg.transfers_interval_sec}s")
 
+    def _on_set_uploads_interval(self, evt):
+        val = wx.GetNumberFromUser("Seconds between upload list updates:", "Seconds:", "Uploads Interval", self.cfg.transfers_uploads_interval_sec, 1, 3600, self)
+        if val == -1:
+            return
+        self.cfg.transfers_uploads_interval_sec = int(val)
+        save_config(self.cfg)
+        if self.transfers_panel is not None:
+            self.transfers_panel.set_uploads_interval(self.cfg.transfers_uploads_interval_sec)
+        self._set_status(f"Uploads interval {self.cfg.transfers_uploads_interval_sec}s")
+
     def _on_share_manager(self, evt):
         from .share_manager import ShareManagerDialog
         dlg = ShareManagerDialog(self, self.service)
         dlg.ShowModal()
         dlg.Destroy()
 
+    def _on_search_messages(self, evt):
+        from .message_search import MessageSearchDialog
+        dlg = MessageSearchDialog(self)
+        dlg.ShowModal()
+        dlg.Destroy()
+
     def _on_set_downloads_folder(self, evt):
         # Pull current YAML to prefill
         try:
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict, List
+
+import wx
+
+from ..message_archive import KIND_PM, message_archive
+from .dispatcher import call_after
+
+RESULT_LIMIT = 500
+
+
+class MessageSearchDialog(wx.Dialog):
+    """Search the local archive of room and private messages."""
+
+    def __init__(self, parent):
+        super().__init__(parent, title="Search Messages", style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER, size=(820, 560))
+        self._rows: List[Dict[str, Any]] = []
+        self._seq = 0
+        self._build_ui()
+        self.txtText.SetFocus()
+
+    def _build_ui(self):
+        pnl = wx.Panel(self)
+        tops = wx.BoxSizer(wx.VERTICAL)
+
+        row = wx.BoxSizer(wx.HORIZONTAL)
+        row.Add(wx.StaticText(pnl, label="Text (&T):"), 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 6)
+        self.txtText = wx.TextCtrl(pnl, style=wx.TE_PROCESS_ENTER)
+        row.Add(self.txtText, 1, wx.RIGHT, 10)
+        row.Add(wx.StaticText(pnl, label="From user (&U):"), 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 6)
+        self.txtUser = wx.TextCtrl(pnl, style=wx.TE_PROCESS_ENTER)
+        row.Add(self.txtUser, 0, wx.RIGHT, 10)
+        row.Add(wx.StaticText(pnl, label="Room or conversation (&R):"), 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 6)
+        self.txtChannel = wx.TextCtrl(pnl, style=wx.TE_PROCESS_ENTER)
+        row.Add(self.txtChannel, 0, wx.RIGHT, 10)
+        self.btnSearch = wx.Button(pnl, wx.ID_ANY, "&Search")
+        row.Add(self.btnSearch, 0)
+        tops.Add(row, 0, wx.EXPAND | wx.ALL, 8)
+
+        tops.Add(wx.StaticText(pnl, label="Messages:"), 0, wx.LEFT, 8)
+        self.lst = wx.ListCtrl(pnl, style=wx.LC_REPORT | wx.BORDER_SUNKEN)
+        self.lst.InsertColumn(0, "When", width=140)
+        self.lst.InsertColumn(1, "Where", width=150)
+        self.lst.InsertColumn(2, "From", width=130)
+        self.lst.InsertColumn(3, "Message", width=380)
+        tops.Add(self.lst, 1, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 8)
+
+        brow = wx.BoxSizer(wx.HORIZONTAL)
+        self.lblStatus = wx.StaticText(pnl, label="")
+        brow.Add(self.lblStatus, 1, wx.ALIGN_CENTER_VERTICAL)
+        self.btnCopy = wx.Button(pnl, wx.ID_ANY, "&Copy Message")
+        self.btnClose = wx.Button(pnl, wx.ID_CANCEL, "C&lose")
+        brow.Add(self.btnCopy, 0, wx.RIGHT, 6)
+        brow.Add(self.btnClose, 0)
+        tops.Add(brow, 0, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 8)
+
+        pnl.SetSizer(tops)
+
+        self.Bind(wx.EVT_BUTTON, self._on_search, self.btnSearch)
+        for ctrl in (self.txtText, self.txtUser, self.txtChannel):
+            self.Bind(wx.EVT_TEXT_ENTER, self._on_search, ctrl)
+        self.Bind(wx.EVT_BUTTON, self._on_copy, self.btnCopy)
+
+    def _on_search(self, evt):
+        text = self.txtText.GetValue().strip()
+        user = self.txtUser.GetValue().strip()
+        channel = self.txtChannel.GetValue().strip()
+        if not (text or user or channel):
+            self.lblStatus.SetLabel("Enter text, a user or a room to search for.")
+            return
+        self._seq += 1
+        seq = self._seq
+        self.lblStatus.SetLabel("Searching…")
+
+        def worker():
+            try:
+                t0 = time.perf_counter()
+                rows = message_archive.search(text, user=user, channel=channel, limit=RESULT_LIMIT)
+                ms = (time.perf_counter() - t0) * 1000.0
+                call_after(self._fill, seq, rows, ms, key=(id(self), "results"))
+            except Exception as e:
+                call_after(self._failed, seq, str(e), key=(id(self), "results"))
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _fill(self, seq: int, rows: List[Dict[str, Any]], ms: float):
+        # The dialog may have closed, or a newer search started, while this one ran
+        if not self or seq != self._seq:
+            return
+        self._rows = rows
+        self.lst.Freeze()
+        try:
+            self.lst.DeleteAllItems()
+            for r in rows:
+                where = f"PM {r['channel']}" if r["kind"] == KIND_PM else r["channel"]
+                who = "Me" if r["direction"] == "out" else r["username"]
+                idx = self.lst.InsertItem(self.lst.GetItemCount(), time.strftime("%Y-%m-%d %H:%M", time.localtime(r["at"])))
+                self.lst.SetItem(idx, 1, where)
+                self.lst.SetItem(idx, 2, who)
+                self.lst.SetItem(idx, 3, r["message"])
+        finally:
+            self.lst.Thaw()
+        more = " (newest shown)" if len(rows) >= RESULT_LIMIT else ""
+        self.lblStatus.SetLabel(f"{len(rows)} messages{more} in {ms:.0f} ms.")
+        if rows:
+            self.lst.Focus(0)
+            self.lst.Select(0)
+
+    def _failed(self, seq: int, err: str):
+        if not self or seq != self._seq:
+            return
+        self.lblStatus.SetLabel(f"Search failed: {err}")
+        wx.Bell()
+
+    def _on_copy(self, evt):
+        idx = self.lst.GetFirstSelected()
+        if idx < 0 or idx >= len(self._rows):
+            self.lblStatus.SetLabel("Select a message.")
+            return
+        if wx.TheClipboard.Open():
+            try:
+                wx.TheClipboard.SetData(wx.TextDataObject(self._rows[idx]["message"]))
+            finally:
+                wx.TheClipboard.Close()
+            self.lblStatus.SetLabel("Message copied.")
@@ -1,11 +1,12 @@
 from __future__ import annotations
 
 import threading
-from typing import List
+from typing import Dict, List
 
 import wx
-from slskd_api.apis._types import Conversation
-from ..slsk_client import SlskService
+from ..message_archive import message_archive, pm_rows
+from ..slsk_client import Conversation, SlskService
+from .dispatcher import STATUS_KEY, call_after
 
 
 class PmPanel(wx.Panel):
@@ -13,6 +14,9 @@ class PmPanel(wx.Panel):
         super().__init__(parent)
         self.service = service
         self.on_status = on_status
+        # username -> unacknowledged count when that conversation was last archived
+        self._archived: Dict[str, int] = {}
+        self._archive_lock = threading.Lock()
         self._build_ui()
 
     def _build_ui(self):
@@ -61,12 +65,29 @@ class PmPanel(wx.Panel):
         def worker():
             try:
                 convs = self.service.conversations()
-                wx.CallAfter(self._fill_convs, convs)
+                call_after(self._fill_convs, convs, key=(id(self), "convs"))
             except Exception as e:
-                wx.CallAfter(self._with_status, f"Refresh failed: {e}")
+                call_after(self._with_status, f"Refresh failed: {e}", key=STATUS_KEY)
                 wx.Bell()
+                return
+            self._archive_conversations(convs)
         threading.Thread(target=worker, daemon=True).start()
 
+    def _archive_conversations(self, convs: List[Conversation]):
+        """Save conversations not archived yet this session, or whose unread count moved. Runs on a worker."""
+        with self._archive_lock:
+            for c in convs or []:
+                user = c.get("username", "")
+                unacked = int(c.get("unAcknowledgedMessageCount", 0) or 0)
+                if not user or self._archived.get(user) == unacked:
+                    continue
+                try:
+                    message_archive.record(pm_rows(user, self.service.conversation_messages(user)))
+                except Exception:
+                    # Tried again on the next refresh
+                    continue
+                self._archived[user] = unacked
+
     def _fill_convs(self, convs: List[Conversation]):
         self.lstConvs.Freeze()
         try:
@@ -84,11 +105,11 @@ class PmPanel(wx.Panel):
         # Fetch messages by conversation
         def worker():
             try:
-                conv = self.service._client.conversations.get(user, includeMessages=True)
-                msgs = conv.get("messages", []) or []
-                wx.CallAfter(self._fill_history, msgs)
+                msgs = self.service.conversation_messages(user)
+                message_archive.record(pm_rows(user, msgs))
+                call_after(self._fill_history, msgs, key=(id(self), "history"))
             except Exception as e:
-                wx.CallAfter(self._with_status, f"Load history failed: {e}")
+                call_after(self._with_status, f"Load history failed: {e}", key=STATUS_KEY)
                 wx.Bell()
         threading.Thread(target=worker, daemon=True).start()
 
@@ -110,11 +131,11 @@ class PmPanel(wx.Panel):
         def worker():
             try:
                 ok = self.service.pm_send(user, msg)
-                wx.CallAfter(self._with_status, "Private message sent." if ok else "Send failed.")
-                wx.CallAfter(self.txtMsg.Clear)
-                wx.CallAfter(self._on_refresh, None)
+                call_after(self._with_status, "Private message sent." if ok else "Send failed.", key=STATUS_KEY)
+                call_after(self.txtMsg.Clear)
+                call_after(self._on_refresh, None, key=(id(self), "refresh"))
             except Exception as e:
-                wx.CallAfter(self._with_status, f"Send failed: {e}")
+                call_after(self._with_status, f"Send failed: {e}", key=STATUS_KEY)
                 wx.Bell()
         threading.Thread(target=worker, daemon=True).start()
 
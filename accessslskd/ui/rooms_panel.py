@@ -1,10 +1,21 @@
 from __future__ import annotations
 
 import threading
-from typing import List, Optional, Tuple, Dict
+import time
+from collections import deque
+from typing import Deque, List, Optional, Tuple, Dict
 
 import wx
+from ..message_archive import message_archive, room_rows
+from ..perf_log import perf_timer
+from ..room_buffer import ROOM_BUFFER_SIZE, RoomBuffer, RoomPollSchedule, format_room_message
 from ..slsk_client import SlskService
+from .dispatcher import STATUS_KEY, call_after
+
+# Lines allowed past the buffer size before the oldest are cut from the text box
+TRIM_SLACK = 100
+# The room poller wakes this often and polls at most one due room
+POLL_TICK_MS = 1000
 
 
 class RoomsPanel(wx.Panel):
@@ -15,7 +26,16 @@ class RoomsPanel(wx.Panel):
         self._avail_timer: Optional[wx.Timer] = None
         self._msg_timer: Optional[wx.Timer] = None
         self._msgs_in_progress = False
-        self._last_msg_count: Dict[str, int] = {}
+        # Whether the Rooms tab is showing; other rooms (and this one while hidden) collect unread counts
+        self._active = False
+        self._schedule = RoomPollSchedule()
+        # Joined room names, in list order (list labels carry unread counts)
+        self._room_names: List[str] = []
+        # Messages seen per room, and which room the text box currently shows
+        self._buffers: Dict[str, RoomBuffer] = {}
+        self._shown_room: Optional[str] = None
+        # Text box length of each message shown, oldest first; trimming removes by character offset
+        self._shown_lengths: Deque[int] = deque()
         self._build_ui()
 
     def _build_ui(self):
@@ -87,24 +107,33 @@ class RoomsPanel(wx.Panel):
 
     # Activation from MainFrame (starts auto-refresh of the available list)
     def on_activated(self, active: bool):
+        self._active = active
         if active:
             if not self._avail_timer:
                 self._avail_timer = wx.Timer(self)
                 self.Bind(wx.EVT_TIMER, self._on_timer_available, self._avail_timer)
             if not self._msg_timer:
+                # Joined rooms keep being polled once the panel exists, tab shown or not
                 self._msg_timer = wx.Timer(self)
                 self.Bind(wx.EVT_TIMER, self._on_timer_messages, self._msg_timer)
+                self._msg_timer.Start(POLL_TICK_MS)
             # Kick off immediate load, then every 60s
             self._load_available()
             self._on_refresh(None)
             self._avail_timer.Start(60000)
-            # Auto-refresh messages for selected room every 3s
-            self._msg_timer.Start(3000)
+            room = self._current_room()
+            if room:
+                self._show_room(room)
         else:
             if self._avail_timer:
                 self._avail_timer.Stop()
-            if self._msg_timer:
-                self._msg_timer.Stop()
+
+    def stop(self):
+        """Stop all polling (the main window is closing)."""
+        self._active = False
+        for t in (self._avail_timer, self._msg_timer):
+            if t:
+                t.Stop()
 
     def _on_join(self, evt):
         name = self.txtRoom.GetValue().strip()
@@ -114,10 +143,10 @@ class RoomsPanel(wx.Panel):
         def worker():
             try:
                 self.service.rooms_join(name)
-                wx.CallAfter(self._with_status, f"Joined {name}.")
-                wx.CallAfter(self._on_refresh, None)
+                call_after(self._with_status, f"Joined {name}.", key=STATUS_KEY)
+                call_after(self._on_refresh, None, key=(id(self), "refresh"))
             except Exception as e:
-                wx.CallAfter(self._with_status, f"Join failed: {e}")
+                call_after(self._with_status, f"Join failed: {e}", key=STATUS_KEY)
                 wx.Bell()
         threading.Thread(target=worker, daemon=True).start()
 
@@ -129,10 +158,10 @@ class RoomsPanel(wx.Panel):
         def worker():
             try:
                 ok = self.service.rooms_leave(name)
-                wx.CallAfter(self._with_status, f"Left {name}." if ok else f"Leave failed for {name}.")
-                wx.CallAfter(self._on_refresh, None)
+                call_after(self._with_status, f"Left {name}." if ok else f"Leave failed for {name}.", key=STATUS_KEY)
+                call_after(self._on_refresh, None, key=(id(self), "refresh"))
             except Exception as e:
-                wx.CallAfter(self._with_status, f"Leave failed: {e}")
+                call_after(self._with_status, f"Leave failed: {e}", key=STATUS_KEY)
                 wx.Bell()
         threading.Thread(target=worker, daemon=True).start()
 
@@ -140,9 +169,9 @@ class RoomsPanel(wx.Panel):
         def worker():
             try:
                 joined = self.service.rooms_joined()
-                wx.CallAfter(self._fill_rooms, joined)
+                call_after(self._fill_rooms, joined, key=(id(self), "joined"))
             except Exception as e:
-                wx.CallAfter(self._with_status, f"Refresh failed: {e}")
+                call_after(self._with_status, f"Refresh failed: {e}", key=STATUS_KEY)
                 wx.Bell()
         threading.Thread(target=worker, daemon=True).start()
 
@@ -150,25 +179,35 @@ class RoomsPanel(wx.Panel):
         self._load_available()
 
     def _on_timer_messages(self, evt):
-        # Poll messages for the currently selected room
+        # One poller for every joined room: at most one request per tick, the
+        # room on screen most often, quiet rooms backing off.
         if self._msgs_in_progress:
             return
-        room = self._current_room()
+        selected = self._current_room() if self._active else None
+        room = self._schedule.next_due(selected, time.monotonic())
         if not room:
             return
         self._msgs_in_progress = True
         def worker():
             try:
                 msgs = self.service.rooms_messages(room)
-                wx.CallAfter(self._display_messages, room, msgs)
-            except Exception as e:
-                wx.CallAfter(self._with_status, f"Load messages failed: {e}")
+                call_after(self._display_messages, room, msgs, key=(id(self), "messages", room))
+            except Exception:
+                # Background polls fail quietly; the next one retries
+                msgs = None
             finally:
-                wx.CallAfter(self._mark_msgs_idle)
+                call_after(self._after_poll, room, msgs is not None)
         threading.Thread(target=worker, daemon=True).start()
 
-    def _mark_msgs_idle(self):
+    def _poll_soon(self, room: str):
+        self._schedule.poll_now(room, time.monotonic())
+
+    def _after_poll(self, room: str, ok: bool):
         self._msgs_in_progress = False
+        buf = self._buffers.get(room)
+        had_new = bool(ok and buf is not None and buf.last_new)
+        selected = self._active and room == self._current_room()
+        self._schedule.polled(room, selected=selected, had_new=had_new, now=time.monotonic())
 
     def _load_available(self):
         def worker():
@@ -183,9 +222,9 @@ class RoomsPanel(wx.Panel):
                         pass
                 # Sort by user count desc, then name
                 rows.sort(key=lambda x: (-x[1], x[0].lower()))
-                wx.CallAfter(self._fill_available, rows)
+                call_after(self._fill_available, rows, key=(id(self), "available"))
             except Exception as e:
-                wx.CallAfter(self._with_status, f"Load rooms failed: {e}")
+                call_after(self._with_status, f"Load rooms failed: {e}", key=STATUS_KEY)
         threading.Thread(target=worker, daemon=True).start()
 
     def _fill_available(self, rows: List[Tuple[str, int, bool]]):
@@ -211,52 +250,121 @@ class RoomsPanel(wx.Panel):
         self._on_join(None)
 
     def _fill_rooms(self, names: List[str]):
-        self.lstRooms.Set(names or [])
-        count = len(names or [])
+        names = list(names or [])
+        keep = self._current_room()
+        self._room_names = names
+        self._schedule.set_rooms(names, time.monotonic())
+        for gone in [r for r in self._buffers if r not in names]:
+            del self._buffers[gone]
+        self.lstRooms.Set([self._room_label(r) for r in names])
+        count = len(names)
         self.lblJoinedSummary.SetLabel(f"({count} joined)")
         self._with_status(f"{count} rooms joined.")
         if names:
-            self.lstRooms.SetSelection(0)
-            self._load_messages(names[0])
+            room = keep if keep in names else names[0]
+            self.lstRooms.SetSelection(names.index(room))
+            self._show_room(room)
             self._update_selected_status()
         else:
+            self._shown_room = None
             self.lblSelectedStatus.SetLabel("Not joined.")
 
+    def _room_label(self, room: str) -> str:
+        buf = self._buffers.get(room)
+        n = buf.unread if buf is not None else 0
+        return f"{room} ({n} unread)" if n else room
+
+    def _relabel_room(self, room: str):
+        if room not in self._room_names:
+            return
+        i = self._room_names.index(room)
+        label = self._room_label(room)
+        if self.lstRooms.GetString(i) != label:
+            self.lstRooms.SetString(i, label)
+
     def _current_room(self) -> str | None:
         sel = self.lstRooms.GetSelection()
-        if sel == wx.NOT_FOUND:
+        if sel == wx.NOT_FOUND or sel >= len(self._room_names):
             return None
-        return self.lstRooms.GetString(sel)
+        return self._room_names[sel]
 
     def _on_select_room(self, evt):
         name = self._current_room()
         if name:
-            self._load_messages(name)
+            self._show_room(name)
             self._update_selected_status()
 
-    def _load_messages(self, room: str):
-        self._with_status(f"Loading messages for {room}...")
-        def worker():
-            try:
-                msgs = self.service.rooms_messages(room)
-                wx.CallAfter(self._display_messages, room, msgs)
-            except Exception as e:
-                wx.CallAfter(self._with_status, f"Load messages failed: {e}")
-                wx.Bell()
-        threading.Thread(target=worker, daemon=True).start()
+    def _show_room(self, room: str):
+        """Render a room from its buffer at once, then poll it right away."""
+        buf = self._buffers.get(room)
+        if buf is not None:
+            self._render_room(room, buf, [])
+        else:
+            self._shown_room = None
+            self.txtMessages.Clear()
+            self._shown_lengths.clear()
+            self._with_status(f"Loading messages for {room}...")
+        self._schedule.poll_now(room, time.monotonic())
 
     def _display_messages(self, room: str, msgs):
-        prev = int(self._last_msg_count.get(room, 0))
-        cur = len(msgs or [])
-        if cur != prev:
-            # Re-render for simplicity; NVDA will read the update once.
-            self.txtMessages.Clear()
-            for m in msgs or []:
-                self.txtMessages.AppendText(f"[{m.get('timestamp','')}] {m.get('username','')}: {m.get('message','')}\n")
-            self._last_msg_count[room] = cur
-            self._with_status(f"{cur} messages in {room}.")
+        buf = self._buffers.get(room)
+        if buf is None:
+            buf = self._buffers[room] = RoomBuffer()
+        primed = buf.primed
+        new = buf.merge(msgs or [])
+        if new:
+            # Only a queue put; the archive writes on its own thread
+            message_archive.record(room_rows(room, new))
+        if not (self._active and room == self._current_room()):
+            # The first poll's backlog is history, not news
+            if primed and new:
+                buf.unread += len(new)
+                self._relabel_room(room)
+            return
+        self._render_room(room, buf, new)
+
+    def _render_room(self, room: str, buf: RoomBuffer, new):
+        pending = buf.unread
+        if pending:
+            buf.unread = 0
+            self._relabel_room(room)
+            if room == self._shown_room:
+                # Arrived while the tab was hidden; append those too (or redraw if they overflowed)
+                if pending >= len(buf):
+                    self._shown_room = None
+                else:
+                    new = list(buf.messages)[len(buf) - pending:]
+        if room != self._shown_room:
+            # Switched rooms: draw that room's buffer once
+            with perf_timer("rooms.render", payload=len(buf), rows=len(buf), room=room):
+                self.txtMessages.Clear()
+                self._shown_lengths.clear()
+                self._append_messages(buf.messages)
+            self._shown_room = room
+            self._with_status(f"{len(buf)} messages in {room}.")
+        elif new:
+            # Append only what's new; NVDA reads just the added lines
+            with perf_timer("rooms.render", payload=len(new), rows=len(new), room=room):
+                self._append_messages(new)
+                self._trim_messages()
+            self._with_status(f"{len(new)} new message(s) in {room}.")
         self._update_selected_status()
 
+    def _append_messages(self, msgs):
+        lines = [format_room_message(m) for m in msgs]
+        # MSW text controls count each newline as two positions (\r\n)
+        crlf = wx.Platform == "__WXMSW__"
+        self._shown_lengths.extend(len(t) + (t.count("\n") if crlf else 0) for t in lines)
+        self.txtMessages.AppendText("".join(lines))
+
+    def _trim_messages(self):
+        # Counted in messages, not text lines: a message may span several (embedded newlines, wrapping)
+        excess = len(self._shown_lengths) - ROOM_BUFFER_SIZE
+        if excess < TRIM_SLACK:
+            return
+        end = sum(self._shown_lengths.popleft() for _ in range(excess))
+        self.txtMessages.Remove(0, end)
+
     def _on_send(self, evt):
         room = self._current_room()
         if not room:
@@ -269,11 +377,11 @@ class RoomsPanel(wx.Panel):
         def worker():
             try:
                 ok = self.service.rooms_send(room, msg)
-                wx.CallAfter(self._with_status, "Message sent." if ok else "Send failed.")
-                wx.CallAfter(self.txtMsg.Clear)
-                wx.CallAfter(self._load_messages, room)
+                call_after(self._with_status, "Message sent." if ok else "Send failed.", key=STATUS_KEY)
+                call_after(self.txtMsg.Clear)
+                call_after(self._poll_soon, room)
             except Exception as e:
-                wx.CallAfter(self._with_status, f"Send failed: {e}")
+                call_after(self._with_status, f"Send failed: {e}", key=STATUS_KEY)
                 wx.Bell()
         threading.Thread(target=worker, daemon=True).start()
 
@@ -282,7 +390,6 @@ class RoomsPanel(wx.Panel):
         if not room:
             self.lblSelectedStatus.SetLabel("Selected: (none)")
             return
-        # Assume rooms_joined() reflects truth; label to 'Joined' if present in list
-        names = [self.lstRooms.GetString(i) for i in range(self.lstRooms.GetCount())]
-        joined = room in names
+        # Assume rooms_joined() reflects truth
+        joined = room in self._room_names
         self.lblSelectedStatus.SetLabel(f"Selected: {room} — {'Joined' if joined else 'Not joined'}")
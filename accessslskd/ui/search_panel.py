@@ -6,9 +6,12 @@ from typing import List, Dict, Any, Optional, Set
 import os
 
 import wx
-from slskd_api.apis._types import SearchResponseItem, SearchState
 
-from ..slsk_client import SlskService
+from ..perf_log import perf_event, perf_timer
+from ..slsk_client import SearchResponseItem, SearchState, SlskService
+from ..user_stats import TIER_BAD, user_stats
+from .directory_download import download_directories
+from .dispatcher import STATUS_KEY, call_after
 
 
 class SearchPanel(wx.Panel):
@@ -217,8 +220,11 @@ class SearchPanel(wx.Panel):
 
     def _flatten_responses(self, responses: List[SearchResponseItem], ignore_type: bool = False) -> List[Dict[str, Any]]:
         flat: List[Dict[str, Any]] = []
-        for r in responses or []:
+        # Peers with a good track record first, known-bad ones last (stable within a tier)
+        responses = sorted(responses or [], key=lambda r: user_stats.tier(r.get("username", "")))
+        for r in responses:
             user = r.get("username", "")
+            track = user_stats.describe(user)
             queue = int(r.get("queueLength", 0))
             speed = int(r.get("uploadSpeed", 0))
             slot = bool(r.get("hasFreeUploadSlot"))
@@ -233,6 +239,7 @@ class SearchPanel(wx.Panel):
                         queueLength=queue,
                         uploadSpeed=speed,
                         hasFreeUploadSlot=slot,
+                        history=track,
                         file=f or {},
                     ))
         return flat
@@ -262,20 +269,23 @@ class SearchPanel(wx.Panel):
         if f.get("sampleRate") is not None:
             parts.append(f"SampleRate: {f.get('sampleRate')}")
         parts.append(f"Locked: {'Yes' if f.get('isLocked') else 'No'}")
+        if row.get("history"):
+            parts.append(f"History: {row['history']}")
         # Include folder at the end for reference
         if folder:
             parts.append(f"Folder: {folder}")
         return "; ".join(parts)
 
     def _populate_flat(self, flat_rows: List[Dict[str, Any]]):
-        self.lstFiles.Freeze()
-        try:
-            self.lstFiles.DeleteAllItems()
-            for row in flat_rows:
-                text = self._format_row_text(row)
-                self.lstFiles.InsertItem(self.lstFiles.GetItemCount(), text)
-        finally:
-            self.lstFiles.Thaw()
+        with perf_timer("search.repaint", rows=len(flat_rows)):
+            self.lstFiles.Freeze()
+            try:
+                self.lstFiles.DeleteAllItems()
+                for row in flat_rows:
+                    text = self._format_row_text(row)
+                    self.lstFiles.InsertItem(self.lstFiles.GetItemCount(), text)
+            finally:
+                self.lstFiles.Thaw()
         self._flat_rows = flat_rows
 
     # Event handlers
@@ -318,12 +328,12 @@ class SearchPanel(wx.Panel):
                         time.sleep(0.2)
                         waited += 0.2
                     if waited >= 0.6:
-                        wx.CallAfter(self._with_status, f"Starting new search (waited {waited:.1f}s for previous to finish).")
+                        call_after(self._with_status, f"Starting new search (waited {waited:.1f}s for previous to finish).", key=STATUS_KEY)
                 res = self.service.start_search(query, timeout_ms=getattr(self, "_search_timeout_ms", 0) or None)
                 self.current_search_id = res.id
-                wx.CallAfter(self._after_new_search_started, res.id)
+                call_after(self._after_new_search_started, res.id)
             except Exception as e:
-                wx.CallAfter(self._after_error, f"Search failed: {e}")
+                call_after(self._after_error, f"Search failed: {e}")
 
         threading.Thread(target=worker, daemon=True).start()
 
@@ -341,9 +351,9 @@ class SearchPanel(wx.Panel):
             try:
                 res = self.service.start_search(query, timeout_ms=getattr(self, "_search_timeout_ms", 0) or None)
                 self.current_search_id = res.id
-                wx.CallAfter(self._after_new_search_started, res.id)
+                call_after(self._after_new_search_started, res.id)
             except Exception as e:
-                wx.CallAfter(self._after_error, f"Search failed: {e}")
+                call_after(self._after_error, f"Search failed: {e}")
 
         threading.Thread(target=worker, daemon=True).start()
 
@@ -403,6 +413,10 @@ class SearchPanel(wx.Panel):
             self._with_status("Select a file so I know which user.")
             return
         user = rows[0].get("username", "")
+        if user_stats.tier(user) == TIER_BAD:
+            msg = f"{user} has often failed to deliver:\n{user_stats.describe(user)}\n\nEnqueue all of their files anyway?"
+            if wx.MessageBox(msg, "Unreliable User", wx.YES_NO | wx.NO_DEFAULT | wx.ICON_WARNING, parent=self) != wx.YES:
+                return
         files = []
         for r in self._flat_rows:
             if r.get("username", "") == user:
@@ -423,9 +437,9 @@ class SearchPanel(wx.Panel):
                         if not ok:
                             failures += len(files)
                 msg = f"Enqueued {total - failures}/{total} file(s)."
-                wx.CallAfter(self._with_status, msg)
+                call_after(self._with_status, msg, key=STATUS_KEY)
             except Exception as e:
-                wx.CallAfter(self._after_error, f"Enqueue failed: {e}")
+                call_after(self._after_error, f"Enqueue failed: {e}")
 
         threading.Thread(target=worker, daemon=True).start()
 
@@ -461,25 +475,20 @@ class SearchPanel(wx.Panel):
         if not rows:
             self._with_status("Select a file first.")
             return
-        # Take first selected
-        r = rows[0]
-        user = r.get("username", "")
-        f = r.get("file", {}) or {}
-        full = str(f.get("filename", "") or "")
-        sep_pos = max(full.rfind("\\"), full.rfind("/"))
-        directory = full[:sep_pos] if sep_pos >= 0 else ""
-        if not directory:
+        # The first selected result's user; every selected folder of theirs
+        user = rows[0].get("username", "")
+        dirs = []
+        for r in rows:
+            if r.get("username", "") != user:
+                continue
+            full = str((r.get("file", {}) or {}).get("filename", "") or "")
+            sep_pos = max(full.rfind("\\"), full.rfind("/"))
+            if sep_pos > 0:
+                dirs.append(full[:sep_pos])
+        if not dirs:
             self._with_status("Could not determine containing directory.")
             return
-        self._with_status(f"Enqueueing directory for {user}: {directory} …")
-
-        def worker():
-            try:
-                count = self.service.enqueue_directory(user, directory)
-                wx.CallAfter(self._with_status, f"Enqueued {count} file(s) from directory.")
-            except Exception as e:
-                wx.CallAfter(self._after_error, f"Download directory failed: {e}")
-        threading.Thread(target=worker, daemon=True).start()
+        download_directories(self, self.service, user, dirs, self._with_status)
 
     def _on_browse_user(self, evt):
         rows = self._selected_file_rows()
@@ -541,11 +550,12 @@ class SearchPanel(wx.Panel):
                 t2 = time.perf_counter()
                 flat = self._flatten_responses(responses, ignore_type=False)
                 t_flat = (time.perf_counter() - t2) * 1000.0
-                wx.CallAfter(self._after_fetch_once, flat, state, dict(ms_state=t_state, ms_resp=t_resp, ms_flat=t_flat, fallback=int(fallback_used)))
+                perf_event("search.flatten", t_flat, payload=len(responses), rows=len(flat), fallback=int(fallback_used))
+                call_after(self._after_fetch_once, flat, state, dict(ms_state=t_state, ms_resp=t_resp, ms_flat=t_flat, fallback=int(fallback_used)), key=(id(self), "fetch-result"))
             except Exception as e:
-                wx.CallAfter(self._after_error, f"Update failed: {e}")
+                call_after(self._after_error, f"Update failed: {e}")
             finally:
-                wx.CallAfter(self._mark_idle)
+                call_after(self._mark_idle)
         threading.Thread(target=worker, daemon=True).start()
 
     def _mark_idle(self):
@@ -12,6 +12,7 @@ except Exception as _yaml_err:
     yaml = None  # type: ignore
 
 from ..slsk_client import SlskService
+from .dispatcher import STATUS_KEY, call_after
 
 
 class ShareManagerDialog(wx.Dialog):
@@ -99,9 +100,9 @@ class ShareManagerDialog(wx.Dialog):
                 # YAML (remote configuration)
                 yml = self.service.options_download_yaml()
                 shares = self.service.shares_list()
-                wx.CallAfter(self._after_load, yml, shares)
+                call_after(self._after_load, yml, shares)
             except Exception as e:
-                wx.CallAfter(self._after_error, f"Load failed: {e}")
+                call_after(self._after_error, f"Load failed: {e}")
         threading.Thread(target=worker, daemon=True).start()
 
     def _after_load(self, yaml_text: str, shares: dict):
@@ -193,9 +194,9 @@ class ShareManagerDialog(wx.Dialog):
         def worker():
             try:
                 ok = self.service.shares_rescan()
-                wx.CallAfter(self._status, "Rescan started." if ok else "Rescan request failed.")
+                call_after(self._status, "Rescan started." if ok else "Rescan request failed.", key=STATUS_KEY)
             except Exception as e:
-                wx.CallAfter(self._after_error, f"Rescan failed: {e}")
+                call_after(self._after_error, f"Rescan failed: {e}")
         threading.Thread(target=worker, daemon=True).start()
 
     def _on_ok(self, evt):
@@ -300,9 +301,9 @@ class ShareManagerDialog(wx.Dialog):
                     shares_after = self.service.shares_list()
                 else:
                     shares_after = {}
-                wx.CallAfter(self._after_save, ok, shares_after, [it["path"] for it in items])
+                call_after(self._after_save, ok, shares_after, [it["path"] for it in items])
             except Exception as e:
-                wx.CallAfter(self._after_error, f"Save failed: {e}")
+                call_after(self._after_error, f"Save failed: {e}")
         threading.Thread(target=worker, daemon=True).start()
 
     def _after_save(self, ok: bool, shares_after: dict, intended_paths: list):
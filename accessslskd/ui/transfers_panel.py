@@ -1,23 +1,131 @@
 from __future__ import annotations
 
 import threading
-from typing import List
+import time
+from typing import List, Optional
 
 import wx
-from slskd_api.apis._types import Transfer, TransferedDirectory, TransferedFile
-from ..slsk_client import SlskService
+from ..bulk import BulkResult, run_bulk
+from ..history import history, row_from_record
+from ..user_stats import user_stats
+from ..perf_log import perf_event
+from ..queue_resolver import QueueLengthResolver
+from ..retry import RetryScheduler
+from ..throughput import ThroughputTracker, format_eta, format_rate, format_size
+from ..slsk_client import SlskService, Transfer
+from ..transfer_store import TransferGroups, TransferKey, TransferRecord, TransferStore, is_queued_state, state_bucket
+from .dispatcher import STATUS_KEY, call_after
+
+
+# (title, width) of the per-file and per-directory views
+FILE_COLUMNS = (
+    ("Dir", 50), ("Username", 140), ("Directory", 260), ("File", 320), ("State", 120),
+    ("%", 60), ("Speed", 80), ("Rate", 90), ("ETA", 80), ("ID", 220),
+)
+GROUP_COLUMNS = (
+    ("Dir", 50), ("Username", 140), ("Directory", 320), ("Files", 60), ("State", 220),
+    ("%", 60), ("Size", 150), ("Rate", 90), ("ETA", 80),
+)
+
+
+class TransfersListCtrl(wx.ListCtrl):
+    """Virtual report list; cell text comes from the model (file store or
+    directory groups) for painted rows only."""
+
+    def __init__(self, parent, model):
+        super().__init__(parent, style=wx.LC_REPORT | wx.LC_VIRTUAL | wx.BORDER_SUNKEN)
+        self.model = model
+
+    def OnGetItemText(self, item, col):
+        return self.model.cell(item, col)
+
+    def set_model(self, model, columns):
+        self.model = model
+        self.ClearAll()
+        for i, (title, width) in enumerate(columns):
+            self.InsertColumn(i, title, width=width)
+        self.SetItemCount(len(model))
+
+    def refresh_visible(self):
+        count = self.GetItemCount()
+        if count <= 0:
+            return
+        top = max(0, self.GetTopItem())
+        bottom = min(count - 1, top + self.GetCountPerPage())
+        self.RefreshItems(top, bottom)
+
+    def is_visible(self, idx: int) -> bool:
+        top = self.GetTopItem()
+        return top <= idx <= top + self.GetCountPerPage()
+
+
+# Adaptive refresh: the configured interval applies while something is moving.
+# When every transfer is queued or finished the feed polls this many times
+# slower (but at least IDLE_MIN_S apart); with the tab hidden it drops to
+# HIDDEN_*; while the window is minimized polling stops altogether.
+IDLE_FACTOR = 6
+IDLE_MIN_S = 30
+HIDDEN_ACTIVE_S = 60
+HIDDEN_IDLE_S = 300
+# Parallel API calls for bulk actions on large selections
+BULK_MAX_WORKERS = 8
+
+
+class _Feed:
+    """One transfer direction, fetched on its own timer with its own in-flight flag."""
+
+    def __init__(self, direction: str, fetch, interval_sec: int):
+        self.direction = direction
+        self.fetch = fetch
+        self.interval_sec = max(1, int(interval_sec))
+        self.busy = False
+        self.timer: Optional[wx.Timer] = None
+        self.fetched_at = 0.0
 
 
 class TransfersPanel(wx.Panel):
-    def __init__(self, parent, service: SlskService, on_status, *, auto_update: bool = True, interval_sec: int = 5):
+    def __init__(self, parent, service: SlskService, on_status, *, auto_update: bool = True, interval_sec: int = 5,
+                 uploads_interval_sec: int = 30, queue_ttl_sec: int = 300, on_bandwidth=None,
+                 auto_retry: bool = False):
         super().__init__(parent)
         self.service = service
         self.on_status = on_status
-        self._rows: list = []
+        # Receives "DL x / UL y" for the status bar's right field
+        self.on_bandwidth = on_bandwidth
+        self._store = TransferStore()
+        self._rates = ThroughputTracker()
+        self._store.rate_info = lambda k: (self._rates.rate(k), self._rates.eta(k))
+        # Directory roll-up, maintained only while that view is shown
+        self._groups = TransferGroups()
+        self._groups.rate_info = self._rates.aggregate
+        self._grouped = False
+        # Set while a bulk action runs; setting the event aborts it
+        self._bulk_cancel: Optional[threading.Event] = None
         self._auto_enabled = bool(auto_update)
         self._interval_sec = max(1, int(interval_sec))
-        # Cache username -> queueLength
-        self._queue_cache: dict[str, int] = {}
+        # The panel is built when its tab is first shown
+        self._tab_visible = True
+        self._minimized = False
+        # Downloads and uploads are polled independently: uploads on a busy
+        # share are a large payload that rarely needs to be fresh.
+        self._feeds = {
+            "download": _Feed("download", lambda: self.service.list_downloads_all(include_removed=False), interval_sec),
+            "upload": _Feed("upload", lambda: self.service.list_uploads_all(include_removed=False), uploads_interval_sec),
+        }
+        # Queue lengths per user: parallel lookups, expire after queue_ttl_sec
+        self._queues = QueueLengthResolver(
+            lambda u: int((self.service.user_info(u) or {}).get("queueLength", 0)),
+            lambda: call_after(self._apply_queue_updates, key=(id(self), "queue-lengths")),
+            ttl_s=max(10, int(queue_ttl_sec)),
+        )
+        self._store.queue_info = self._queues.get
+        # Failed downloads: backoff retries, then alternate sources
+        self._retry = RetryScheduler(
+            self.service,
+            on_event=lambda msg: call_after(self._with_status, msg, key=STATUS_KEY),
+            on_enqueued=lambda: call_after(self._fetch_feed, "download", key=(id(self), "retry-refresh")),
+        )
+        self._retry.set_enabled(auto_retry)
         self._build_ui()
         self._build_context()
 
@@ -30,18 +138,13 @@ class TransfersPanel(wx.Panel):
         self.btnPurge = wx.Button(self, wx.ID_ANY, "Remove &Completed")
         row.Add(self.btnRefresh, 0, wx.RIGHT, 6)
         row.Add(self.btnCancel, 0, wx.RIGHT, 6)
-        row.Add(self.btnPurge, 0)
+        row.Add(self.btnPurge, 0, wx.RIGHT, 12)
+        self.chkGroup = wx.CheckBox(self, wx.ID_ANY, "&Group by directory")
+        row.Add(self.chkGroup, 0, wx.ALIGN_CENTER_VERTICAL)
         tops.Add(row, 0, wx.ALL, 8)
 
-        self.lst = wx.ListCtrl(self, style=wx.LC_REPORT | wx.BORDER_SUNKEN)
-        self.lst.InsertColumn(0, "Dir", width=50)  # DL/UL
-        self.lst.InsertColumn(1, "Username", width=140)
-        self.lst.InsertColumn(2, "Directory", width=260)
-        self.lst.InsertColumn(3, "File", width=320)
-        self.lst.InsertColumn(4, "State", width=120)
-        self.lst.InsertColumn(5, "%", width=60)
-        self.lst.InsertColumn(6, "Speed", width=80)
-        self.lst.InsertColumn(7, "ID", width=220)
+        self.lst = TransfersListCtrl(self, self._store)
+        self.lst.set_model(self._store, FILE_COLUMNS)
         tops.Add(self.lst, 1, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 8)
 
         self.SetSizer(tops)
@@ -49,121 +152,248 @@ class TransfersPanel(wx.Panel):
         self.Bind(wx.EVT_BUTTON, self._on_refresh, self.btnRefresh)
         self.Bind(wx.EVT_BUTTON, self._on_cancel, self.btnCancel)
         self.Bind(wx.EVT_BUTTON, self._on_purge, self.btnPurge)
+        self.Bind(wx.EVT_CHECKBOX, self._on_toggle_group, self.chkGroup)
         self.lst.Bind(wx.EVT_LIST_ITEM_RIGHT_CLICK, self._on_right_click)
+        self.lst.Bind(wx.EVT_LIST_COL_CLICK, self._on_col_click)
         self.Bind(wx.EVT_CONTEXT_MENU, self._on_context_menu)
 
-        # Auto refresh timer
-        self.timer = wx.Timer(self)
-        self.Bind(wx.EVT_TIMER, self._on_timer, self.timer)
+        # Auto refresh timers, one per feed
+        for feed in self._feeds.values():
+            feed.timer = wx.Timer(self)
+            self.Bind(wx.EVT_TIMER, lambda e, d=feed.direction: self._on_timer(d), feed.timer)
         self._arm_timer()
 
     def _with_status(self, msg: str):
         if callable(self.on_status):
             self.on_status(msg)
 
+    @property
+    def _view(self):
+        """What the list is showing: the file store or the directory groups."""
+        return self._groups if self._grouped else self._store
+
+    def _on_toggle_group(self, evt):
+        focus = self._selected_record()
+        self._grouped = self.chkGroup.IsChecked()
+        if self._grouped:
+            self._groups.rebuild(self._store)
+            self.lst.set_model(self._groups, GROUP_COLUMNS)
+        else:
+            self.lst.set_model(self._store, FILE_COLUMNS)
+        # Keep the focused transfer (or its directory) in view
+        if focus is not None:
+            key = (focus.direction, focus.username, focus.directory) if self._grouped else focus.key
+            idx = self._view.index_of(key)
+            if idx is not None:
+                self.lst.Select(idx)
+                self.lst.Focus(idx)
+                self.lst.EnsureVisible(idx)
+        self._with_status(f"{len(self._view)} directories." if self._grouped else f"{len(self._store)} transfer rows (downloads + uploads).")
+
     def _on_refresh(self, evt):
+        # Manual refresh (or after an action): fetch both feeds in parallel.
         self.btnRefresh.Disable()
+        for direction in self._feeds:
+            self._fetch_feed(direction)
+
+    def _fetch_feed(self, direction: str):
+        feed = self._feeds[direction]
+        if feed.busy:
+            return
+        feed.busy = True
         def worker():
             try:
-                dls = self.service.list_downloads_all()
-                uls = self.service.list_uploads_all()
-                wx.CallAfter(self._after_refresh, dls, uls)
+                items = feed.fetch()
+                call_after(self._after_feed, direction, items, key=(id(self), "feed", direction))
             except Exception as e:
-                wx.CallAfter(self._after_error, f"Refresh failed: {e}")
+                call_after(self._after_feed_error, direction, f"Refresh failed: {e}")
         threading.Thread(target=worker, daemon=True).start()
 
-    def _after_refresh(self, downloads: List[Transfer], uploads: List[Transfer]):
-        self._rows = []
-        # Preserve selection, focus and scroll by key
-        selected_ids = self._selected_ids()
-        top_key = self._top_key()
+    def _after_feed(self, direction: str, items: List[Transfer]):
+        t0 = time.perf_counter()
+        feed = self._feeds[direction]
+        feed.busy = False
+        feed.fetched_at = time.monotonic()
+        prev_count = len(self._store)
+        # Remember selection by key: indices shift when rows come and go.
+        sel_idx = self._selected_indices()
+        sel_keys = {self._view.key_at(i) for i in sel_idx}
         focus_key = self._focused_key()
+        upd = self._store.update_feed(direction, items)
+        self._rates.sample(direction, ((r.key, r.bytes_done, r.size) for r in self._store.active_records(direction)))
+        self._report_bandwidth()
+        # Directory rows only move by the files in this update
+        vupd = self._groups.apply(self._store, upd) if self._grouped else upd
+        if vupd.structure_changed:
+            self._apply_structure(sel_idx, sel_keys, focus_key)
+        else:
+            for key in vupd.changed:
+                i = self._view.index_of(key)
+                if i is not None and self.lst.is_visible(i):
+                    self.lst.RefreshItem(i)
+        # Finished transfers go to the local history (duplicates are skipped)
+        touched = [self._store.get(k) for k in upd.inserted + upd.changed]
+        history.record(row_from_record(r) for r in touched if r is not None and state_bucket(r.state) in ("done", "failed"))
+        if direction == "download":
+            user_stats.observe(touched)
+            if upd.removed:
+                user_stats.forget(k[2] for k in upd.removed)
+            self._request_queue_lengths()
+            if self._retry.enabled:
+                self._retry.observe(self._store.failed_records("download"), listed=self._listed_downloads())
+        perf_event(
+            f"transfers.refresh.{direction}",
+            (time.perf_counter() - t0) * 1000.0,
+            payload=len(items or []),
+            rows=len(self._store),
+            touched=upd.rows_touched,
+        )
+        manual = not self.btnRefresh.IsEnabled()
+        if not any(f.busy for f in self._feeds.values()):
+            self.btnRefresh.Enable(True)
+        if manual or len(self._store) != prev_count:
+            self._with_status(f"{len(self._store)} transfer rows (downloads + uploads).")
+        self._schedule(direction)
+
+    def _report_bandwidth(self):
+        if not callable(self.on_bandwidth):
+            return
+        down, up = self._rates.bandwidth()
+        self.on_bandwidth(f"DL {format_rate(down)} / UL {format_rate(up)}")
+
+    def _after_feed_error(self, direction: str, msg: str):
+        self._feeds[direction].busy = False
+        self._with_status(msg)
+        wx.Bell()
+        if not any(f.busy for f in self._feeds.values()):
+            self.btnRefresh.Enable(True)
+        self._schedule(direction)
+
+    def _apply_structure(self, sel_idx: List[int], sel_keys, focus_key):
+        # Row count or order changed: resize the virtual list and move the
+        # selection/focus to wherever their rows are now.
         self.lst.Freeze()
         try:
-            self.lst.DeleteAllItems()
-            need_queue_for: set[str] = set()
-            def append_rows(items, direction: str):
-                for t in items or []:
-                    username = t.get("username", "")
-                    for d in (t.get("directories") or []):
-                        dname = d.get("directory", "")
-                        for f in (d.get("files") or []):
-                            idx = self.lst.InsertItem(self.lst.GetItemCount(), "DL" if direction=="download" else "UL")
-                            self.lst.SetItem(idx, 1, username)
-                            self.lst.SetItem(idx, 2, dname)
-                            self.lst.SetItem(idx, 3, f.get("filename", ""))
-                            state = str(f.get("state", "") or "")
-                            if direction == "download" and ("queue" in state.lower() or "queued" in state.lower()):
-                                q = self._queue_cache.get(username)
-                                if isinstance(q, int):
-                                    state = f"{state} ({q})"
-                                else:
-                                    need_queue_for.add(username)
-                            self.lst.SetItem(idx, 4, state)
-                            self.lst.SetItem(idx, 5, f"{round(float(f.get('percentComplete', 0)),1)}")
-                            self.lst.SetItem(idx, 6, str(round(float(f.get('averageSpeed', 0)),1)))
-                            self.lst.SetItem(idx, 7, f.get("id", ""))
-                            self._rows.append({"direction": direction, "username": username, "dir": dname, "file": f})
-            append_rows(downloads, "download")
-            append_rows(uploads, "upload")
-            # Restore selection and focus
-            if selected_ids:
-                for i, r in enumerate(self._rows):
-                    key = (r["direction"], r["username"], r["file"].get("id", ""))
-                    if key in selected_ids:
-                        self.lst.SetItemState(i, wx.LIST_STATE_SELECTED, wx.LIST_STATE_SELECTED)
-            if focus_key:
-                for i, r in enumerate(self._rows):
-                    key = (r["direction"], r["username"], r["file"].get("id", ""))
-                    if key == focus_key:
-                        self.lst.Focus(i)
-                        self.lst.EnsureVisible(i)
-                        break
-            if top_key:
-                for i, r in enumerate(self._rows):
-                    key = (r["direction"], r["username"], r["file"].get("id", ""))
-                    if key == top_key:
-                        self.lst.EnsureVisible(i)
-                        break
-            # If we need queue lengths for any usernames, fetch and update asynchronously
-            if need_queue_for:
-                self._refresh_queue_lengths(need_queue_for)
+            self.lst.SetItemCount(len(self._view))
+            new_idx = {self._view.index_of(k) for k in sel_keys if k is not None}
+            new_idx.discard(None)
+            for i in sel_idx:
+                if i not in new_idx and i < self.lst.GetItemCount():
+                    self.lst.SetItemState(i, 0, wx.LIST_STATE_SELECTED)
+            for i in new_idx:
+                if i not in sel_idx:
+                    self.lst.SetItemState(i, wx.LIST_STATE_SELECTED, wx.LIST_STATE_SELECTED)
+            anchor = self._view.index_of(focus_key) if focus_key else None
+            if anchor is not None:
+                self.lst.Focus(anchor)
+                self.lst.EnsureVisible(anchor)
+            self.lst.refresh_visible()
         finally:
             self.lst.Thaw()
-        self.btnRefresh.Enable(True)
-        self._with_status(f"{self.lst.GetItemCount()} transfer rows (downloads + uploads).")
+
+    def _on_col_click(self, evt):
+        # Click a header to sort by it; click again to reverse; a third time restores server order.
+        col = evt.GetColumn()
+        view = self._view
+        sel_idx = self._selected_indices()
+        sel_keys = {view.key_at(i) for i in sel_idx}
+        focus_key = self._focused_key()
+        if view.sort_column != col:
+            view.set_sort(col, True)
+        elif view.sort_ascending:
+            view.set_sort(col, False)
+        else:
+            view.set_sort(None)
+        self._apply_structure(sel_idx, sel_keys, focus_key)
+        if view.sort_column is None:
+            self._with_status("Directories in name order." if self._grouped else "Transfers in server order.")
+        else:
+            name = self.lst.GetColumn(col).GetText()
+            self._with_status(f"Sorted by {name}, {'ascending' if view.sort_ascending else 'descending'}.")
 
     def _on_cancel(self, evt):
-        idx = self.lst.GetFirstSelected()
-        if idx == -1:
-            self._with_status("Select a transfer to cancel.")
+        self._cancel_selected("Cancel", remove=False)
+
+    def _cancel_selected(self, verb: str, *, remove: bool):
+        # Every selected transfer (all files of selected directory rows)
+        recs = self._selected_records()
+        if not recs:
+            self._with_status(f"Select a transfer to {verb.lower()}.")
+            return
+        def op(r: TransferRecord) -> bool:
+            if r.is_download:
+                return self.service.cancel_download(r.username, r.file_id, remove=remove)
+            return self.service.cancel_upload(r.username, r.file_id, remove=remove)
+        self._run_bulk(verb, recs, op)
+
+    def _run_bulk(self, verb: str, items, op):
+        """Run ``op`` over ``items`` in parallel off the UI thread, with progress, then refresh once."""
+        if self._bulk_cancel is not None:
+            self._with_status("Another bulk action is still running.")
             return
-        username = self.lst.GetItemText(idx, 1)
-        file_id = self.lst.GetItemText(idx, 7)
-        is_upload = (self.lst.GetItemText(idx, 0).upper() == "UL")
-        self._with_status(f"Cancelling {file_id}...")
+        cancel = self._bulk_cancel = threading.Event()
+        total = len(items)
+        self._with_status(f"{verb}: 0 of {total}...")
+        def progress(done: int, total: int):
+            call_after(self._with_status, f"{verb}: {done} of {total}...", key=STATUS_KEY)
         def worker():
-            try:
-                if is_upload:
-                    ok = self.service.cancel_upload(username, file_id, remove=False)
-                else:
-                    ok = self.service.cancel_download(username, file_id, remove=False)
-                wx.CallAfter(self._with_status, "Cancelled." if ok else "Cancel failed.")
-                wx.CallAfter(self._on_refresh, None)
-            except Exception as e:
-                wx.CallAfter(self._after_error, f"Cancel failed: {e}")
+            t0 = time.perf_counter()
+            res = run_bulk(items, op, max_workers=BULK_MAX_WORKERS, on_progress=progress, cancel=cancel)
+            perf_event(f"transfers.bulk.{verb.lower()}", (time.perf_counter() - t0) * 1000.0, rows=total, failed=res.failed)
+            call_after(self._after_bulk, verb, res)
         threading.Thread(target=worker, daemon=True).start()
 
+    def _after_bulk(self, verb: str, res: BulkResult):
+        self._bulk_cancel = None
+        msg = f"{verb}: {res.ok} of {res.total} done"
+        if res.failed:
+            msg += f", {res.failed} failed"
+            if res.errors:
+                msg += f" ({res.errors[0]})"
+        if res.cancelled:
+            msg += ", rest aborted"
+        self._with_status(msg + ".")
+        if res.failed and not res.ok:
+            wx.Bell()
+        # One refresh for the whole batch
+        self._on_refresh(None)
+
+    def _on_abort_bulk(self, evt):
+        if self._bulk_cancel is not None:
+            self._bulk_cancel.set()
+            self._with_status("Aborting bulk action...")
+
+    def _select_by_state(self, bucket: Optional[str]):
+        """Select every row in the given state bucket (None selects all)."""
+        view = self._view
+        if self._grouped:
+            match = [i for i, g in enumerate(self._groups) if bucket is None or g.counts.get(bucket)]
+        else:
+            match = [i for i, r in enumerate(self._store) if bucket is None or state_bucket(r.state) == bucket]
+        self.lst.Freeze()
+        try:
+            for i in self._selected_indices():
+                self.lst.SetItemState(i, 0, wx.LIST_STATE_SELECTED)
+            for i in match:
+                self.lst.SetItemState(i, wx.LIST_STATE_SELECTED, wx.LIST_STATE_SELECTED)
+            if match:
+                self.lst.Focus(match[0])
+                self.lst.EnsureVisible(match[0])
+        finally:
+            self.lst.Thaw()
+        what = "rows" if bucket is None else f"{bucket} rows"
+        self._with_status(f"Selected {len(match)} {what} of {len(view)}.")
+
     def _on_purge(self, evt):
         self._with_status("Removing completed downloads...")
         def worker():
             try:
                 ok1 = self.service.remove_completed_downloads()
                 ok2 = self.service.remove_completed_uploads()
-                wx.CallAfter(self._with_status, "Cleared completed transfers." if (ok1 or ok2) else "Nothing removed.")
-                wx.CallAfter(self._on_refresh, None)
+                call_after(self._with_status, "Cleared completed transfers." if (ok1 or ok2) else "Nothing removed.", key=STATUS_KEY)
+                call_after(self._on_refresh, None, key=(id(self), "refresh"))
             except Exception as e:
-                wx.CallAfter(self._after_error, f"Purge failed: {e}")
+                call_after(self._after_error, f"Purge failed: {e}")
         threading.Thread(target=worker, daemon=True).start()
 
     def _after_error(self, msg: str):
@@ -177,34 +407,140 @@ class TransfersPanel(wx.Panel):
         self._miStart = m.Append(wx.ID_ANY, "&Start")
         self._miStop = m.Append(wx.ID_ANY, "S&top")
         self._miClear = m.Append(wx.ID_ANY, "Clear &Completed")
+        self._miRateSummary = m.Append(wx.ID_ANY, "Rate and &ETA Summary")
+        self._miUserHistory = m.Append(wx.ID_ANY, "User &History…")
+        self._miStats = m.Append(wx.ID_ANY, "Transfer Stat&istics…")
         m.AppendSeparator()
         self._miRemove = m.Append(wx.ID_ANY, "&Remove")
         self._miRemoveData = m.Append(wx.ID_ANY, "Remove &With Data")
+        m.AppendSeparator()
+        sel = wx.Menu()
+        for label, bucket in (("&All", None), ("A&ctive", "active"), ("&Queued", "queued"),
+                              ("&Done", "done"), ("&Failed (Errored, Rejected, Timed Out)", "failed")):
+            mi = sel.Append(wx.ID_ANY, label)
+            self.Bind(wx.EVT_MENU, lambda e, b=bucket: self._select_by_state(b), mi)
+        m.AppendSubMenu(sel, "Se&lect by State")
+        self._miAbortBulk = m.Append(wx.ID_ANY, "A&bort Bulk Action")
         self._menu = m
         self.Bind(wx.EVT_MENU, self._on_start, self._miStart)
         self.Bind(wx.EVT_MENU, self._on_stop, self._miStop)
         self.Bind(wx.EVT_MENU, lambda e: self._on_purge(e), self._miClear)
         self.Bind(wx.EVT_MENU, self._on_remove, self._miRemove)
         self.Bind(wx.EVT_MENU, self._on_remove_data, self._miRemoveData)
+        self.Bind(wx.EVT_MENU, self._on_rate_summary, self._miRateSummary)
+        self.Bind(wx.EVT_MENU, self._on_abort_bulk, self._miAbortBulk)
+        self.Bind(wx.EVT_MENU, self._on_user_history, self._miUserHistory)
+        self.Bind(wx.EVT_MENU, self._on_stats, self._miStats)
+
+    def _on_user_history(self, evt):
+        # What we've transferred with the selected user, from the local history
+        rec = self._selected_record()
+        if rec is None:
+            self._with_status("Select a transfer.")
+            return
+        username, direction = rec.username, rec.direction
+        def worker():
+            try:
+                rows = history.by_user(username, direction=direction, limit=200)
+                call_after(self._show_user_history, username, direction, rows)
+            except Exception as e:
+                call_after(self._after_error, f"History failed: {e}")
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _show_user_history(self, username: str, direction: str, rows):
+        verb = "Downloaded from" if direction == "download" else "Uploaded to"
+        if not rows:
+            wx.MessageBox(f"No history with {username} yet.", "User History", wx.OK | wx.ICON_INFORMATION, parent=self)
+            return
+        ok = sum(1 for r in rows if r["ok"])
+        total = sum(int(r["bytes"]) for r in rows if r["ok"])
+        lines = [f"{verb} {username}: {ok} of {len(rows)} succeeded, {format_size(total)}.", ""]
+        for r in rows[:30]:
+            when = time.strftime("%Y-%m-%d %H:%M", time.localtime(r["completed_at"]))
+            lines.append(f"{when}  {r['state']}  {r['basename']}")
+        if len(rows) > 30:
+            lines.append(f"... and {len(rows) - 30} more")
+        wx.MessageBox("\n".join(lines), "User History", wx.OK | wx.ICON_INFORMATION, parent=self)
+
+    def _on_stats(self, evt):
+        def worker():
+            try:
+                now = time.time()
+                periods = [("Last 24 hours", now - 86400), ("Last 30 days", now - 30 * 86400), ("All time", 0)]
+                out = [(label, history.bandwidth_stats(since)) for label, since in periods]
+                call_after(self._show_stats, out)
+            except Exception as e:
+                call_after(self._after_error, f"Statistics failed: {e}")
+        threading.Thread(target=worker, daemon=True).start()
 
-    def _selected_row_info(self):
+    def _show_stats(self, periods):
+        lines = []
+        for label, stats in periods:
+            lines.append(label + ":")
+            for direction, name in (("download", "Downloads"), ("upload", "Uploads")):
+                st = stats.get(direction)
+                if not st:
+                    lines.append(f"  {name}: none")
+                    continue
+                lines.append(
+                    f"  {name}: {st['succeeded']} of {st['transfers']} succeeded, "
+                    f"{format_size(st['bytes'])}, average {format_rate(st['avg_speed'])}"
+                )
+        wx.MessageBox("\n".join(lines), "Transfer Statistics", wx.OK | wx.ICON_INFORMATION, parent=self)
+
+    def _on_rate_summary(self, evt):
+        # Rate and ETA for the selected file, its directory and its user
+        rec = self._selected_record()
+        if rec is None:
+            self._with_status("Select a transfer.")
+            return
+        active = self._store.active_records(rec.direction)
+        dir_rate, dir_eta = self._rates.aggregate(r.key for r in active if r.username == rec.username and r.directory == rec.directory)
+        user_rate, user_eta = self._rates.aggregate(r.key for r in active if r.username == rec.username)
+
+        def part(label, rate, eta):
+            if not rate:
+                return f"{label}: idle"
+            return f"{label}: {format_rate(rate)}, ETA {format_eta(eta) or 'unknown'}"
+        self._with_status("; ".join((
+            part("File", self._rates.rate(rec.key), self._rates.eta(rec.key)),
+            part("Directory", dir_rate, dir_eta),
+            part(f"User {rec.username}", user_rate, user_eta),
+        )))
+
+    def _selected_record(self) -> Optional[TransferRecord]:
         idx = self.lst.GetFirstSelected()
         if idx == -1:
             return None
-        # Align with _rows order (one entry per inserted row)
-        if 0 <= idx < len(self._rows):
-            return self._rows[idx]
-        return None
+        if self._grouped:
+            g = self._groups.group_at(idx)
+            return self._store.get(next(iter(g.members))) if g is not None and g.members else None
+        return self._store.record_at(idx)
+
+    def _selected_records(self) -> List[TransferRecord]:
+        """Selected transfers; a directory row stands for all of its files."""
+        out: List[TransferRecord] = []
+        for i in self._selected_indices():
+            if self._grouped:
+                g = self._groups.group_at(i)
+                if g is not None:
+                    out.extend(r for r in (self._store.get(k) for k in g.members) if r is not None)
+            else:
+                rec = self._store.record_at(i)
+                if rec is not None:
+                    out.append(rec)
+        return out
 
     def _on_right_click(self, evt):
         # Enable/disable menu items based on direction
         idx = evt.GetIndex()
         if idx != -1:
             self.lst.Select(idx)
-        info = self._selected_row_info()
-        is_upload = info and info.get("direction") == "upload"
+        rec = self._selected_record()
+        is_upload = rec is not None and not rec.is_download
         # Start only makes sense for downloads
         self._miStart.Enable(not is_upload)
+        self._miAbortBulk.Enable(self._bulk_cancel is not None)
         self.PopupMenu(self._menu)
 
     def _on_context_menu(self, evt):
@@ -212,143 +548,136 @@ class TransfersPanel(wx.Panel):
         idx = self.lst.GetFirstSelected()
         if idx == -1 and self.lst.GetItemCount() > 0:
             self.lst.Select(0)
-        info = self._selected_row_info()
-        is_upload = info and info.get("direction") == "upload"
+        rec = self._selected_record()
+        is_upload = rec is not None and not rec.is_download
         self._miStart.Enable(not is_upload)
+        self._miAbortBulk.Enable(self._bulk_cancel is not None)
         self.PopupMenu(self._menu)
 
     def _on_start(self, evt):
-        info = self._selected_row_info()
-        if not info:
+        recs = self._selected_records()
+        if not recs:
             self._with_status("Select a transfer first.")
             return
-        if info.get("direction") == "upload":
+        by_user = {}
+        for r in recs:
+            if r.is_download:
+                by_user.setdefault(r.username, []).append(r.as_file())
+        if not by_user:
             self._with_status("Start is only available for downloads.")
             return
-        f = info["file"]
-        files = [{"filename": f.get("filename", ""), "size": int(f.get("size", 0))}]
-        self._with_status("Starting transfer…")
-        def worker():
-            try:
-                ok = self.service.enqueue_downloads(info["username"], files)
-                wx.CallAfter(self._with_status, "Started." if ok else "Start failed.")
-                wx.CallAfter(self._on_refresh, None)
-            except Exception as e:
-                wx.CallAfter(self._after_error, f"Start failed: {e}")
-        threading.Thread(target=worker, daemon=True).start()
+        # One enqueue per user covers every selected file of theirs
+        self._run_bulk("Start", list(by_user.items()), lambda item: self.service.enqueue_downloads(item[0], item[1]))
 
     def _on_stop(self, evt):
-        idx = self.lst.GetFirstSelected()
-        if idx == -1:
-            self._with_status("Select a transfer first.")
-            return
-        username = self.lst.GetItemText(idx, 1)
-        file_id = self.lst.GetItemText(idx, 7)
-        is_upload = (self.lst.GetItemText(idx, 0).upper() == "UL")
-        def worker():
-            try:
-                if is_upload:
-                    ok = self.service.cancel_upload(username, file_id, remove=False)
-                else:
-                    ok = self.service.cancel_download(username, file_id, remove=False)
-                wx.CallAfter(self._with_status, "Stopped." if ok else "Stop failed.")
-                wx.CallAfter(self._on_refresh, None)
-            except Exception as e:
-                wx.CallAfter(self._after_error, f"Stop failed: {e}")
-        threading.Thread(target=worker, daemon=True).start()
+        self._cancel_selected("Stop", remove=False)
 
     def _on_remove(self, evt):
-        idx = self.lst.GetFirstSelected()
-        if idx == -1:
-            self._with_status("Select a transfer first.")
-            return
-        username = self.lst.GetItemText(idx, 1)
-        file_id = self.lst.GetItemText(idx, 7)
-        is_upload = (self.lst.GetItemText(idx, 0).upper() == "UL")
-        def worker():
-            try:
-                if is_upload:
-                    ok = self.service.cancel_upload(username, file_id, remove=True)
-                else:
-                    ok = self.service.cancel_download(username, file_id, remove=True)
-                wx.CallAfter(self._with_status, "Removed." if ok else "Remove failed.")
-                wx.CallAfter(self._on_refresh, None)
-            except Exception as e:
-                wx.CallAfter(self._after_error, f"Remove failed: {e}")
-        threading.Thread(target=worker, daemon=True).start()
+        self._cancel_selected("Remove", remove=True)
 
     def _on_remove_data(self, evt):
         # Same as remove (server should remove transfer and any related data if applicable)
         self._on_remove(evt)
 
-    def _selected_ids(self):
-        ids = set()
+    def _selected_indices(self) -> List[int]:
+        out: List[int] = []
         i = -1
         while True:
             i = self.lst.GetNextItem(i, wx.LIST_NEXT_ALL, wx.LIST_STATE_SELECTED)
             if i == -1:
                 break
-            ids.add((self.lst.GetItemText(i, 0).lower() == "ul" and "upload" or "download",
-                     self.lst.GetItemText(i, 1),
-                     self.lst.GetItemText(i, 7)))
-        return ids
+            out.append(i)
+        return out
 
     def _arm_timer(self):
-        self.timer.Stop()
-        if self._auto_enabled:
-            ms = max(1, int(self._interval_sec)) * 1000
-            self.timer.Start(ms)
-
-    def _on_timer(self, evt):
-        # Avoid re-entrancy: if Refresh button is disabled, a fetch is in progress.
-        if self.btnRefresh.IsEnabled():
-            self._on_refresh(None)
-
-    def _refresh_queue_lengths(self, usernames: set[str]):
-        def worker(names: list[str]):
-            updated: dict[str, int] = {}
-            for u in names:
-                try:
-                    info = self.service.user_info(u)
-                    q = int(info.get("queueLength", 0))
-                    updated[u] = q
-                except Exception:
-                    continue
-            if not updated:
-                return
-            def apply_updates():
-                # Update cache
-                self._queue_cache.update(updated)
-                # Patch state column in-place for matching rows still visible
-                for i, r in enumerate(self._rows):
-                    if r.get("direction") != "download":
-                        continue
-                    base_state = str(r["file"].get("state","") or "")
-                    if "queue" not in base_state.lower() and "queued" not in base_state.lower():
-                        continue
-                    u = r.get("username","")
-                    if u in updated:
-                        self.lst.SetItem(i, 4, f"{base_state} ({updated[u]})")
-                self._with_status(f"Updated queue lengths for {len(updated)} user(s).")
-            wx.CallAfter(apply_updates)
-        threading.Thread(target=worker, args=(sorted(usernames),), daemon=True).start()
-
-    def _top_key(self):
-        top = self.lst.GetTopItem()
-        if 0 <= top < len(self._rows):
-            r = self._rows[top]
-            return (r["direction"], r["username"], r["file"].get("id", ""))
-        return None
+        for direction in self._feeds:
+            self._schedule(direction)
+
+    def _next_delay(self, direction: str) -> Optional[float]:
+        """Seconds until this feed should poll again, or None to pause."""
+        if not self._auto_enabled or self._minimized:
+            return None
+        base = self._feeds[direction].interval_sec
+        active = self._store.active_count(direction) > 0
+        if not self._tab_visible:
+            return max(base, HIDDEN_ACTIVE_S if active else HIDDEN_IDLE_S)
+        if active:
+            return base
+        return max(base * IDLE_FACTOR, IDLE_MIN_S)
+
+    def _schedule(self, direction: str):
+        # One-shot timers re-armed after each fetch, so a slow response
+        # pushes the next poll back instead of piling up.
+        feed = self._feeds[direction]
+        if feed.timer is None:
+            return
+        feed.timer.Stop()
+        if feed.busy:
+            return
+        delay = self._next_delay(direction)
+        if delay is None:
+            return
+        remaining = delay - (time.monotonic() - feed.fetched_at)
+        feed.timer.StartOnce(max(1, int(remaining * 1000)))
+
+    def _on_timer(self, direction: str):
+        if not self._feeds[direction].busy:
+            self._fetch_feed(direction)
+
+    def on_activated(self, active: bool):
+        """Transfers tab shown/hidden: poll at full rate only while visible."""
+        was_visible = self._tab_visible
+        self._tab_visible = bool(active)
+        if self._tab_visible and not was_visible and self._auto_enabled and not self._minimized:
+            # Show fresh data straight away instead of waiting out the hidden interval
+            for direction in self._feeds:
+                self._fetch_feed(direction)
+        self._arm_timer()
 
-    def _focused_key(self):
+    def on_minimized(self, minimized: bool):
+        was = self._minimized
+        self._minimized = bool(minimized)
+        if was and not self._minimized and self._tab_visible and self._auto_enabled:
+            for direction in self._feeds:
+                self._fetch_feed(direction)
+        self._arm_timer()
+
+    def _request_queue_lengths(self):
+        # Users with queued downloads whose queue length is unknown or stale;
+        # those on screen are looked up first.
+        wanted: set[str] = set()
+        for rec in self._store:
+            if rec.is_download and rec.username not in wanted and is_queued_state(rec.state) \
+                    and self._queues.needs_lookup(rec.username):
+                wanted.add(rec.username)
+        if not wanted:
+            return
+        visible: set[str] = set()
+        top = max(0, self.lst.GetTopItem())
+        for i in range(top, min(len(self._view), top + self.lst.GetCountPerPage() + 1)):
+            key = self._view.key_at(i)
+            if key is not None:
+                visible.add(key[1])
+        self._queues.request(wanted, priority=visible & wanted)
+
+    def _apply_queue_updates(self):
+        # Repaint only the visible rows of users whose queue length just arrived
+        names = self._queues.take_changed()
+        # Directory rows don't show queue lengths
+        for u in (() if self._grouped else names):
+            for i in self._store.indices_for_user(u):
+                if self.lst.is_visible(i):
+                    self.lst.RefreshItem(i)
+        if names:
+            self._with_status(f"Updated queue lengths for {len(names)} user(s).")
+
+    def _focused_key(self) -> Optional[TransferKey]:
         idx = self.lst.GetNextItem(-1, wx.LIST_NEXT_ALL, wx.LIST_STATE_FOCUSED)
-        if idx != -1 and 0 <= idx < len(self._rows):
-            r = self._rows[idx]
-            return (r["direction"], r["username"], r["file"].get("id", ""))
+        if idx != -1:
+            return self._view.key_at(idx)
         sel = self.lst.GetNextItem(-1, wx.LIST_NEXT_ALL, wx.LIST_STATE_SELECTED)
-        if sel != -1 and 0 <= sel < len(self._rows):
-            r = self._rows[sel]
-            return (r["direction"], r["username"], r["file"].get("id", ""))
+        if sel != -1:
+            return self._view.key_at(sel)
         return None
 
     # Options integration
@@ -358,4 +687,18 @@ class TransfersPanel(wx.Panel):
 
     def set_interval(self, seconds: int):
         self._interval_sec = max(1, int(seconds))
+        self._feeds["download"].interval_sec = self._interval_sec
+        self._arm_timer()
+
+    def set_auto_retry(self, enabled: bool):
+        self._retry.set_enabled(enabled)
+        if enabled:
+            # Marks what has already failed as the backlog; only later failures are retried
+            self._retry.observe(self._store.failed_records("download"), listed=self._listed_downloads())
+
+    def _listed_downloads(self):
+        return {(r.username, r.filename) for r in self._store if r.is_download}
+
+    def set_uploads_interval(self, seconds: int):
+        self._feeds["upload"].interval_sec = max(1, int(seconds))
         self._arm_timer()
@@ -1,11 +1,30 @@
 from __future__ import annotations
 
 import threading
-from typing import Any, Dict, List
+import time
+from typing import Any, Dict, List, Optional, Set
 
 import wx
 
+from ..browse_cache import browse_cache
+from ..browse_tree import SEP, BrowseNode, BrowseRow, BrowseRows, BrowseTree, split_path
+from ..share_index import ShareIndex
+from ..perf_log import perf_timer
+from ..prefetch import Prefetcher
 from ..slsk_client import SlskService
+from .directory_download import download_directories
+from .dispatcher import STATUS_KEY, call_after
+
+
+class BrowseListCtrl(wx.ListCtrl):
+    """Virtual report list over ``BrowseRows``; only painted rows are formatted."""
+
+    def __init__(self, parent, rows: BrowseRows):
+        super().__init__(parent, style=wx.LC_REPORT | wx.LC_VIRTUAL | wx.BORDER_SUNKEN)
+        self.rows = rows
+
+    def OnGetItemText(self, item, col):
+        return self.rows.cell(item, col)
 
 
 class UserBrowserFrame(wx.Frame):
@@ -14,6 +33,25 @@ class UserBrowserFrame(wx.Frame):
         self.service = service
         self.username = username
         self.on_status = on_status
+        # Local model of the user's shares; navigation resolves against it
+        self.model: Optional[BrowseTree] = None
+        # (directories, files, bytes) of the model, and whether it came from a saved snapshot
+        self._model_sig: Optional[tuple] = None
+        self._model_cached = False
+        self._current: Optional[BrowseNode] = None
+        # Tree item per node, for nodes that have been materialized in the TreeCtrl
+        self._tree_items: Dict[int, Any] = {}
+        # Paths with a directory fetch in flight (select and expand can both ask)
+        self._fetching: Set[str] = set()
+        # What the list shows: a folder's contents or search hits
+        self.rows = BrowseRows()
+        # Word index of the model, built in the background
+        self.index: Optional[ShareIndex] = None
+        # Fetches subfolders of the open folder ahead of time while the model is partial
+        self._prefetch = Prefetcher(
+            lambda path: self.service.user_directory(self.username, path),
+            lambda path, listing: call_after(self._after_prefetch, path, listing),
+        )
         self._build_ui()
         self._load_root()
 
@@ -27,16 +65,26 @@ class UserBrowserFrame(wx.Frame):
         self.txtPath = wx.TextCtrl(panel)
         self.btnGo = wx.Button(panel, wx.ID_ANY, "&Open")
         self.btnUp = wx.Button(panel, wx.ID_ANY, "&Up")
+        self.btnRefresh = wx.Button(panel, wx.ID_ANY, "&Refresh")
         prow.Add(self.lblUser, 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 10)
         prow.Add(wx.StaticText(panel, label="Path (&P):"), 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 6)
         prow.Add(self.txtPath, 1, wx.RIGHT, 6)
         prow.Add(self.btnGo, 0, wx.RIGHT, 6)
-        prow.Add(self.btnUp, 0)
+        prow.Add(self.btnUp, 0, wx.RIGHT, 6)
+        prow.Add(self.btnRefresh, 0)
         tops.Add(prow, 0, wx.EXPAND | wx.ALL, 8)
 
+        frow = wx.BoxSizer(wx.HORIZONTAL)
+        self.txtFind = wx.TextCtrl(panel, style=wx.TE_PROCESS_ENTER)
+        self.btnFind = wx.Button(panel, wx.ID_ANY, "Fi&nd")
+        frow.Add(wx.StaticText(panel, label="Find in this user's shares (&F):"), 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 6)
+        frow.Add(self.txtFind, 1, wx.RIGHT, 6)
+        frow.Add(self.btnFind, 0)
+        tops.Add(frow, 0, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 8)
+
         splitter = wx.SplitterWindow(panel, style=wx.SP_LIVE_UPDATE | wx.SP_3D)
         self.tree = wx.TreeCtrl(splitter, style=wx.TR_HAS_BUTTONS | wx.TR_LINES_AT_ROOT | wx.TR_DEFAULT_STYLE)
-        self.list = wx.ListCtrl(splitter, style=wx.LC_REPORT | wx.BORDER_SUNKEN)
+        self.list = BrowseListCtrl(splitter, self.rows)
         self.list.InsertColumn(0, "Name", width=520)
         self.list.InsertColumn(1, "Size", width=140)
         self.list.InsertColumn(2, "Type", width=100)
@@ -66,12 +114,21 @@ class UserBrowserFrame(wx.Frame):
         self.Bind(wx.EVT_BUTTON, self._on_open, self.btnGo)
         self.Bind(wx.EVT_TEXT_ENTER, self._on_open, self.txtPath)
         self.Bind(wx.EVT_BUTTON, self._on_up, self.btnUp)
+        self.Bind(wx.EVT_BUTTON, self._on_refresh, self.btnRefresh)
+        self.Bind(wx.EVT_BUTTON, self._on_find, self.btnFind)
+        self.Bind(wx.EVT_TEXT_ENTER, self._on_find, self.txtFind)
         self.Bind(wx.EVT_BUTTON, self._on_download_selected, self.btnDownloadSelected)
         self.Bind(wx.EVT_BUTTON, self._on_download_dir2, self.btnDownloadDir)
         self.tree.Bind(wx.EVT_TREE_ITEM_EXPANDING, self._on_expand)
         self.tree.Bind(wx.EVT_TREE_SEL_CHANGED, self._on_tree_select)
         # Also support Enter/double-click on directories in the right list
         self.list.Bind(wx.EVT_LIST_ITEM_ACTIVATED, self._on_list_activated)
+        self.list.Bind(wx.EVT_LIST_COL_CLICK, self._on_col_click)
+        self.Bind(wx.EVT_CLOSE, self._on_close)
+
+    def _on_close(self, evt):
+        self._prefetch.cancel()
+        evt.Skip()
 
     def _status(self, msg: str):
         if callable(self.on_status):
@@ -80,195 +137,298 @@ class UserBrowserFrame(wx.Frame):
     def _load_root(self):
         self._status("Loading user root…")
         def worker():
+            cached = None
+            if self.model is None:
+                # Show the last snapshot right away while slskd browses
+                cached = browse_cache.load(self.username)
+                if cached is not None:
+                    call_after(self._after_root, cached, cached.signature(), True)
             try:
                 root = self.service.browse_user_root(self.username)
-                wx.CallAfter(self._after_root, root)
+                with perf_timer("browse.index") as info:
+                    model = BrowseTree.from_browse(self.username, root)
+                    info["rows"] = model.file_count
             except Exception as e:
-                wx.CallAfter(self._status, f"Browse failed: {e}")
+                msg = f"Browse failed: {e}"
+                if cached is not None:
+                    msg += f" Showing shares as of {_format_when(cached.fetched_at)}."
+                call_after(self._status, msg, key=STATUS_KEY)
                 wx.Bell()
+                return
+            call_after(self._after_root, model, model.signature(), False)
+            browse_cache.save(model)
         threading.Thread(target=worker, daemon=True).start()
 
     def _on_download_dir2(self, evt):
         # Prefer selected directories; else use the current path.
-        dirs = []
-        i = -1
+        dirs = [node.path for kind, node, _ in self._selected_rows() if kind == "dir"]
         current_dir = self.txtPath.GetValue().strip()
-        while True:
-            i = self.list.GetNextItem(i, wx.LIST_NEXT_ALL, wx.LIST_STATE_SELECTED)
-            if i == -1:
-                break
-            kind = (self.list.GetItemText(i, 2) or "").lower()
-            if kind == "dir":
-                name = self.list.GetItemText(i, 0) or ""
-                if name:
-                    sep = "\\" if "\\" in current_dir else "/"
-                    full = name if not current_dir else (current_dir.rstrip("\\/") + sep + name)
-                    dirs.append(full)
         if not dirs and current_dir:
             dirs = [current_dir]
-        if not dirs:
-            self._status("Select a directory (or open one) first.")
-            return
-        many = len(dirs) > 1
-        self._status(f"Enqueueing {len(dirs)} director{'ies' if many else 'y'}...")
-        def worker2():
-            try:
-                total = 0
-                failed = 0
-                for d in dirs:
-                    n = self.service.enqueue_directory(self.username, d)
-                    if n <= 0:
-                        failed += 1
-                    total += max(0, n)
-                msg = f"Enqueued {total} file(s) from {len(dirs)} director{'ies' if many else 'y'}."
-                if failed:
-                    msg += f" ({failed} failed)"
-                wx.CallAfter(self._status, msg)
-            except Exception as e:
-                wx.CallAfter(self._status, f"Directory enqueue failed: {e}")
-                wx.Bell()
-        threading.Thread(target=worker2, daemon=True).start()
+        download_directories(self, self.service, self.username, dirs, self._status, model=self.model)
 
     def _on_list_activated(self, evt):
-        # If the activated row is a directory, open it.
+        # Directories open; a found file opens the folder it is in.
         try:
             idx = evt.GetIndex()
         except Exception:
             idx = -1
-        if idx is None or idx < 0:
+        row = self.rows.row(idx) if idx is not None else None
+        if row is not None:
+            self._open_node(row[1])
+
+    def _on_col_click(self, evt):
+        # Click a header to sort by it; click again to reverse; a third time restores folder order.
+        col = evt.GetColumn()
+        selected = self._selected_rows()
+        focused = self.rows.row(self.list.GetFocusedItem())
+        if self.rows.sort_column != col:
+            self.rows.set_sort(col, True)
+        elif self.rows.sort_ascending:
+            self.rows.set_sort(col, False)
+        else:
+            self.rows.set_sort(None)
+        self._select_rows(selected, focused)
+        self.list.Refresh()
+        if self.rows.sort_column is None:
+            self._status("Unsorted.")
+        else:
+            name = self.list.GetColumn(col).GetText()
+            self._status(f"Sorted by {name}, {'ascending' if self.rows.sort_ascending else 'descending'}.")
+
+    def _select_rows(self, rows: List[BrowseRow], focused: Optional[BrowseRow]):
+        i = -1
+        while True:
+            i = self.list.GetNextItem(i, wx.LIST_NEXT_ALL, wx.LIST_STATE_SELECTED)
+            if i == -1:
+                break
+            self.list.Select(i, False)
+        for r in rows:
+            idx = self.rows.index_of(r)
+            if idx >= 0:
+                self.list.Select(idx)
+        if focused is not None:
+            idx = self.rows.index_of(focused)
+            if idx >= 0:
+                self.list.Focus(idx)
+
+    def _after_root(self, model: BrowseTree, sig: tuple, cached: bool):
+        if not cached and self._model_cached and sig == self._model_sig:
+            # Snapshot confirmed current; keep the tree as the user left it
+            self.model.fetched_at = model.fetched_at
+            self._model_cached = False
+            self.SetTitle(f"Browse: {self.username}")
+            self._status("Shares unchanged since the saved snapshot.")
             return
-        kind = (self.list.GetItemText(idx, 2) or "").lower()
-        name = self.list.GetItemText(idx, 0) or ""
-        if kind == "dir" and name:
-            base = self.txtPath.GetValue().strip()
-            sep = "\\" if ("\\" in base) else "/"
-            newp = name if (not base) else (base.rstrip("\\/") + sep + name)
-            self.txtPath.SetValue(newp)
-            self._open_path(newp)
-
-    def _after_root(self, root):
+        keep = self._current.path if self._current is not None else ""
+        self.model = model
+        self._model_sig = sig
+        self._model_cached = cached
+        self._current = None
+        title = f"Browse: {self.username}"
+        if cached:
+            title += f" (as of {_format_when(model.fetched_at)})"
+        self.SetTitle(title)
+        self._tree_items.clear()
         self.tree.DeleteAllItems()
         root_id = self.tree.AddRoot(self.username)
-        for d in (root.get("directories") or []):
-            child = self.tree.AppendItem(root_id, d.get("name", ""))
-            self.tree.SetItemData(child, ("dir", d.get("name", "")))
-            self.tree.SetItemHasChildren(child, True)
-        for d in (root.get("lockedDirectories") or []):
-            child = self.tree.AppendItem(root_id, d.get("name", ""))
-            self.tree.SetItemData(child, ("dir", d.get("name", "")))
-            self.tree.SetItemHasChildren(child, True)
+        self.tree.SetItemData(root_id, model.root)
+        self._tree_items[id(model.root)] = root_id
+        self._fill_tree_children(root_id, model.root)
         self.tree.Expand(root_id)
-        # Populate list with top-level folders for screen reader navigation
-        self.list.DeleteAllItems()
-        for d in (root.get("directories") or []):
-            idx = self.list.InsertItem(self.list.GetItemCount(), d.get("name", ""))
-            self.list.SetItem(idx, 1, "")
-            self.list.SetItem(idx, 2, "Dir")
-        for d in (root.get("lockedDirectories") or []):
-            idx = self.list.InsertItem(self.list.GetItemCount(), d.get("name", ""))
-            self.list.SetItem(idx, 1, "")
-            self.list.SetItem(idx, 2, "Dir")
-        self.txtPath.SetValue("")
-        self._status(f"Loaded root. {self.list.GetItemCount()} folders.")
+        # Stay where the user was if that folder still exists; else show the
+        # top-level folders for screen reader navigation
+        node = model.node_for(keep) if keep else None
+        self._show_node(node if node is not None and node.loaded else model.root)
+        self._build_index(model)
+        msg = f"Loaded {model.directory_count} folders, {model.file_count} files."
+        if cached:
+            msg = f"Showing shares as of {_format_when(model.fetched_at)}; refreshing… " + msg
+        self._status(msg)
+
+    def _fill_tree_children(self, item, node: BrowseNode):
+        self.tree.DeleteChildren(item)
+        for child in node.sorted_children():
+            cid = self.tree.AppendItem(item, child.name)
+            self.tree.SetItemData(cid, child)
+            # Unloaded folders may still have subfolders we don't know about yet
+            self.tree.SetItemHasChildren(cid, bool(child.children) or not child.loaded)
+            self._tree_items[id(child)] = cid
 
     def _on_expand(self, evt):
         item = evt.GetItem()
-        data = self.tree.GetItemData(item)
-        if isinstance(data, (tuple, list)) and len(data) >= 2:
-            kind, name = data[0], data[1]
-        else:
-            # Be tolerant: some items (like the root) may not have data attached.
-            # Treat as a directory node using its label as the name.
-            kind, name = "dir", self.tree.GetItemText(item)
-        # Build path from tree lineage
-        path = self._path_from_item(item)
-        self._open_path(path, update_tree=item)
-
-    def _path_from_item(self, item) -> str:
-        parts = []
-        while item and item.IsOk() and self.tree.GetItemParent(item).IsOk():
-            data = self.tree.GetItemData(item)
-            if isinstance(data, (tuple, list)) and len(data) >= 2 and data[0] == "dir":
-                parts.append(data[1])
-            else:
-                # Fallback to the visual label
-                parts.append(self.tree.GetItemText(item))
-            item = self.tree.GetItemParent(item)
-        parts.reverse()
-        sep = "\\"
-        return sep.join(parts)
+        node = self.tree.GetItemData(item)
+        if not isinstance(node, BrowseNode):
+            return
+        # Children come from the local model; only unknown folders go to the network
+        if not self.tree.GetChildrenCount(item, False):
+            self._fill_tree_children(item, node)
+        if not node.loaded:
+            self._fetch(node.path)
 
     def _on_tree_select(self, evt):
-        item = evt.GetItem()
-        path = self._path_from_item(item)
-        self.txtPath.SetValue(path)
-        if path:
-            self._open_path(path)
+        node = self.tree.GetItemData(evt.GetItem())
+        if isinstance(node, BrowseNode):
+            self._open_node(node)
 
     def _on_open(self, evt):
         path = self.txtPath.GetValue().strip()
         self._open_path(path)
 
     def _on_up(self, evt):
+        if self._current is not None and self._current.parent is not None:
+            self._open_node(self._current.parent)
+            return
         p = self.txtPath.GetValue().strip()
         if not p:
             return
-        newp = p.rstrip("\\/").rsplit("\\", 1)[0] if "\\" in p else p.rstrip("/").rsplit("/", 1)[0]
+        newp = SEP.join(split_path(p)[:-1])
         self.txtPath.SetValue(newp)
         self._open_path(newp)
 
-    def _open_path(self, path: str, update_tree=None):
+    def _on_refresh(self, evt):
+        path = self.txtPath.GetValue().strip()
+        if not path:
+            self._load_root()
+        else:
+            self._open_path(path, refresh=True)
+
+    def _open_path(self, path: str, refresh: bool = False):
+        node = self.model.node_for(path) if self.model is not None else None
+        if node is not None and node.loaded and not refresh:
+            self._show_node(node)
+        else:
+            self._fetch(path)
+
+    def _open_node(self, node: BrowseNode):
+        if node.loaded:
+            self._show_node(node)
+        else:
+            self._fetch(node.path)
+
+    def _fetch(self, path: str):
+        key = SEP.join(split_path(path))
+        if key in self._fetching:
+            return
+        self._fetching.add(key)
         self._status(f"Loading {path or '/'} …")
+        if self._prefetch.is_inflight(key):
+            # Already on its way; _after_prefetch shows it
+            return
         def worker():
             try:
                 listing = self.service.user_directory(self.username, path)
-                wx.CallAfter(self._after_open, path, listing, update_tree)
+                call_after(self._after_fetch, key, listing)
             except Exception as e:
-                wx.CallAfter(self._status, f"Open failed: {e}")
-                wx.Bell()
+                call_after(self._fetch_failed, key, f"Open failed: {e}")
         threading.Thread(target=worker, daemon=True).start()
 
-    def _after_open(self, path: str, listing, update_tree):
-        # listing is a list (usually 1 element)
-        self.list.DeleteAllItems()
-        if not listing:
+    def _fetch_failed(self, key: str, msg: str):
+        self._fetching.discard(key)
+        self._status(msg)
+        wx.Bell()
+
+    def _after_fetch(self, key: str, listing):
+        self._fetching.discard(key)
+        self._show_node(self._apply_listing(key, listing))
+
+    def _after_prefetch(self, key: str, listing):
+        if key in self._fetching:
+            # The user opened it meanwhile
+            if listing is None:
+                self._fetching.discard(key)
+                self._fetch(key)
+            else:
+                self._after_fetch(key, listing)
+            return
+        if listing is None:
+            return
+        node = self.model.node_for(key) if self.model is not None else None
+        if node is None or not node.loaded:
+            self._apply_listing(key, listing)
+
+    def _apply_listing(self, key: str, listing) -> BrowseNode:
+        if self.model is None:
+            # Root browse still running (or failed); start a partial model
+            self.model = BrowseTree(self.username)
+        node = self.model.update_from_listing(key, listing)
+        item = self._tree_items.get(id(node))
+        if item is not None and self.tree.GetChildrenCount(item, False):
+            self._fill_tree_children(item, node)
+        elif item is not None:
+            self.tree.SetItemHasChildren(item, bool(node.children))
+        if self.model.complete:
+            self._build_index(self.model)
+        return node
+
+    def _show_node(self, node: BrowseNode):
+        self._current = node
+        self.txtPath.SetValue(node.path)
+        rows = [("dir", c, None) for c in node.sorted_children()]
+        rows.extend(("file", node, f) for f in (node.files or []))
+        self._fill_list(rows, full_paths=False)
+        # Likely next: this folder's subfolders. A new folder drops the old queue.
+        self._prefetch.request([c.path for c in node.sorted_children() if not c.loaded])
+        if not rows:
             self._status("No entries.")
+        else:
+            self._status(f"Opened {node.path or '/'}")
+
+    def _fill_list(self, rows: List[BrowseRow], full_paths: bool):
+        # Drop the old selection; indices are about to mean different rows
+        self.list.SetItemCount(0)
+        self.rows.set_rows(rows, full_paths=full_paths)
+        self.list.SetItemCount(len(self.rows))
+        self.list.Refresh()
+
+    def _build_index(self, model: BrowseTree):
+        self.index = None
+        def worker():
+            try:
+                index = ShareIndex(model)
+            except Exception:
+                # Model changed under us (a refresh); that refresh re-indexes
+                return
+            call_after(self._after_index, model, index)
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _after_index(self, model: BrowseTree, index: ShareIndex):
+        if model is self.model:
+            self.index = index
+
+    def _on_find(self, evt):
+        query = self.txtFind.GetValue().strip()
+        if not query:
             return
-        d = listing[0]
-        # Populate list with files and subdirectories if present
-        for sub in (d.get("directories") or []):
-            idx = self.list.InsertItem(self.list.GetItemCount(), sub.get("name", ""))
-            self.list.SetItem(idx, 1, "")
-            self.list.SetItem(idx, 2, "Dir")
-        for f in (d.get("files") or []):
-            idx = self.list.InsertItem(self.list.GetItemCount(), f.get("filename", ""))
-            self.list.SetItem(idx, 1, str(f.get("size", 0)))
-            self.list.SetItem(idx, 2, "File")
-        # Update tree children (lazy)
-        if update_tree:
-            self.tree.DeleteChildren(update_tree)
-            for sub in (d.get("directories") or []):
-                child = self.tree.AppendItem(update_tree, sub.get("name", ""))
-                self.tree.SetItemData(child, ("dir", sub.get("name", "")))
-                self.tree.SetItemHasChildren(child, True)
-        self._status(f"Opened {path or '/'}")
+        if self.index is None:
+            self._status("Still reading this user's shares; try again in a moment.")
+            return
+        hits = self.index.search(query)
+        self._current = None
+        self._fill_list([("dir" if h.is_dir else "file", h.node, h.file) for h in hits], full_paths=True)
+        if hits:
+            self.list.SetFocus()
+            self.list.Focus(0)
+            self.list.Select(0)
+        self._status(f"{len(hits)} match(es) for {query}.")
 
-    def _selected_files(self) -> List[Dict[str, Any]]:
-        files = []
+    def _selected_rows(self) -> List[BrowseRow]:
+        out = []
         i = -1
-        current_dir = self.txtPath.GetValue().strip()
         while True:
             i = self.list.GetNextItem(i, wx.LIST_NEXT_ALL, wx.LIST_STATE_SELECTED)
             if i == -1:
                 break
-            t = self.list.GetItemText(i, 2)
-            if t.lower() == "file":
-                name = self.list.GetItemText(i, 0)
-                size = int(self.list.GetItemText(i, 1) or "0")
-                sep = "\\" if "\\" in current_dir else "/"
-                full = name if (name.startswith("\\") or name.startswith("/") or ":" in name) else (current_dir.rstrip("\\/") + sep + name if current_dir else name)
-                files.append({"filename": full, "size": size})
-        return files
+            r = self.rows.row(i)
+            if r is not None:
+                out.append(r)
+        return out
+
+    def _selected_files(self) -> List[Dict[str, Any]]:
+        return [
+            {"filename": node.file_path(f), "size": f.size}
+            for kind, node, f in self._selected_rows() if kind == "file"
+        ]
 
     def _on_download_selected(self, evt):
         files = self._selected_files()
@@ -279,23 +439,12 @@ class UserBrowserFrame(wx.Frame):
         def worker():
             try:
                 ok = self.service.enqueue_downloads(self.username, files)
-                wx.CallAfter(self._status, "Enqueued." if ok else "Enqueue failed.")
+                call_after(self._status, "Enqueued." if ok else "Enqueue failed.", key=STATUS_KEY)
             except Exception as e:
-                wx.CallAfter(self._status, f"Enqueue failed: {e}")
+                call_after(self._status, f"Enqueue failed: {e}", key=STATUS_KEY)
                 wx.Bell()
         threading.Thread(target=worker, daemon=True).start()
 
-    def _on_download_dir(self, evt):
-        path = self.txtPath.GetValue().strip()
-        if not path:
-            self._status("Open a directory first.")
-            return
-        self._status(f"Enqueueing directory {path}…")
-        def worker():
-            try:
-                n = self.service.enqueue_directory(self.username, path)
-                wx.CallAfter(self._status, f"Enqueued {n} file(s) from {path}.")
-            except Exception as e:
-                wx.CallAfter(self._status, f"Directory enqueue failed: {e}")
-                wx.Bell()
-        threading.Thread(target=worker, daemon=True).start()
+
+def _format_when(t: float) -> str:
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(t))
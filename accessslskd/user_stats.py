@@ -0,0 +1,257 @@
+"""
+Per-user reliability statistics from observed downloads.
+
+Advertised ``uploadSpeed`` and free slots say little about whether a peer
+actually delivers. Every downloads refresh is fed through ``observe``: time
+spent queued is measured when a transfer starts moving, and when it finishes
+we count a success (with its achieved speed) or a failure (with its reason).
+Only transfers first seen unfinished in this session count, so the same
+completed transfer listed on every refresh, or across restarts, is never
+counted twice.
+
+Stats live in memory and are saved to ``user_stats.json`` in the config
+directory every ``SAVE_INTERVAL_S`` while dirty, and at exit. Search results
+use ``tier`` to list proven peers first and known-bad ones last.
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import statistics
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from .transfer_store import is_active_state, is_queued_state, state_bucket
+
+STATS_FILE_NAME = "user_stats.json"
+SAVE_INTERVAL_S = 120.0
+# Recent samples kept per user for the medians
+MAX_SAMPLES = 25
+# Users kept on disk (most recently seen)
+MAX_USERS = 5000
+# Verdicts need at least this many finished downloads
+MIN_FINISHED = 3
+GOOD_RATE = 0.8
+BAD_RATE = 0.34
+
+TIER_GOOD, TIER_UNKNOWN, TIER_BAD = 0, 1, 2
+
+
+class _UserRecord:
+    __slots__ = ("succeeded", "failed", "reasons", "speeds", "waits", "last_seen")
+
+    def __init__(self):
+        self.succeeded = 0
+        self.failed = 0
+        self.reasons: Dict[str, int] = {}
+        self.speeds: List[float] = []
+        self.waits: List[float] = []
+        self.last_seen = 0.0
+
+    def to_json(self) -> Dict[str, Any]:
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    @classmethod
+    def from_json(cls, d: Dict[str, Any]) -> "_UserRecord":
+        rec = cls()
+        rec.succeeded = int(d.get("succeeded", 0))
+        rec.failed = int(d.get("failed", 0))
+        rec.reasons = {str(k): int(v) for k, v in (d.get("reasons") or {}).items()}
+        rec.speeds = [float(x) for x in (d.get("speeds") or [])][-MAX_SAMPLES:]
+        rec.waits = [float(x) for x in (d.get("waits") or [])][-MAX_SAMPLES:]
+        rec.last_seen = float(d.get("last_seen", 0.0))
+        return rec
+
+    @property
+    def finished(self) -> int:
+        return self.succeeded + self.failed
+
+    @property
+    def success_rate(self) -> float:
+        # Smoothed so one result doesn't swing a user to 0% or 100%
+        return (self.succeeded + 1) / (self.finished + 2)
+
+
+def _push(samples: List[float], value: float) -> None:
+    samples.append(value)
+    if len(samples) > MAX_SAMPLES:
+        del samples[0]
+
+
+def _failure_reason(state: str) -> str:
+    # "Completed, TimedOut" -> "TimedOut"
+    return state.split(",")[-1].strip() or state
+
+
+class UserStats:
+    def __init__(self, path: Optional[str] = None):
+        self._path = path
+        self._lock = threading.Lock()
+        self._users: Dict[str, _UserRecord] = {}
+        self._loaded = False
+        self._dirty = False
+        self._saver: Optional[threading.Thread] = None
+        # Transfers seen unfinished this session: file id -> queued since (None if never queued)
+        self._pending: Dict[str, Optional[float]] = {}
+
+    def observe(self, records: Iterable[Any], now: Optional[float] = None) -> None:
+        """Fold new/changed download records (``TransferRecord``) into the stats."""
+        t = time.time() if now is None else now
+        self._ensure_loaded()
+        with self._lock:
+            for rec in records:
+                if rec is None or not rec.is_download:
+                    continue
+                fid = rec.file_id
+                bucket = state_bucket(rec.state)
+                if bucket in ("queued", "active", "other"):
+                    if fid not in self._pending:
+                        self._pending[fid] = t if is_queued_state(rec.state) else None
+                    if is_active_state(rec.state) and self._pending.get(fid) is not None:
+                        _push(self._user(rec.username, t).waits, t - self._pending[fid])
+                        self._pending[fid] = None
+                    continue
+                if fid not in self._pending:
+                    # Already finished when first seen: counted in an earlier session, or never watched
+                    continue
+                del self._pending[fid]
+                if "cancelled" in rec.state.lower():
+                    # Our own doing, not the peer's
+                    continue
+                u = self._user(rec.username, t)
+                if bucket == "done":
+                    u.succeeded += 1
+                    if rec.speed > 0:
+                        _push(u.speeds, float(rec.speed))
+                else:
+                    u.failed += 1
+                    reason = _failure_reason(rec.state)
+                    u.reasons[reason] = u.reasons.get(reason, 0) + 1
+                self._dirty = True
+        if self._dirty:
+            self._ensure_saver()
+
+    def forget(self, file_ids: Iterable[str]) -> None:
+        """Drop transfers that left slskd unfinished (removed, cleared); they will never finish."""
+        with self._lock:
+            for fid in file_ids:
+                self._pending.pop(fid, None)
+
+    def tier(self, username: str) -> int:
+        u = self._get(username)
+        if u is None or u.finished < MIN_FINISHED:
+            return TIER_UNKNOWN
+        if u.success_rate >= GOOD_RATE:
+            return TIER_GOOD
+        if u.success_rate <= BAD_RATE:
+            return TIER_BAD
+        return TIER_UNKNOWN
+
+    def summary(self, username: str) -> Optional[Dict[str, Any]]:
+        u = self._get(username)
+        if u is None:
+            return None
+        return {
+            "succeeded": u.succeeded,
+            "failed": u.failed,
+            "success_rate": u.success_rate,
+            "median_speed": statistics.median(u.speeds) if u.speeds else None,
+            "median_wait_s": statistics.median(u.waits) if u.waits else None,
+            "reasons": dict(u.reasons),
+            "tier": self.tier(username),
+        }
+
+    def describe(self, username: str) -> str:
+        """Short human summary, or "" if we know nothing about the user."""
+        s = self.summary(username)
+        if s is None or not (s["succeeded"] or s["failed"] or s["median_wait_s"] is not None):
+            return ""
+        from .throughput import format_eta, format_rate
+        parts = [f"{s['succeeded']} of {s['succeeded'] + s['failed']} downloads ok"]
+        if s["median_speed"]:
+            parts.append(f"median {format_rate(s['median_speed'])}")
+        if s["median_wait_s"] is not None:
+            parts.append(f"queued {format_eta(s['median_wait_s'])}")
+        if s["reasons"]:
+            parts.append("failures: " + ", ".join(f"{k} {v}" for k, v in sorted(s["reasons"].items(), key=lambda kv: -kv[1])))
+        if s["tier"] == TIER_BAD:
+            parts.insert(0, "Unreliable")
+        elif s["tier"] == TIER_GOOD:
+            parts.insert(0, "Reliable")
+        return ", ".join(parts)
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            keep = sorted(self._users.items(), key=lambda kv: kv[1].last_seen, reverse=True)[:MAX_USERS]
+            data = {name: u.to_json() for name, u in keep}
+            self._dirty = False
+        try:
+            path = self._resolve_path()
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp, path)
+        except Exception:
+            with self._lock:
+                self._dirty = True
+
+    def _user(self, username: str, t: float) -> _UserRecord:
+        # Caller holds _lock
+        u = self._users.get(username)
+        if u is None:
+            u = self._users[username] = _UserRecord()
+        u.last_seen = t
+        self._dirty = True
+        return u
+
+    def _get(self, username: str) -> Optional[_UserRecord]:
+        self._ensure_loaded()
+        return self._users.get(username)
+
+    def _resolve_path(self) -> str:
+        if not self._path:
+            from .config import _app_config_dir
+            self._path = os.path.join(_app_config_dir(), STATS_FILE_NAME)
+        return self._path
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            try:
+                with open(self._resolve_path(), "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                for name, d in (data or {}).items():
+                    self._users[str(name)] = _UserRecord.from_json(d)
+            except FileNotFoundError:
+                pass
+            except Exception:
+                # Corrupt or unreadable: start over rather than fail
+                self._users.clear()
+
+    def _ensure_saver(self) -> None:
+        if self._saver is not None:
+            return
+        with self._lock:
+            if self._saver is not None:
+                return
+            t = threading.Thread(target=self._run_saver, name="user-stats", daemon=True)
+            self._saver = t
+            t.start()
+
+    def _run_saver(self) -> None:
+        while True:
+            time.sleep(SAVE_INTERVAL_S)
+            self.save()
+
+
+# Process-wide stats used by the app
+user_stats = UserStats()
+atexit.register(user_stats.save)